@@ -0,0 +1,991 @@
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Replays the query shapes the app issues (app/actions/*.ts) against databases
+# built by generate-database.py at several scales, so scaling curves are visible
+# before a page ships. Arguments after "--" are passed on to the generator.
+
+# --- SETTINGS ---
+DEFAULT_SCALES = [1000, 6000, 60000]
+DEFAULT_SEED = 42
+DEFAULT_ITERATIONS = 30
+DEFAULT_WORKDIR = "benchmark-data"
+DEFAULT_OUTPUT = "query-benchmark.json"
+DEFAULT_TOLERANCE = 0.25
+PAGE_SIZE = 25
+FLUX_WEIGHTINGS = ["uniform", "runs"]
+GENERATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate-database.py")
+
+# --- QUERY SHAPES ---
+# Each shape is one round trip of an action: the statements it runs and where
+# its parameters come from. "flux" draws a flux with history, "fetching" a
+# fetchingID, "page" a page number within the flux's history, "fetchings" one
+# page worth of fetchingIDs. Aggregations are replayed as the app issues them:
+# the rows are fetched and counted on the client.
+QUERY_SHAPES = [
+    {
+        "name": "fetching_history_page",
+        "action": "getFetchingHistory(fluxId)",
+        "params": ["flux", "page"],
+        "statements": [
+            "SELECT * FROM fetchingHistory WHERE fluxID = :flux ORDER BY timestamp DESC LIMIT :limit OFFSET :offset",
+            "SELECT COUNT(*) FROM fetchingHistory WHERE fluxID = :flux",
+        ],
+    },
+    {
+        "name": "fetching_history_page_all",
+        "action": "getFetchingHistory()",
+        "params": ["page"],
+        "statements": [
+            "SELECT * FROM fetchingHistory ORDER BY timestamp DESC LIMIT :limit OFFSET :offset",
+            "SELECT COUNT(*) FROM fetchingHistory",
+        ],
+    },
+    {
+        "name": "processing_history_page",
+        "action": "getProcessingHistory(fluxId)",
+        "params": ["flux", "page"],
+        "statements": [
+            "SELECT * FROM processingHistory WHERE fluxID = :flux ORDER BY timestamp DESC LIMIT :limit OFFSET :offset",
+            "SELECT COUNT(*) FROM processingHistory WHERE fluxID = :flux",
+        ],
+    },
+    {
+        "name": "processing_history_by_fetching",
+        "action": "getProcessingHistory(fetchingID)",
+        "params": ["fetching"],
+        "statements": [
+            "SELECT * FROM processingHistory WHERE fetchingID = :fetching ORDER BY timestamp DESC LIMIT :limit",
+            "SELECT COUNT(*) FROM processingHistory WHERE fetchingID = :fetching",
+        ],
+    },
+    {
+        "name": "processing_counts_for_page",
+        "action": "getProcessingCounts(fetchingIds)",
+        "params": ["fetchings"],
+        "statements": [
+            "SELECT fetchingID, COUNT(processingID) FROM processingHistory "
+            "WHERE fetchingID IN (SELECT value FROM json_each(:fetchings)) GROUP BY fetchingID",
+        ],
+    },
+    {
+        "name": "content_items_by_fetching",
+        "action": "getFetchingContentHistory(fetchingId)",
+        "params": ["fetching"],
+        "statements": [
+            "SELECT * FROM content_items WHERE fetchingID = :fetching",
+        ],
+    },
+]
+
+AGGREGATIONS = {
+    "status": ("status", None, ""),
+    "duration": ("{duration}", "{duration} IS NOT NULL", ""),
+    "errors": ("errorMessage", "errorMessage IS NOT NULL", ""),
+    "trend": ("status, timestamp", None, " ORDER BY timestamp"),
+}
+
+def aggregation_shapes():
+    # get{Fetching,Processing}{StatusCounts,DurationBuckets,ErrorTypes,Trend},
+    # each for one flux and for "all"
+    shapes = []
+    for history, prefix, duration in (
+        ("fetchingHistory", "fetching", "fetchingTimeInSeconds"),
+        ("processingHistory", "processing", "processingTimeInSeconds"),
+    ):
+        for name, (columns, condition, order) in AGGREGATIONS.items():
+            columns = columns.format(duration=duration)
+            condition = condition.format(duration=duration) if condition else None
+            for scope in ("flux", "all"):
+                conditions = [c for c in (condition, "fluxID = :flux" if scope == "flux" else None) if c]
+                where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+                shapes.append({
+                    "name": f"{prefix}_{name}_{scope}",
+                    "action": f"{prefix}.{name}({'fluxId' if scope == 'flux' else 'all'})",
+                    "params": ["flux"] if scope == "flux" else [],
+                    "statements": [f"SELECT {columns} FROM {history}{where}{order}"],
+                })
+    return shapes
+
+# The workflow execution log pages (app/actions/workflow-execution-log.ts),
+# read from the tables materialized by --workflow-stages. Shapes that
+# "require" a table are skipped on databases built without it.
+WORKFLOW_SHAPES = [
+    {
+        "name": "workflow_log_page",
+        "action": "getWorkflowExecutionLogs(fluxId)",
+        "requires": "workflow_execution_log_summary",
+        "params": ["flux", "page"],
+        "statements": [
+            "SELECT * FROM workflow_execution_log_summary WHERE flux_id = :flux "
+            "ORDER BY started_at DESC LIMIT :limit OFFSET :offset",
+            "SELECT COUNT(*) FROM workflow_execution_log_summary WHERE flux_id = :flux",
+        ],
+    },
+    {
+        "name": "workflow_log_page_all",
+        "action": "getWorkflowExecutionLogs()",
+        "requires": "workflow_execution_log_summary",
+        "params": ["page"],
+        "statements": [
+            "SELECT * FROM workflow_execution_log_summary ORDER BY started_at DESC LIMIT :limit OFFSET :offset",
+            "SELECT COUNT(*) FROM workflow_execution_log_summary",
+        ],
+    },
+    {
+        "name": "workflow_status_counts",
+        "action": "getWorkflowStatusCounts(fluxId)",
+        "requires": "workflow_execution_log_summary",
+        "params": ["flux"],
+        "statements": ["SELECT status FROM workflow_execution_log_summary WHERE flux_id = :flux"],
+    },
+    {
+        "name": "workflow_duration_buckets",
+        "action": "getWorkflowDurationBuckets(fluxId)",
+        "requires": "workflow_execution_log_summary",
+        "params": ["flux"],
+        "statements": [
+            "SELECT duration_seconds FROM workflow_execution_log_summary "
+            "WHERE flux_id = :flux AND duration_seconds IS NOT NULL",
+        ],
+    },
+    {
+        "name": "workflow_trend_all",
+        "action": "getWorkflowTrend()",
+        "requires": "workflow_execution_log_summary",
+        "params": [],
+        "statements": ["SELECT status, started_at FROM workflow_execution_log_summary ORDER BY started_at"],
+    },
+    {
+        "name": "workflow_failed_runs",
+        "action": "getWorkflowErrorTypes()",
+        "requires": "workflow_execution_log_summary",
+        "params": [],
+        "statements": [
+            "SELECT flux_id, last_stage FROM workflow_execution_log_summary WHERE status IN ('Failed', 'Error')",
+        ],
+    },
+    {
+        "name": "workflow_run_by_fetching",
+        "action": "getRunIdFromStage('fetching', id)",
+        "requires": "workflow_execution_log_summary",
+        "params": ["fetching"],
+        "statements": ["SELECT id FROM workflow_execution_log_summary WHERE fetching_id = :fetching"],
+    },
+    {
+        "name": "workflow_stage_details",
+        "action": "getWorkflowStageDetails(runId)",
+        "requires": "v_workflow_stage_details",
+        "params": ["fetching"],
+        "statements": [
+            "SELECT * FROM v_workflow_stage_details WHERE run_id = :fetching ORDER BY stage_order",
+        ],
+    },
+    {
+        "name": "workflow_stage_lookup",
+        "action": "getRunIdFromStage(stageType, stageId)",
+        "requires": "v_workflow_stage_details",
+        "params": ["fetching"],
+        "statements": [
+            "SELECT run_id FROM v_workflow_stage_details WHERE stage_type LIKE 'fetching' AND id = :fetching",
+        ],
+    },
+    {
+        "name": "fetched_contents_page",
+        "action": "getFetchedContents(fluxId)",
+        "requires": "fetched_contents_view",
+        "params": ["flux"],
+        "statements": [
+            "SELECT * FROM fetched_contents_view WHERE fluxID = :flux ORDER BY createdAt DESC LIMIT :limit",
+            "SELECT COUNT(*) FROM fetched_contents_view WHERE fluxID = :flux",
+            "SELECT DISTINCT fileType FROM fetched_contents_view WHERE fluxID = :flux",
+        ],
+    },
+]
+
+def all_shapes():
+    return QUERY_SHAPES + aggregation_shapes() + WORKFLOW_SHAPES
+
+def available_shapes(conn, shapes):
+    # Views count: on --compact-enums and --timestamps epoch databases the
+    # app's tables are views over the stored ones
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    return [shape for shape in shapes if shape.get("requires", "fluxData") in present]
+
+# --- LAYOUT COMPARISON ---
+# Server-side GROUP BYs over the dictionary-encoded columns, timed on the plain
+# layout and on --compact-enums. On the compact layout each one runs twice:
+# through the compatibility view ("text") and on the stored codes, decoding
+# only the grouped rows ("codes").
+LAYOUT_GROUP_BYS = [
+    ("fetching_status_counts", "fetchingHistory", "status", None),
+    ("fetching_error_counts", "fetchingHistory", "errorMessage", "errorMessage IS NOT NULL"),
+    ("processing_status_counts", "processingHistory", "status", None),
+    ("processing_error_counts", "processingHistory", "errorMessage", "errorMessage IS NOT NULL"),
+    ("content_file_types", "content_items", "fileType", None),
+    ("content_mime_types", "content_items", "mimeType", None),
+    ("flux_types", "fluxData", "fluxType", None),
+]
+# Layout -> extra generator arguments; "plain" is the scale's main database
+LAYOUTS = {"plain": [], "compact": ["--compact-enums"]}
+
+def layout_shapes(generator, compact):
+    shapes = []
+    for name, table, column, condition in LAYOUT_GROUP_BYS:
+        where = f" WHERE {condition}" if condition else ""
+        shapes.append({
+            "name": f"{name}_text",
+            "action": f"GROUP BY {table}.{column}",
+            "params": [],
+            "statements": [f"SELECT {column}, COUNT(*) FROM {table}{where} GROUP BY {column}"],
+        })
+        if compact:
+            layout = generator.StorageLayout(compact=True)
+            codes = generator.code_table(generator.CODED_COLUMNS[table][column])
+            shapes.append({
+                "name": f"{name}_codes",
+                "action": f"GROUP BY {layout.table(table)}.{column}",
+                "params": [],
+                "statements": [
+                    f"SELECT c.value, g.count FROM (SELECT {column} AS code, COUNT(*) AS count "
+                    f"FROM {layout.table(table)}{where} GROUP BY {column}) g LEFT JOIN {codes} c ON c.code = g.code"
+                ],
+            })
+    return shapes
+
+# --- SEARCH COMPARISON ---
+# The app's ilike '%term%' searches against the FTS5 indexes of
+# --search-index, both on a database built with them. Each pair replays the
+# same type-ahead prefixes of words taken from the searched column; LIKE also
+# matches inside words, MATCH only at word starts.
+SEARCH_SHAPES = [
+    {
+        "name": "flux_search",
+        "vocabulary": "SELECT name || ' ' || COALESCE(description, '') FROM fluxData LIMIT 2000",
+        "like": [
+            "SELECT id, name FROM fluxData "
+            "WHERE name LIKE :like OR description LIKE :like OR comment LIKE :like LIMIT :limit",
+            "SELECT COUNT(*) FROM fluxData WHERE name LIKE :like OR description LIKE :like OR comment LIKE :like",
+        ],
+        "match": [
+            "SELECT f.id, f.name FROM fluxSearch s JOIN fluxData f ON f.id = s.rowid "
+            "WHERE fluxSearch MATCH :match LIMIT :limit",
+            "SELECT COUNT(*) FROM fluxSearch WHERE fluxSearch MATCH :match",
+        ],
+    },
+    {
+        "name": "content_search",
+        "vocabulary": "SELECT contentName || ' ' || COALESCE(description, '') FROM content_items LIMIT 2000",
+        "like": [
+            "SELECT * FROM content_items WHERE contentName LIKE :like OR description LIKE :like LIMIT :limit",
+            "SELECT COUNT(*) FROM content_items WHERE contentName LIKE :like OR description LIKE :like",
+        ],
+        "match": [
+            "SELECT c.* FROM contentSearch s JOIN content_items c ON c.contentID = s.rowid "
+            "WHERE contentSearch MATCH :match LIMIT :limit",
+            "SELECT COUNT(*) FROM contentSearch WHERE contentSearch MATCH :match",
+        ],
+    },
+] + [
+    {
+        "name": f"{prefix}_error_search",
+        "vocabulary": f"SELECT DISTINCT errorMessage FROM {history} WHERE errorMessage IS NOT NULL",
+        "like": [
+            f"SELECT * FROM {history} WHERE errorMessage LIKE :like ORDER BY timestamp DESC LIMIT :limit",
+            f"SELECT COUNT(*) FROM {history} WHERE errorMessage LIKE :like",
+        ],
+        "match": [
+            f"SELECT h.* FROM {prefix}ErrorSearch s JOIN {history} h ON h.{id_column} = s.rowid "
+            f"WHERE {prefix}ErrorSearch MATCH :match ORDER BY h.timestamp DESC LIMIT :limit",
+            f"SELECT COUNT(*) FROM {prefix}ErrorSearch WHERE {prefix}ErrorSearch MATCH :match",
+        ],
+    }
+    for prefix, history, id_column in (
+        ("fetching", "fetchingHistory", "fetchingID"),
+        ("processing", "processingHistory", "processingID"),
+    )
+]
+
+def compare_search(workdir, scale, seed, iterations, workers, generator_args, regenerate):
+    path, generate_seconds = ensure_database(
+        workdir, scale, seed, workers, generator_args + ["--search-index"], regenerate, "search"
+    )
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    stats = database_stats(conn, path)
+    index_stats = index_row_estimates(conn)
+    sampler = ParameterSampler(conn, seed)
+    queries = {}
+    for search in SEARCH_SHAPES:
+        for method in ("like", "match"):
+            # Both methods replay the same terms
+            sampler.restart()
+            shape = {
+                "name": f"{search['name']}_{method}",
+                "action": f"{search['name']} ({method.upper()})",
+                "params": ["term"],
+                "vocabulary": search["vocabulary"],
+                "statements": search[method],
+            }
+            queries[shape["name"]] = run_shape(conn, shape, sampler, iterations, stats["rows"], index_stats)
+    conn.close()
+    return {"generate_seconds": round(generate_seconds, 3), "database": stats, "queries": queries}
+
+# --- PARTITION COMPARISON ---
+# Recent-window queries on the single-file database and on the same data
+# built with --partition-period month, where only the partitions overlapping
+# the window are attached. Windows end at the newest fetch.
+RECENT_WINDOW_DAYS = [1, 7, 30, 90]
+RECENT_WINDOW_STATEMENTS = {
+    "recent_fetches_page": "SELECT * FROM fetchingHistory WHERE timestamp >= :since "
+                           "ORDER BY timestamp DESC LIMIT :limit",
+    "recent_fetch_status_counts": "SELECT status, COUNT(*) FROM fetchingHistory WHERE timestamp >= :since "
+                                  "GROUP BY status",
+    "recent_processing_count": "SELECT COUNT(*) FROM processingHistory WHERE timestamp >= :since",
+}
+
+def time_statements(conn, statements, params, iterations):
+    samples = []
+    for iteration in range(iterations + 1):
+        started = time.perf_counter()
+        for statement in statements:
+            conn.execute(statement, params).fetchall()
+        # The first call only warms the page cache
+        if iteration:
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {"p50_ms": round(percentile(samples, 0.50), 3), "p95_ms": round(percentile(samples, 0.95), 3)}
+
+def compare_partitions(workdir, scale, seed, iterations, workers, generator_args, regenerate):
+    generator = load_generator_module()
+    plain_path, _ = ensure_database(workdir, scale, seed, workers, generator_args, False)
+    path, generate_seconds = ensure_database(
+        workdir, scale, seed, workers, generator_args + ["--partition-period", "month"], regenerate, "partitioned"
+    )
+    plain = sqlite3.connect(f"file:{plain_path}?mode=ro", uri=True)
+    newest = generator.parse_timestamp(plain.execute("SELECT MAX(timestamp) FROM fetchingHistory").fetchone()[0])
+    windows = {}
+    for days in RECENT_WINDOW_DAYS:
+        since = (newest - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        params = {"since": since, "limit": PAGE_SIZE}
+        started = time.perf_counter()
+        partitioned, periods = generator.open_partitioned(path, since=since)
+        open_ms = (time.perf_counter() - started) * 1000
+        windows[f"{days}d"] = {
+            "since": since,
+            "partitions": periods,
+            "open_ms": round(open_ms, 3),
+            "queries": {
+                name: {
+                    "plain": time_statements(plain, [statement], params, iterations),
+                    "partitioned": time_statements(partitioned, [statement], params, iterations),
+                }
+                for name, statement in RECENT_WINDOW_STATEMENTS.items()
+            },
+        }
+        partitioned.close()
+    plain.close()
+    main_bytes = os.path.getsize(path)
+    partition_bytes = sum(
+        entry.stat().st_size for entry in os.scandir(generator.partition_directory(path)) if entry.is_file()
+    )
+    return {
+        "generate_seconds": round(generate_seconds, 3),
+        "main_bytes": main_bytes,
+        "partition_bytes": partition_bytes,
+        "windows": windows,
+    }
+
+# --- PAGINATION COMPARISON ---
+# The app's OFFSET pages with count: "exact" against (timestamp, id) cursor
+# pages with the history_counts row count, on the same data built with
+# --keyset-pagination. Both order by timestamp and ID so they return the same
+# rows; the cursor of page N is the last row of page N - 1, looked up untimed.
+# "flux" scopes run on the flux with the most rows. Pages past the end are
+# reported as null.
+PAGINATION_PAGES = [1, 100, 10000]
+PAGINATION_SCOPES = [
+    ("fetching_history", "fetchingHistory", "all"),
+    ("fetching_history", "fetchingHistory", "flux"),
+    ("processing_history", "processingHistory", "all"),
+    ("content_items", "content_items", "all"),
+]
+# Sorts after every ISO timestamp, so the first page's cursor is before all rows
+FIRST_PAGE_CURSOR = "9999-12-31T23:59:59Z"
+
+def pagination_statements(generator, table, scope):
+    id_column, order_column, _ = generator.KEYSET_TABLES[table]
+    where = " WHERE fluxID = :flux" if scope == "flux" else ""
+    cursor = f"({order_column}, {id_column}) < (:cursor, :cursor_id)"
+    order = f" ORDER BY {order_column} DESC, {id_column} DESC"
+    return {
+        "cursor": f"SELECT {order_column}, {id_column} FROM {table}{where}{order} LIMIT 1 OFFSET :offset - 1",
+        "offset": [
+            f"SELECT * FROM {table}{where}{order} LIMIT :limit OFFSET :offset",
+            f"SELECT COUNT(*) FROM {table}{where}",
+        ],
+        "keyset": [
+            f"SELECT * FROM {table}{where}{' AND ' if where else ' WHERE '}{cursor}{order} LIMIT :limit",
+            "SELECT rowCount FROM history_counts WHERE tableName = :table AND fluxID = :flux AND filterValue = ''",
+        ],
+    }
+
+def compare_pagination(workdir, scale, seed, iterations, workers, generator_args, regenerate):
+    generator = load_generator_module()
+    path, generate_seconds = ensure_database(
+        workdir, scale, seed, workers, generator_args + ["--keyset-pagination"], regenerate, "keyset"
+    )
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    scopes = {}
+    for prefix, table, scope in PAGINATION_SCOPES:
+        # fluxID 0 is the row count of the whole table
+        flux, rows = conn.execute(
+            "SELECT fluxID, rowCount FROM history_counts WHERE tableName = ? AND filterValue = '' "
+            + ("AND fluxID != 0 ORDER BY rowCount DESC, fluxID LIMIT 1" if scope == "flux" else "AND fluxID = 0"),
+            (table,)
+        ).fetchone()
+        statements = pagination_statements(generator, table, scope)
+        pages = {}
+        for page in PAGINATION_PAGES:
+            params = {"table": table, "flux": flux, "limit": PAGE_SIZE, "offset": (page - 1) * PAGE_SIZE}
+            if params["offset"] >= rows:
+                pages[str(page)] = None
+                continue
+            params["cursor"], params["cursor_id"] = (
+                conn.execute(statements["cursor"], params).fetchone() if page > 1 else (FIRST_PAGE_CURSOR, 0)
+            )
+            pages[str(page)] = {
+                method: time_statements(conn, statements[method], params, iterations)
+                for method in ("offset", "keyset")
+            }
+        scopes[f"{prefix}_{scope}"] = {"rows": rows, "pages": pages}
+    conn.close()
+    return {"generate_seconds": round(generate_seconds, 3), "scopes": scopes}
+
+def compare_layouts(workdir, scale, seed, iterations, workers, generator_args, regenerate):
+    generator = load_generator_module()
+    results = {}
+    for label, layout_args in LAYOUTS.items():
+        path, generate_seconds = ensure_database(
+            workdir, scale, seed, workers, generator_args + layout_args, regenerate and bool(layout_args),
+            label if layout_args else None
+        )
+        stats, queries = benchmark_database(path, seed, iterations, layout_shapes(generator, label == "compact"))
+        results[label] = {"generate_seconds": round(generate_seconds, 3), "database": stats, "queries": queries}
+    return results
+
+# --- DATABASE PREPARATION ---
+def database_path(workdir, scale, label=None):
+    return os.path.join(workdir, f"hillmetrics-{scale}{f'-{label}' if label else ''}.db")
+
+def ensure_database(workdir, scale, seed, workers, generator_args, regenerate, label=None):
+    # Databases are reused as long as they were built with the same arguments
+    path = database_path(workdir, scale, label)
+    args_path = f"{path}.args.json"
+    command = [
+        sys.executable, GENERATOR, "--output", path, "--fluxes", str(scale),
+        "--seed", str(seed), "--fast-load",
+    ] + (["--workers", str(workers)] if workers else []) + generator_args
+    recorded = None
+    if os.path.exists(path) and os.path.exists(args_path):
+        with open(args_path, encoding="utf-8") as handle:
+            recorded = json.load(handle)
+    if not regenerate and recorded and recorded["command"] == command[2:]:
+        print(f"  - Reusing {path}")
+        return path, recorded["generate_seconds"]
+    print(f"  - Generating {scale} fluxes into {path}...")
+    started = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - started
+    with open(args_path, "w", encoding="utf-8") as handle:
+        json.dump({"command": command[2:], "generate_seconds": elapsed}, handle)
+    return path, elapsed
+
+def database_stats(conn, path):
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    tables = [
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )
+    ]
+    return {
+        "file_bytes": os.path.getsize(path),
+        "page_size": page_size,
+        "page_count": page_count,
+        "rows": {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables},
+    }
+
+# --- PARAMETERS ---
+class ParameterSampler:
+    # Draws realistic parameters from the database itself with a fixed seed, so
+    # every run and every baseline replays the same calls. flux_weighting
+    # "runs" picks fluxes in proportion to their fetch runs, the way traffic
+    # concentrates on the busiest feeds.
+    def __init__(self, conn, seed, flux_weighting="uniform"):
+        self.conn = conn
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.vocabularies = {}
+        self.fluxes = [
+            row[0] for row in conn.execute("SELECT DISTINCT fluxID FROM fetchingHistory ORDER BY fluxID")
+        ]
+        self.max_fetching = conn.execute("SELECT MAX(fetchingID) FROM fetchingHistory").fetchone()[0] or 0
+        self.history_counts = dict(conn.execute(
+            "SELECT fluxID, COUNT(*) FROM fetchingHistory GROUP BY fluxID"
+        ).fetchall())
+        self.total_history = sum(self.history_counts.values())
+        self.flux_weights = None
+        if flux_weighting == "runs" and self.fluxes:
+            self.flux_weights = list(itertools.accumulate(self.history_counts[flux] for flux in self.fluxes))
+
+    def restart(self):
+        self.rng = random.Random(self.seed)
+
+    def term(self, vocabulary):
+        # A type-ahead prefix of a word from the rows of the vocabulary query
+        if vocabulary not in self.vocabularies:
+            self.vocabularies[vocabulary] = sorted({
+                word.lower() for row in self.conn.execute(vocabulary)
+                for word in re.findall(r"[A-Za-z]{4,}", row[0] or "")
+            }) or ["none"]
+        word = self.rng.choice(self.vocabularies[vocabulary])
+        return word[:self.rng.randint(3, min(6, len(word)))]
+
+    def draw(self, names, vocabulary=None):
+        params = {"limit": PAGE_SIZE}
+        if self.flux_weights:
+            flux = self.rng.choices(self.fluxes, cum_weights=self.flux_weights)[0]
+        else:
+            flux = self.rng.choice(self.fluxes) if self.fluxes else 0
+        if "flux" in names:
+            params["flux"] = flux
+        if "page" in names:
+            # Mostly first pages, sometimes deep ones, like real browsing
+            rows = self.history_counts.get(flux, 0) if "flux" in names else self.total_history
+            pages = max(1, -(-rows // PAGE_SIZE))
+            page = 1 if self.rng.random() < 0.6 else self.rng.randint(1, pages)
+            params["offset"] = (page - 1) * PAGE_SIZE
+        if "fetching" in names:
+            params["fetching"] = self.rng.randint(1, max(1, self.max_fetching))
+        if "fetchings" in names:
+            first = self.rng.randint(1, max(1, self.max_fetching - PAGE_SIZE))
+            params["fetchings"] = json.dumps(list(range(first, first + PAGE_SIZE)))
+        if "term" in names:
+            term = self.term(vocabulary)
+            params["like"] = f"%{term}%"
+            params["match"] = f'"{term}"*'
+        return params
+
+# --- PLAN ANALYSIS ---
+def index_row_estimates(conn):
+    # sqlite_stat1 holds "rows avg-per-key-prefix..." for each index (ANALYZE)
+    estimates = {}
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    if exists:
+        for _, index, stat in conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1"):
+            if index:
+                estimates[index] = [int(value) for value in stat.split() if value.isdigit()]
+    return estimates
+
+def estimate_rows_scanned(detail, table_rows, index_stats):
+    # Rough number of rows a plan step visits: full scans visit the table,
+    # index searches visit the average rows per key of the equality prefix
+    words = detail.split()
+    if words[0] not in ("SCAN", "SEARCH") or len(words) < 2:
+        return 0
+    if "VIRTUAL TABLE" in detail:
+        # FTS5 answers from its own token index; the rows it returns are
+        # counted by the lookups joined to it
+        return 0
+    table = words[1]
+    rows = table_rows.get(table, 0)
+    if words[0] == "SCAN":
+        return rows
+    if "PRIMARY KEY" in detail and "(rowid=?)" in detail:
+        return 1
+    if "INDEX" in words:
+        index = words[words.index("INDEX") + 1]
+        stats = index_stats.get(index)
+        equalities = detail.count("=?") - detail.count(">=?") - detail.count("<=?")
+        if stats and equalities and len(stats) > equalities:
+            return stats[equalities]
+        if stats and equalities:
+            return stats[-1]
+    return rows
+
+def explain(conn, statement, params, table_rows, index_stats):
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", params)]
+    return plan, sum(estimate_rows_scanned(detail, table_rows, index_stats) for detail in plan)
+
+def classify_plan_step(detail, table_rows):
+    # "table scan" reads every row of a table, "index scan" walks a whole
+    # index (cheap when covering, still linear), "sort" builds a temp b-tree
+    words = detail.split()
+    if words[:1] == ["SCAN"] and len(words) > 1 and words[1] in table_rows:
+        return "index scan" if "INDEX" in words else "table scan"
+    if detail.startswith("USE TEMP B-TREE"):
+        return "sort"
+    return None
+
+# --- INDEX ADVISOR ---
+def advise_indexes(path, seed, shapes=None):
+    # Runs every query shape through EXPLAIN QUERY PLAN and prints the ones
+    # that still read whole tables. Returns the names of those shapes, plus
+    # any core shape that could not be checked at all.
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    table_rows = database_stats(conn, path)["rows"]
+    sampler = ParameterSampler(conn, seed)
+    full_scans = []
+    shapes = shapes or all_shapes()
+    checked = available_shapes(conn, shapes)
+    skipped = [shape for shape in shapes if shape not in checked]
+    print(f"Query plans for {path}:")
+    for shape in checked:
+        params = sampler.draw(shape["params"])
+        findings = []
+        plan = []
+        for statement in shape["statements"]:
+            for detail in (row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", params)):
+                plan.append(detail)
+                finding = classify_plan_step(detail, table_rows)
+                if finding and finding not in findings:
+                    findings.append(finding)
+        if "table scan" in findings:
+            full_scans.append(shape["name"])
+            marker = "❌"
+        elif findings:
+            marker = "⚠️ "
+        else:
+            marker = "✅"
+        print(f"  {marker} {shape['name']:<36} {', '.join(findings) or 'index lookups only'}")
+        for detail in plan:
+            print(f"       {detail}")
+    conn.close()
+    if skipped:
+        print(f"⚠️  Skipped {len(skipped)} query shapes whose tables are missing: "
+              f"{', '.join(shape['name'] for shape in skipped)}")
+    # Only the optional shapes (workflow tables, ...) may be missing
+    unchecked = [shape["name"] for shape in skipped if "requires" not in shape]
+    if unchecked:
+        print(f"❌ {len(unchecked)} core query shapes could not be checked")
+    if full_scans:
+        print(f"❌ {len(full_scans)} query shapes still scan whole tables: {', '.join(full_scans)}")
+    elif not unchecked:
+        print(f"✅ None of the {len(checked)} checked query shapes scans a whole table")
+    return full_scans + unchecked
+
+# --- MEASUREMENT ---
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * fraction // 1))
+    return sorted_values[int(rank) - 1]
+
+def run_shape(conn, shape, sampler, iterations, table_rows, index_stats):
+    samples = []
+    for iteration in range(iterations + 1):
+        params = sampler.draw(shape["params"], shape.get("vocabulary"))
+        started = time.perf_counter()
+        for statement in shape["statements"]:
+            conn.execute(statement, params).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        # The first call only warms the page cache
+        if iteration:
+            samples.append(elapsed)
+    plan = []
+    rows_scanned = 0
+    for statement in shape["statements"]:
+        statement_plan, statement_rows = explain(conn, statement, params, table_rows, index_stats)
+        plan.extend(statement_plan)
+        rows_scanned += statement_rows
+    samples.sort()
+    return {
+        "action": shape["action"],
+        "p50_ms": round(percentile(samples, 0.50), 3),
+        "p95_ms": round(percentile(samples, 0.95), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+        "rows_scanned": rows_scanned,
+        "plan": plan,
+    }
+
+def benchmark_database(path, seed, iterations, shapes, flux_weighting="uniform"):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    stats = database_stats(conn, path)
+    index_stats = index_row_estimates(conn)
+    sampler = ParameterSampler(conn, seed, flux_weighting)
+    queries = {}
+    for shape in available_shapes(conn, shapes):
+        queries[shape["name"]] = run_shape(conn, shape, sampler, iterations, stats["rows"], index_stats)
+    conn.close()
+    return stats, queries
+
+# --- WRITE OVERHEAD ---
+# Replays the same simulated run events three times inside a transaction that
+# is rolled back: history writes only ("none"), with the simulator updating
+# fluxData itself ("manual") and with the aggregate triggers ("triggers").
+WRITE_MODES = ["none", "manual", "triggers"]
+
+def load_generator_module():
+    spec = importlib.util.spec_from_file_location("generate_database", GENERATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def benchmark_writes(path, seed, events):
+    generator = load_generator_module()
+    conn = sqlite3.connect(path)
+    settings, _ = generator.load_generator_state(conn)
+    settings = settings or generator.GenerationSettings()
+    pools = generator.value_pools_for(settings, seed)
+    results = {}
+    for mode in WRITE_MODES:
+        conn.execute("BEGIN")
+        generator.drop_aggregate_triggers(conn)
+        if mode == "triggers":
+            generator.create_aggregate_triggers(conn)
+        simulator = generator.LiveSimulator(conn, settings, seed, pools, maintain_aggregates=(mode == "manual"))
+        samples = []
+        for _ in range(events):
+            started = time.perf_counter()
+            simulator.step()
+            samples.append((time.perf_counter() - started) * 1000)
+        conn.rollback()
+        samples.sort()
+        results[mode] = {
+            "events_per_second": round(events / (sum(samples) / 1000), 1),
+            "p50_ms": round(percentile(samples, 0.50), 4),
+            "p95_ms": round(percentile(samples, 0.95), 4),
+            "p99_ms": round(percentile(samples, 0.99), 4),
+            "rows_written": simulator.rows_written,
+        }
+    conn.close()
+    return results
+
+# --- REPORTING ---
+def print_scale(scale, result):
+    stats = result["database"]
+    print(f"\n{scale} fluxes: {stats['file_bytes'] / 1048576:.1f} MiB, "
+          f"{stats['rows'].get('fetchingHistory', 0)} fetches, generated in {result['generate_seconds']:.1f}s")
+    print(f"  {'query':<36} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rows scanned':>13}")
+    for name, query in result["queries"].items():
+        print(f"  {name:<36} {query['p50_ms']:>9.3f} {query['p95_ms']:>9.3f} "
+              f"{query['p99_ms']:>9.3f} {query['rows_scanned']:>13}")
+    writes = result.get("writes")
+    if writes:
+        print(f"  {'write mode':<36} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'events/s':>13}")
+        for mode, write in writes.items():
+            print(f"  {mode:<36} {write['p50_ms']:>9.4f} {write['p95_ms']:>9.4f} "
+                  f"{write['p99_ms']:>9.4f} {write['events_per_second']:>13.1f}")
+    search = result.get("search")
+    if search:
+        print(f"  {'search':<36} {'LIKE p50':>9} {'MATCH p50':>9} {'speedup':>9} {'LIKE rows':>13} {'MATCH rows':>11}")
+        for shape in SEARCH_SHAPES:
+            like = search["queries"][f"{shape['name']}_like"]
+            match = search["queries"][f"{shape['name']}_match"]
+            print(f"  {shape['name']:<36} {like['p50_ms']:>9.3f} {match['p50_ms']:>9.3f} "
+                  f"{like['p50_ms'] / max(match['p50_ms'], 0.001):>8.1f}x "
+                  f"{like['rows_scanned']:>13} {match['rows_scanned']:>11}")
+    partitions = result.get("partitions")
+    if partitions:
+        print(f"  partitioned: {partitions['main_bytes'] / 1048576:.1f} MiB main database, "
+              f"{partitions['partition_bytes'] / 1048576:.1f} MiB of partitions")
+        print(f"  {'recent window':<36} {'parts':>9} {'plain p50':>9} {'part p50':>9} {'open ms':>13}")
+        for window, measured in partitions["windows"].items():
+            for name, query in measured["queries"].items():
+                print(f"  {f'{name} {window}':<36} {len(measured['partitions']):>9} "
+                      f"{query['plain']['p50_ms']:>9.3f} {query['partitioned']['p50_ms']:>9.3f} "
+                      f"{measured['open_ms']:>13.3f}")
+    pagination = result.get("pagination")
+    if pagination:
+        print(f"  {'pagination':<36} {'rows':>9} {'offset p50':>10} {'keyset p50':>10} {'speedup':>9}")
+        for name, measured in pagination["scopes"].items():
+            for page, methods in measured["pages"].items():
+                label = f"{name} page {page}"
+                if methods is None:
+                    print(f"  {label:<36} {measured['rows']:>9} {'-':>10} {'-':>10} {'-':>9}")
+                    continue
+                offset, keyset = methods["offset"]["p50_ms"], methods["keyset"]["p50_ms"]
+                print(f"  {label:<36} {measured['rows']:>9} {offset:>10.3f} {keyset:>10.3f} "
+                      f"{offset / max(keyset, 0.001):>8.1f}x")
+    layouts = result.get("layouts")
+    if layouts:
+        plain = layouts["plain"]
+        print(f"  {'layout':<36} {'MiB':>9} {'vs plain':>9}")
+        for label, layout in layouts.items():
+            size = layout["database"]["file_bytes"]
+            print(f"  {label:<36} {size / 1048576:>9.1f} {size / plain['database']['file_bytes']:>8.0%}")
+        print(f"  {'group by':<36} {'plain p50':>9} {'view p50':>9} {'codes p50':>9}")
+        compact = layouts["compact"]["queries"]
+        for name, _, _, _ in LAYOUT_GROUP_BYS:
+            print(f"  {name:<36} {plain['queries'][f'{name}_text']['p50_ms']:>9.3f} "
+                  f"{compact[f'{name}_text']['p50_ms']:>9.3f} {compact[f'{name}_codes']['p50_ms']:>9.3f}")
+
+def compare_with_baseline(report, baseline, tolerance):
+    # A query regresses when its p95 grows by more than the tolerance or its
+    # plan visits more rows than before
+    regressions = []
+    for scale, result in report["scales"].items():
+        previous = baseline.get("scales", {}).get(scale)
+        if not previous:
+            continue
+        for name, query in result["queries"].items():
+            before = previous["queries"].get(name)
+            if not before:
+                continue
+            if query["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{scale}/{name}: p95 {before['p95_ms']:.3f} -> {query['p95_ms']:.3f} ms")
+            if query["rows_scanned"] > before["rows_scanned"]:
+                regressions.append(
+                    f"{scale}/{name}: rows scanned {before['rows_scanned']} -> {query['rows_scanned']}"
+                )
+    return regressions
+
+# --- MAIN EXECUTION ---
+def parse_scales(value):
+    try:
+        scales = [int(part) for part in value.split(",") if part]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated flux counts, got {value!r}")
+    if not scales or min(scales) < 1:
+        raise argparse.ArgumentTypeError("flux counts must be positive")
+    return scales
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the app's query shapes against generated SQLite databases. "
+                    "Arguments after -- are passed to generate-database.py."
+    )
+    parser.add_argument("--scales", type=parse_scales, default=DEFAULT_SCALES, metavar="N,N,...",
+                        help="Flux counts to benchmark, e.g. 1000,6000,60000,600000 "
+                             f"(default: {','.join(map(str, DEFAULT_SCALES))}).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="Seed for the generated data and the sampled parameters (default: %(default)s).")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help="Timed calls per query shape and scale (default: %(default)s).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Generator worker processes (default: %(default)s).")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR,
+                        help="Directory for the generated databases (default: %(default)s).")
+    parser.add_argument("--flux-weighting", choices=FLUX_WEIGHTINGS, default="uniform",
+                        help="How flux-scoped calls pick their flux: every flux with history equally "
+                             "often (uniform) or in proportion to its fetch runs (runs), which sends "
+                             "most calls to the hot fluxes of a skewed --workload (default: %(default)s).")
+    parser.add_argument("--regenerate", action="store_true",
+                        help="Rebuild the databases even if matching ones exist.")
+    parser.add_argument("--only", action="append", metavar="QUERY",
+                        help="Only run the named query shape; may be repeated.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help="Where to write the JSON report (default: %(default)s).")
+    parser.add_argument("--write-events", type=int, default=0, metavar="EVENTS",
+                        help="Also time this many simulated run events per scale with no fluxData "
+                             "maintenance, manual updates and aggregate triggers (rolled back afterwards).")
+    parser.add_argument("--compare-layouts", action="store_true",
+                        help="Also build each scale with --compact-enums and compare file size and "
+                             "GROUP BY latency of the encoded columns against the plain layout.")
+    parser.add_argument("--compare-search", action="store_true",
+                        help="Also build each scale with --search-index and compare FTS5 MATCH against "
+                             "the app's LIKE '%%term%%' scans.")
+    parser.add_argument("--compare-partitions", action="store_true",
+                        help="Also build each scale with --partition-period month and compare recent-window "
+                             f"queries ({', '.join(f'{days}d' for days in RECENT_WINDOW_DAYS)}) against the "
+                             "single-file database.")
+    parser.add_argument("--compare-pagination", action="store_true",
+                        help="Also build each scale with --keyset-pagination and compare OFFSET pages with exact "
+                             "counts against (timestamp, id) cursor pages with history_counts at pages "
+                             f"{', '.join(map(str, PAGINATION_PAGES))}.")
+    parser.add_argument("--advise", metavar="DATABASE",
+                        help="Only print the query plans for an existing database and report the "
+                             "shapes that still scan whole tables.")
+    parser.add_argument("--baseline", metavar="JSON",
+                        help="Compare against an earlier report and exit non-zero on regressions.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative p95 growth before a query counts as regressed "
+                             "(default: %(default)s).")
+    args, generator_args = parser.parse_known_args()
+    if generator_args[:1] == ["--"]:
+        generator_args = generator_args[1:]
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+    shapes = all_shapes()
+    if args.only:
+        unknown = set(args.only) - {shape["name"] for shape in shapes}
+        if unknown:
+            parser.error(f"unknown query shapes: {', '.join(sorted(unknown))}")
+        shapes = [shape for shape in shapes if shape["name"] in args.only]
+    return args, generator_args, shapes
+
+def main():
+    args, generator_args, shapes = parse_args()
+    if args.advise:
+        if advise_indexes(args.advise, args.seed, shapes):
+            sys.exit(1)
+        return
+    os.makedirs(args.workdir, exist_ok=True)
+    report = {
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "sqlite_version": sqlite3.sqlite_version,
+        "seed": args.seed,
+        "iterations": args.iterations,
+        "flux_weighting": args.flux_weighting,
+        "generator_args": generator_args,
+        "scales": {},
+    }
+    print("Preparing databases...")
+    for scale in args.scales:
+        path, generate_seconds = ensure_database(
+            args.workdir, scale, args.seed, args.workers, generator_args, args.regenerate
+        )
+        stats, queries = benchmark_database(path, args.seed, args.iterations, shapes, args.flux_weighting)
+        report["scales"][str(scale)] = {
+            "generate_seconds": round(generate_seconds, 3),
+            "database": stats,
+            "queries": queries,
+        }
+        if args.write_events:
+            report["scales"][str(scale)]["writes"] = benchmark_writes(path, args.seed, args.write_events)
+        if args.compare_search:
+            report["scales"][str(scale)]["search"] = compare_search(
+                args.workdir, scale, args.seed, args.iterations, args.workers, generator_args, args.regenerate
+            )
+        if args.compare_partitions:
+            report["scales"][str(scale)]["partitions"] = compare_partitions(
+                args.workdir, scale, args.seed, args.iterations, args.workers, generator_args, args.regenerate
+            )
+        if args.compare_pagination:
+            report["scales"][str(scale)]["pagination"] = compare_pagination(
+                args.workdir, scale, args.seed, args.iterations, args.workers, generator_args, args.regenerate
+            )
+        if args.compare_layouts:
+            report["scales"][str(scale)]["layouts"] = compare_layouts(
+                args.workdir, scale, args.seed, args.iterations, args.workers, generator_args, args.regenerate
+            )
+        print_scale(scale, report["scales"][str(scale)])
+
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\n✅ Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
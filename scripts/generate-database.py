@@ -1,13 +1,46 @@
+import argparse
+import cProfile
+import csv
+import hashlib
+import importlib.util
 import sqlite3
 import os
 import json
+import math
+import pstats
 import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from multiprocessing import Pool
 from datetime import datetime, timezone, timedelta
+import numpy as np
 from faker import Faker
+from faker.providers.file import Provider as FileProvider
 
 # --- CONSTANTS AND VALUE LISTS ---
 TOTAL_FLUXES = 6000
 DB_FILENAME = "hillmetrics.db"
+HISTORY_DEPTH = (5, 50)
+CONTENTS_PER_FETCH = (1, 5)
+WINDOW_START = datetime(2022, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+WINDOW_END = datetime(2025, 6, 27, 12, 0, 0, tzinfo=timezone.utc)
+HISTORY_DISTRIBUTIONS = ["uniform", "triangular", "exponential"]
+WORKLOAD_PROFILES = ["uniform", "zipfian", "schedule"]
+HOT_FLUX_RUNS = 200000
+HOT_FLUX_TYPES = ["Email", "SFTP"]
+ZIPF_EXPONENT = 1.2
+MIN_RUN_SPACING = 60
+# Runs generated between flush checks inside one flux
+HOT_FLUX_FLUSH_RUNS = 1000
+DEFAULT_POOL_SIZE = 1000
+DEFAULT_INDEX_PROFILE = "app"
 
 SOURCES = ["Option 1", "Option 2", "Option 3", "Option 4"]
 FLUX_STATES = {"ACTIVE": "Active", "DISABLED": "Disabled", "BACK_OFFICE": "Back office only"}
@@ -37,6 +70,21 @@ PROCESSING_ERROR_MESSAGES = [
     "Exception Error", "Row Count Mismatch", "Insertion Error", "Financial Identifier Not Found"
 ]
 
+NORMALIZATION_ERROR_MESSAGES = [
+    "Unknown Column Mapping", "Invalid Date Format", "Invalid Number Format", "Missing Mandatory Field",
+    "Currency Not Found", "Unit Conversion Error", "Undefined"
+]
+
+REFINEMENT_ERROR_MESSAGES = [
+    "Duplicate Record", "Reference Data Not Found", "Validation Rule Failed", "Inconsistent Identifier",
+    "Outlier Rejected", "Undefined"
+]
+
+CALCULATION_ERROR_MESSAGES = [
+    "Missing Price Data", "Insufficient History", "Division By Zero", "Calculation Timeout",
+    "Benchmark Not Found", "Undefined"
+]
+
 # Initialize Faker
 fake = Faker()
 
@@ -50,39 +98,131 @@ def random_int(min_val, max_val):
 def random_bool(probability=0.5):
     return random.random() < probability
 
-# Generate createdAt per distribution
-fixed_now = datetime(2025, 6, 27, 12, 0, 0, tzinfo=timezone.utc)
-
-def generate_created_at(index):
-    percentage = index / TOTAL_FLUXES
-    if percentage < 0.5:
-        year = 2025
-        if percentage < 0.05:
-            month = 6  # June
-            if random_bool(0.2):
-                day = random_int(20, 27)
-            else:
-                day = random_int(1, 19)
-        else:
-            month = random_int(1, 5)  # Jan-May
-            day = random_int(1, 28)
-    elif percentage < 0.65:
-        year = 2024
-        month = random_int(1, 12)
-        day = random_int(1, 28)
-    elif percentage < 0.8:
-        year = 2023
-        month = random_int(1, 12)
-        day = random_int(1, 28)
-    else:
-        year = 2022
-        month = random_int(1, 12)
-        day = random_int(1, 28)
+# --- GENERATION SETTINGS ---
+@dataclass
+class GenerationSettings:
+    total_fluxes: int = TOTAL_FLUXES
+    history_min: int = HISTORY_DEPTH[0]
+    history_max: int = HISTORY_DEPTH[1]
+    history_distribution: str = "uniform"
+    contents_min: int = CONTENTS_PER_FETCH[0]
+    contents_max: int = CONTENTS_PER_FETCH[1]
+    window_start: str = WINDOW_START.strftime("%Y-%m-%dT%H:%M:%SZ")
+    window_end: str = WINDOW_END.strftime("%Y-%m-%dT%H:%M:%SZ")
+    faker_values: bool = False
+    pool_size: int = DEFAULT_POOL_SIZE
+    rollups: bool = False
+    index_profile: str = DEFAULT_INDEX_PROFILE
+    aggregate_triggers: bool = False
+    timestamp_format: str = "iso"
+    compact_enums: bool = False
+    search_index: bool = False
+    partition_period: str = "none"
+    workload: str = "uniform"
+    hot_flux_runs: int = HOT_FLUX_RUNS
+    workflow_stages: bool = False
+    keyset_pagination: bool = False
+    payloads: bool = False
+    payload_max_bytes: int = 0
+
+    @property
+    def layout(self):
+        return StorageLayout(self.timestamp_format, self.compact_enums)
+
+    @property
+    def start(self):
+        return parse_timestamp(self.window_start)
+
+    @property
+    def now(self):
+        return parse_timestamp(self.window_end)
+
+def parse_timestamp(value):
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
 
-    date = datetime(year, month, day,
-                    random_int(0, 23), random_int(0, 59), random_int(0, 59),
-                    tzinfo=timezone.utc)
-    return date
+def random_history_depth(settings):
+    low, high = settings.history_min, settings.history_max
+    if settings.history_distribution == "triangular":
+        # Most fluxes near the minimum, a long tail up to the maximum
+        return int(round(random.triangular(low, high, low)))
+    if settings.history_distribution == "exponential":
+        return min(high, low + int(random.expovariate(4 / max(1, high - low))))
+    return random_int(low, high)
+
+# Workload profiles decide how many fetch runs a flux gets and how far apart
+# they are. uniform is the original shape: a --history-depth draw and one run
+# per day from createdAt. zipfian gives the flux of popularity rank r about
+# hot_flux_runs / r^1.2 runs spread from createdAt to now. schedule follows
+# the fetch schedule's interval up to now; only Email and SFTP feeds may go
+# past --history-depth's maximum, up to hot_flux_runs.
+def workload_ranks(settings, seed):
+    # A fixed permutation of the flux IDs (stream 0, which no flux uses), so
+    # shards and resumed runs agree on every flux's rank
+    if settings.workload != "zipfian":
+        return None
+    return (np.random.default_rng([seed, 0]).permutation(settings.total_fluxes) + 1).tolist()
+
+def schedule_interval(config):
+    # Seconds between runs of a fetch schedule; None if it does not repeat by itself
+    if "intervalMinutes" in config:
+        return config["intervalMinutes"] * 60
+    if "intervalHours" in config:
+        return config["intervalHours"] * 3600
+    if "intervalDays" in config:
+        return config["intervalDays"] * 86400
+    if config.get("type") == "Monthly":
+        return 30 * 86400
+    if config.get("type") == "Specific":
+        return 86400
+    return None
+
+def history_plan(flux_id, created_at, fetch_cfg, flux_type, settings, ranks):
+    # (runs, seconds between runs, first run). A spacing of None keeps the
+    # uniform profile's one run per day with a random offset.
+    now = settings.now
+    elapsed = max(0, int((now - created_at).total_seconds()))
+    if settings.workload == "zipfian":
+        depth = random_history_depth(settings)
+        hot = int(settings.hot_flux_runs / ranks[flux_id - 1] ** ZIPF_EXPONENT)
+        if hot <= depth:
+            return depth, None, created_at
+        depth = max(depth, min(hot, elapsed // MIN_RUN_SPACING))
+        return depth, max(MIN_RUN_SPACING, elapsed // depth), created_at
+    if settings.workload == "schedule":
+        interval = schedule_interval(fetch_cfg)
+        if interval is None:
+            return random_history_depth(settings), None, created_at
+        cap = settings.hot_flux_runs if flux_type in HOT_FLUX_TYPES else settings.history_max
+        runs = elapsed // interval
+        if runs > cap:
+            # Only the latest runs fit: they end at now instead of starting at createdAt
+            return cap, interval, now - timedelta(seconds=cap * interval)
+        return max(settings.history_min, runs), interval, created_at
+    return random_history_depth(settings), None, created_at
+
+# Generate createdAt per distribution: the first 5% of fluxes fall in the month
+# of the window end (a fifth of those in its last week), the next 45% earlier in
+# that year and the rest anywhere in the older part of the window.
+def generate_created_at(index, settings):
+    now = settings.now
+    start = settings.start
+    percentage = index / settings.total_fluxes
+    month_start = max(start, now.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+    year_start = max(start, now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0))
+    if percentage < 0.05:
+        last_week = max(month_start, now - timedelta(days=7))
+        low, high = (last_week, now) if random_bool(0.2) else (month_start, last_week)
+    elif percentage < 0.5:
+        low, high = year_start, month_start
+    else:
+        low, high = start, year_start
+    if high <= low:
+        # The window is too short for this segment
+        low, high = start, now
+    return low + timedelta(seconds=random_int(0, int((high - low).total_seconds())))
 
 # Generate JSON config for schedule
 def generate_schedule_config(type_):
@@ -107,31 +247,31 @@ def generate_schedule_config(type_):
     return {}
 
 # Generate JSON config for fluxType
-def generate_flux_type_config(flux_type):
+def generate_flux_type_config(flux_type, draws):
     if flux_type == "Email":
         return {
             "contentLocation": "Body",
-            "emailRuleGroup": [{"criteria": [{"field": "Subject", "operator": "Contains", "value": fake.word()}]}],
-            "metadata": {"source": fake.email()}
+            "emailRuleGroup": [{"criteria": [{"field": "Subject", "operator": "Contains", "value": draws.text("word")}]}],
+            "metadata": {"source": draws.text("email")}
         }
     if flux_type == "API":
-        return {"apiUrl": fake.url(), "apiKey": fake.uuid4(), "metadata": {"version": "v1"}}
+        return {"apiUrl": draws.text("url"), "apiKey": draws.text("uuid4"), "metadata": {"version": "v1"}}
     if flux_type == "HTTP Download":
-        return {"url": fake.url(), "contentType": "application/json", "metadata": {}}
+        return {"url": draws.text("url"), "contentType": "application/json", "metadata": {}}
     if flux_type == "SFTP":
         return {
-            "host": fake.domain_name(),
+            "host": draws.text("domain_name"),
             "port": 22,
-            "user": fake.user_name(),
-            "password": fake.password(),
+            "user": draws.text("user_name"),
+            "password": draws.text("password"),
             "deleteAfterDownload": random_bool(),
             "useSshKey": random_bool(0.2),
             "fileGroups": [{"path": "/remote/path/", "pattern": "*.csv"}]
         }
     if flux_type == "Webhook":
-        return {"url": f"{fake.url()}/webhook", "apiKey": fake.uuid4(), "metadata": {}}
+        return {"url": f"{draws.text('url')}/webhook", "apiKey": draws.text("uuid4"), "metadata": {}}
     if flux_type == "Scraping":
-        return {"url": fake.url(), "contentType": "text/html", "metadata": {"selector": ".data-table"}}
+        return {"url": draws.text("url"), "contentType": "text/html", "metadata": {"selector": ".data-table"}}
     if flux_type == "Manual":
         return {"url": "manual_upload", "contentType": "user_defined", "metadata": {}}
     return {}
@@ -143,8 +283,134 @@ def generate_short_content_name(long_name):
         return "_".join(parts[:3])[:50]
     return long_name[:50]
 
+# --- VALUE GENERATION ---
+# Per-row random values are drawn through a FluxDraws object, created per flux.
+# take(column) returns the next value of a numeric column described in
+# column_specs(); text(pool) returns a fake text value of the given kind.
+CONTENT_EXTENSIONS = ["csv", "xls", "json", "xml"]
+TEXT_POOLS = ["company", "sentence", "paragraph", "word", "email", "url",
+              "domain_name", "user_name", "password", "mime_type"]
+
+def column_specs(settings):
+    # (kind, argument): "int" draws from an inclusive range, "roll" is uniform
+    # in [0, 1) and "choice" picks from a list.
+    return {
+        "fetch_status_roll": ("roll", None),
+        "fetch_offset": ("int", (1000, 100000)),
+        "fetch_duration": ("int", (5, 120)),
+        "fetch_progress_current": ("int", (10, 90)),
+        "fetch_progress_failed": ("int", (0, 80)),
+        "num_content": ("int", (settings.contents_min, settings.contents_max)),
+        "fetch_error": ("choice", FETCHING_ERROR_MESSAGES),
+        "content_extension": ("choice", CONTENT_EXTENSIONS),
+        "content_file_size": ("int", (1024, 1024*1024)),
+        "content_length": ("int", (1000, 1024*1000)),
+        "processing_roll": ("roll", None),
+        "processing_status_roll": ("roll", None),
+        "processing_offset": ("int", (10000, 60000)),
+        "processing_duration": ("int", (10, 300)),
+        "processing_progress_current": ("int", (10, 90)),
+        "processing_progress_failed": ("int", (0, 80)),
+        "processing_error": ("choice", PROCESSING_ERROR_MESSAGES),
+        "content_processing_offset": ("int", (1000, 5000)),
+        "content_processing_duration": ("int", (5, 60)),
+        "rows_inserted": ("int", (50, 200)),
+        "rows_updated": ("int", (0, 50)),
+        "rows_ignored": ("int", (0, 10)),
+        "stage_roll": ("roll", None),
+        "stage_status_roll": ("roll", None),
+        "stage_offset": ("int", (30, 1800)),
+        "stage_duration": ("int", (5, 600)),
+        "stage_progress_current": ("int", (10, 90)),
+        "stage_progress_failed": ("int", (0, 80)),
+        "normalization_error": ("choice", NORMALIZATION_ERROR_MESSAGES),
+        "refinement_error": ("choice", REFINEMENT_ERROR_MESSAGES),
+        "calculation_error": ("choice", CALCULATION_ERROR_MESSAGES),
+    }
+
+class FakerDraws:
+    # The original path: one random/Faker call per value. Kept behind
+    # --faker-values for realism comparisons.
+    def __init__(self, specs, seed, flux_id):
+        self.specs = specs
+        seed_flux(seed, flux_id)
+
+    def take(self, column):
+        kind, argument = self.specs[column]
+        if kind == "int":
+            return random_int(*argument)
+        if kind == "roll":
+            return random.random()
+        return random_item(argument)
+
+    def text(self, pool):
+        return getattr(fake, pool)()
+
+    def file_name(self, extension):
+        return fake.file_name(extension=extension)
+
+    def content_hash(self):
+        return fake.hexify('^'*64)
+
+class PooledDraws:
+    # Draws each column in NumPy chunks from a per-flux generator and samples
+    # text from pools built once per run.
+    CHUNK_MIN = 16
+    CHUNK_MAX = 4096
+
+    def __init__(self, specs, pools, seed, flux_id):
+        self.specs = specs
+        self.pools = pools
+        self.rng = np.random.default_rng([seed, flux_id])
+        self.columns = {}
+        # Flux-level values still come from the random module
+        random.seed(f"{seed}:{flux_id}")
+
+    def _next(self, column, draw):
+        buffered = self.columns.get(column)
+        if buffered is None or buffered[1] == len(buffered[0]):
+            size = self.CHUNK_MIN if buffered is None else min(self.CHUNK_MAX, len(buffered[0]) * 2)
+            buffered = self.columns[column] = [draw(size), 0]
+        buffered[1] += 1
+        return buffered[0][buffered[1] - 1]
+
+    def _draw(self, column, size):
+        kind, argument = self.specs[column]
+        if kind == "int":
+            return self.rng.integers(argument[0], argument[1] + 1, size).tolist()
+        if kind == "roll":
+            return self.rng.random(size).tolist()
+        return [argument[index] for index in self.rng.integers(0, len(argument), size).tolist()]
+
+    def take(self, column):
+        return self._next(column, lambda size: self._draw(column, size))
+
+    def text(self, pool):
+        if pool == "uuid4":
+            return self._next(pool, lambda size: [
+                str(uuid.UUID(bytes=self.rng.bytes(16), version=4)) for _ in range(size)
+            ])
+        values = self.pools[pool]
+        return self._next(pool, lambda size: [values[index] for index in self.rng.integers(0, len(values), size).tolist()])
+
+    def file_name(self, extension):
+        return f"{self.text('word')}.{extension}"
+
+    def content_hash(self):
+        def draw(size):
+            digits = self.rng.bytes(32 * size).hex()
+            return [digits[start:start + 64] for start in range(0, len(digits), 64)]
+        return self._next("hash", draw)
+
+def build_value_pools(seed, size=DEFAULT_POOL_SIZE):
+    pool_faker = Faker()
+    pool_faker.seed_instance(f"{seed}:pools")
+    return {pool: [getattr(pool_faker, pool)() for _ in range(size)] for pool in TEXT_POOLS}
+
 # --- DATABASE SCHEMA CREATION ---
-def create_schema(conn):
+def create_schema(conn, index_profile=DEFAULT_INDEX_PROFILE, rollups=False, layout=None, workflow_stages=False,
+                  keyset_pagination=False):
+    layout = layout or DEFAULT_LAYOUT
     schema = """
     PRAGMA foreign_keys = ON;
 
@@ -243,25 +509,1615 @@ def create_schema(conn):
         FOREIGN KEY (processingID) REFERENCES processingHistory(processingID) ON DELETE CASCADE,
         FOREIGN KEY (contentID) REFERENCES content_items(contentID) ON DELETE CASCADE
     );
+    """
+    conn.executescript(layout_schema(schema, layout))
+    if layout.compact:
+        create_code_tables(conn)
+    create_views(conn, layout)
+    if rollups:
+        create_rollup_tables(conn)
+    if workflow_stages:
+        create_stage_tables(conn, layout)
+    if keyset_pagination:
+        conn.execute(HISTORY_COUNTS_TABLE)
+    if index_profile:
+        create_indexes(conn, index_profile, layout)
 
+# Secondary index sets. "minimal" covers the foreign keys only. "app" is built
+# for the query shapes of app/actions (see benchmark-queries.py --advise):
+# history pages sorted by timestamp per flux and overall, status and duration
+# aggregates answered from covering indexes, error types from partial indexes
+# over the failed runs only, and child lookups by fetchingID.
+INDEX_PROFILES = {
+    "minimal": """
     CREATE INDEX idx_fetchinghistory_fluxid ON fetchingHistory(fluxID);
     CREATE INDEX idx_processinghistory_fluxid ON processingHistory(fluxID);
     CREATE INDEX idx_contentitems_fluxid ON content_items(fluxID);
     CREATE INDEX idx_processing_content_history_processingid ON processing_content_history(processingID);
     CREATE INDEX idx_processing_content_history_contentid ON processing_content_history(contentID);
+    """,
+    "app": """
+    CREATE INDEX idx_fetchinghistory_fluxid_timestamp
+        ON fetchingHistory(fluxID, timestamp DESC, status, fetchingTimeInSeconds);
+    CREATE INDEX idx_fetchinghistory_status_timestamp ON fetchingHistory(status, timestamp);
+    CREATE INDEX idx_fetchinghistory_timestamp_status ON fetchingHistory(timestamp, status);
+    CREATE INDEX idx_fetchinghistory_duration
+        ON fetchingHistory(fetchingTimeInSeconds) WHERE fetchingTimeInSeconds IS NOT NULL;
+    CREATE INDEX idx_fetchinghistory_errormessage
+        ON fetchingHistory(errorMessage) WHERE errorMessage IS NOT NULL;
+    CREATE INDEX idx_fetchinghistory_fluxid_errormessage
+        ON fetchingHistory(fluxID, errorMessage) WHERE errorMessage IS NOT NULL;
+    CREATE INDEX idx_processinghistory_fluxid_timestamp
+        ON processingHistory(fluxID, timestamp DESC, status, processingTimeInSeconds);
+    CREATE INDEX idx_processinghistory_status_timestamp ON processingHistory(status, timestamp);
+    CREATE INDEX idx_processinghistory_timestamp_status ON processingHistory(timestamp, status);
+    CREATE INDEX idx_processinghistory_duration
+        ON processingHistory(processingTimeInSeconds) WHERE processingTimeInSeconds IS NOT NULL;
+    CREATE INDEX idx_processinghistory_errormessage
+        ON processingHistory(errorMessage) WHERE errorMessage IS NOT NULL;
+    CREATE INDEX idx_processinghistory_fluxid_errormessage
+        ON processingHistory(fluxID, errorMessage) WHERE errorMessage IS NOT NULL;
+    CREATE INDEX idx_processinghistory_fetchingid ON processingHistory(fetchingID, timestamp DESC);
+    CREATE INDEX idx_contentitems_fluxid ON content_items(fluxID);
+    CREATE INDEX idx_contentitems_fetchingid ON content_items(fetchingID);
+    CREATE INDEX idx_processing_content_history_processingid ON processing_content_history(processingID);
+    CREATE INDEX idx_processing_content_history_contentid ON processing_content_history(contentID);
+    """,
+}
+
+# Extra indexes on the epoch copies of "both"; "epoch" gets the profile's
+# indexes on its INTEGER columns instead
+EPOCH_INDEXES = """
+    CREATE INDEX idx_fetchinghistory_fluxid_timestampepoch ON fetchingHistory(fluxID, timestampEpoch DESC);
+    CREATE INDEX idx_fetchinghistory_timestampepoch ON fetchingHistory(timestampEpoch);
+    CREATE INDEX idx_processinghistory_fluxid_timestampepoch ON processingHistory(fluxID, timestampEpoch DESC);
+    CREATE INDEX idx_processinghistory_timestampepoch ON processingHistory(timestampEpoch);
     """
-    conn.executescript(schema)
+
+def create_indexes(conn, index_profile=DEFAULT_INDEX_PROFILE, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    indexes = INDEX_PROFILES[index_profile]
+    if layout.timestamp_format == "both":
+        indexes += EPOCH_INDEXES
+    if conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'normalization_history'").fetchone():
+        indexes += STAGE_INDEXES
+    if conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'history_counts'").fetchone():
+        indexes += KEYSET_INDEXES
+    # Indexes go on the stored tables, never on the views
+    conn.executescript(re.sub(r"\bON (\w+)\(", lambda match: f"ON {layout.table(match[1])}(", indexes))
+
+# --- TIMESTAMP STORAGE ---
+# History timestamps are stored as "iso" text (the app's format), "both" (the
+# text plus an INTEGER epoch-second copy named <column>Epoch) or "epoch"
+# (INTEGER epoch seconds only, in <table>_epoch tables behind views that keep
+# the original table names and ISO text). fluxData keeps its text columns.
+# The epoch views also pass the stored seconds through as trailing
+# <column>Epoch columns, named and ordered as in "both": the ISO text is
+# computed, so sorting or filtering on it cannot use the timestamp indexes,
+# while the <column>Epoch columns can.
+TIMESTAMP_FORMATS = ["iso", "both", "epoch"]
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+EPOCH_COLUMNS = {
+    "fetchingHistory": ("timestamp", "completedAt"),
+    "content_items": ("createdAt", "modifiedAt"),
+    "processingHistory": ("timestamp", "completedAt"),
+    "processing_content_history": ("processingStartTime", "processingEndTime"),
+}
+
+def row_columns(table, layout=None):
+    # Column order of the rows generate_data emits for a table
+    columns = TABLE_COLUMNS[table]
+    if layout is not None and layout.timestamp_format == "both":
+        columns += tuple(f"{column}Epoch" for column in EPOCH_COLUMNS.get(table, ()))
+    return columns
+
+def timestamp_schema(schema, timestamp_format):
+    for table, columns in EPOCH_COLUMNS.items():
+        match = re.search(rf"CREATE TABLE {table} \((.*?)\n    \);", schema, re.DOTALL)
+        body = match[1]
+        if timestamp_format == "both":
+            extra = "".join(f"\n        {column}Epoch INTEGER," for column in columns)
+            body = body.replace("\n        FOREIGN KEY", extra + "\n        FOREIGN KEY", 1)
+        else:
+            for column in columns:
+                body = re.sub(rf"(\n        {column}) TEXT", r"\1 INTEGER", body)
+        schema = schema.replace(match[1], body)
+    return schema
+
+class TimestampColumns:
+    # Formats a row's timestamps for the storage format. Only "iso" and "both"
+    # pay for strftime; "epoch" stores plain integers.
+    def __init__(self, timestamp_format):
+        self.epoch = timestamp_format == "epoch"
+        self.both = timestamp_format == "both"
+
+    def value(self, moment):
+        if moment is None:
+            return None
+        if self.epoch:
+            return int(moment.timestamp())
+        return moment.strftime(ISO_FORMAT)
+
+    def extras(self, *moments):
+        # Trailing <column>Epoch values of "both"
+        if not self.both:
+            return ()
+        return tuple(None if moment is None else int(moment.timestamp()) for moment in moments)
+
+def iso_timestamp(value):
+    if value is None or isinstance(value, str):
+        return value
+    return datetime.fromtimestamp(value, timezone.utc).strftime(ISO_FORMAT)
+
+# --- DICTIONARY ENCODING ---
+# With --compact-enums the low-cardinality text columns hold small integer
+# codes into one <enumeration>Codes lookup table per enumeration. Codes follow
+# the value lists below, so every shard and every run agrees on them; Faker's
+# MIME types come from its fixed catalogue.
+FILE_MIME_TYPES = sorted({mime for mimes in FileProvider.mime_types.values() for mime in mimes})
+ENUMERATIONS = {
+    "status": list(dict.fromkeys([*FETCHING_STATUSES.values(), *PROCESSING_STATUSES.values()])),
+    "errorMessage": list(dict.fromkeys(FETCHING_ERROR_MESSAGES + PROCESSING_ERROR_MESSAGES)),
+    "source": SOURCES,
+    "fluxState": list(FLUX_STATES.values()),
+    "financialType": FINANCIAL_TYPES,
+    "fluxType": FLUX_TYPES,
+    "fileType": CONTENT_EXTENSIONS,
+    "mimeType": FILE_MIME_TYPES,
+    "encoding": ["UTF-8"],
+}
+# Encoded column -> enumeration, per table
+CODED_COLUMNS = {
+    "fluxData": {
+        "source": "source", "fluxState": "fluxState", "financialType": "financialType", "fluxType": "fluxType",
+        "fetchingStatus": "status", "processingStatus": "status",
+    },
+    "fetchingHistory": {"status": "status", "errorMessage": "errorMessage"},
+    "content_items": {"fileType": "fileType", "mimeType": "mimeType", "encoding": "encoding"},
+    "processingHistory": {"status": "status", "errorMessage": "errorMessage"},
+    "processing_content_history": {"status": "status"},
+}
+
+def code_table(enumeration):
+    return f"{enumeration}Codes"
+
+def create_code_tables(conn):
+    for enumeration, values in ENUMERATIONS.items():
+        conn.execute(f"CREATE TABLE {code_table(enumeration)} (code INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+        conn.executemany(f"INSERT INTO {code_table(enumeration)} (code, value) VALUES (?, ?)",
+                         enumerate(values, 1))
+
+def compact_schema(schema):
+    for table, columns in CODED_COLUMNS.items():
+        match = re.search(rf"CREATE TABLE {table} \((.*?)\n    \);", schema, re.DOTALL)
+        body = match[1]
+        for column in columns:
+            body = re.sub(rf"(\n        {column}) (TEXT|VARCHAR\(\d+\))", r"\1 INTEGER", body)
+        schema = schema.replace(match[1], body)
+    return schema
+
+# --- STORAGE LAYOUT ---
+class StorageLayout:
+    # How the core tables are stored. A table whose columns are not stored the
+    # way the app reads them (epoch timestamps, dictionary codes) is named
+    # <table>_epoch or <table>_compact and sits behind a view with the original
+    # name that converts them back.
+    def __init__(self, timestamp_format="iso", compact=False):
+        self.timestamp_format = timestamp_format
+        self.compact = compact
+
+    def table(self, table):
+        if self.compact and table in CODED_COLUMNS:
+            return f"{table}_compact"
+        if self.timestamp_format == "epoch" and table in EPOCH_COLUMNS:
+            return f"{table}_epoch"
+        return table
+
+    def has_views(self):
+        return any(self.table(table) != table for table in TABLE_COLUMNS)
+
+    def encoders(self, table):
+        # (row index, value -> code) for the coded columns of an emitted row
+        if not self.compact:
+            return []
+        columns = row_columns(table, self)
+        return [
+            (columns.index(column), {value: code for code, value in enumerate(ENUMERATIONS[enumeration], 1)})
+            for column, enumeration in CODED_COLUMNS.get(table, {}).items()
+        ]
+
+def layout_schema(schema, layout):
+    if layout.timestamp_format != "iso":
+        schema = timestamp_schema(schema, layout.timestamp_format)
+    if layout.compact:
+        schema = compact_schema(schema)
+    for table in TABLE_COLUMNS:
+        if layout.table(table) != table:
+            schema = re.sub(rf"\b(CREATE TABLE|REFERENCES) {table}\b", rf"\1 {layout.table(table)}", schema)
+    return schema
+
+def create_views(conn, layout):
+    for table in TABLE_COLUMNS:
+        stored = layout.table(table)
+        if stored == table:
+            continue
+        select, joins, epochs = [], [], []
+        # The stored table's column order, so SELECT * matches the plain layout
+        # (and "both", with the raw epoch columns last)
+        for column in [row[1] for row in conn.execute(f"PRAGMA table_info({stored})")]:
+            if layout.timestamp_format == "epoch" and column in EPOCH_COLUMNS.get(table, ()):
+                select.append(f"strftime('{ISO_FORMAT}', {stored}.{column}, 'unixepoch') AS {column}")
+                epochs.append(f"{stored}.{column} AS {column}Epoch")
+            elif layout.compact and column in CODED_COLUMNS.get(table, {}):
+                # LEFT JOINs on the code's primary key are dropped by the planner
+                # for queries that do not read the column
+                alias = f"{column}_code"
+                select.append(f"{alias}.value AS {column}")
+                joins.append(f"LEFT JOIN {code_table(CODED_COLUMNS[table][column])} {alias} "
+                             f"ON {alias}.code = {stored}.{column}")
+            else:
+                select.append(f"{stored}.{column}")
+        conn.execute(f"CREATE VIEW {table} AS SELECT {', '.join(select + epochs)} FROM {stored} {' '.join(joins)}")
+
+def stored_layout(conn):
+    tables = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+    compact = "fluxData_compact" in tables
+    history = "fetchingHistory_compact" if compact else "fetchingHistory"
+    if "fetchingHistory_epoch" in tables:
+        history = "fetchingHistory_epoch"
+    declared = {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA main.table_info({history})")}
+    if "timestampEpoch" in declared:
+        timestamp_format = "both"
+    elif declared.get("timestamp") == "INTEGER":
+        timestamp_format = "epoch"
+    else:
+        timestamp_format = "iso"
+    return StorageLayout(timestamp_format, compact)
+
+DEFAULT_LAYOUT = StorageLayout()
+
+# --- ROLLUP TABLES ---
+# Pre-aggregated counts behind the dashboard aggregate endpoints. Each row
+# counts the runs of one day that share a value of one dimension: "status",
+# "duration" (the buckets of getFetchingDurationBuckets) or "error" (the
+# distinct errorMessage). The daily trend is the "status" dimension by day.
+ROLLUP_TABLES = {
+    "fetchingRollupDaily": "fetchingHistory",
+    "fetchingRollupGlobal": "fetchingHistory",
+    "processingRollupDaily": "processingHistory",
+    "processingRollupGlobal": "processingHistory",
+}
+
+ROLLUP_DAILY_COLUMNS = """
+    fluxID INTEGER NOT NULL,
+    dimension TEXT NOT NULL,
+    day TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (fluxID, dimension, day, value)
+"""
+
+ROLLUP_GLOBAL_COLUMNS = """
+    dimension TEXT NOT NULL,
+    day TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, day, value)
+"""
+
+def rollup_table_definition(table):
+    columns = ROLLUP_GLOBAL_COLUMNS if table in ACCUMULATING_TABLES else ROLLUP_DAILY_COLUMNS
+    return f"CREATE TABLE IF NOT EXISTS {table} ({columns})"
+
+def create_rollup_tables(conn):
+    for table in ROLLUP_TABLES:
+        conn.execute(rollup_table_definition(table) + " WITHOUT ROWID")
+
+def existing_tables(conn):
+    # TABLE_COLUMNS tables present in the main database, in flush order
+    present = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+    layout = stored_layout(conn)
+    return [table for table in TABLE_COLUMNS if layout.table(table) in present]
+
+# --- WORKFLOW STAGES ---
+# With --workflow-stages a successful processing run continues through
+# normalization, refinement and calculation. Each stage run is keyed off the
+# run of the stage before it and only follows a successful one, so a workflow
+# is one fetch and the chain of runs behind it. Stage tables hold ISO text
+# whatever --timestamps says, and are never dictionary-encoded.
+STAGE_STATUSES = {"SUCCESS": "Success", "FAILED": "Failed"}
+# Share of successful runs the next stage picks up
+STAGE_CONTINUE_RATE = 0.9
+# Stage table -> (ID column, parent table, parent ID column, duration column,
+# running status, error message draw column), in pipeline order
+WORKFLOW_STAGES = {
+    "normalization_history": (
+        "normalizationID", "processingHistory", "processingID", "normalizationTimeInSeconds",
+        "Currently normalizing", "normalization_error",
+    ),
+    "refinement_history": (
+        "refinementID", "normalization_history", "normalizationID", "refinementTimeInSeconds",
+        "Currently refining", "refinement_error",
+    ),
+    "calculation_history": (
+        "calculationID", "refinement_history", "refinementID", "calculationTimeInSeconds",
+        "Currently calculating", "calculation_error",
+    ),
+}
+
+STAGE_TABLE_TEMPLATE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    {id_column} INTEGER PRIMARY KEY AUTOINCREMENT,
+    fluxID INTEGER NOT NULL,
+    {parent_column} INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    completedAt TEXT,
+    {duration_column} INTEGER,
+    progress REAL,
+    numberOfItems INTEGER,
+    errorMessage TEXT,
+    FOREIGN KEY (fluxID) REFERENCES {flux_table}(id) ON DELETE CASCADE,
+    FOREIGN KEY ({parent_column}) REFERENCES {parent_table}({parent_column}) ON DELETE CASCADE
+)"""
+
+# Activity pages per flux and overall, newest first, and the parent lookups
+# that walk a workflow's chain
+STAGE_INDEXES = "".join(
+    f"""
+    CREATE INDEX idx_{table.replace('_', '')}_fluxid_timestamp ON {table}(fluxID, timestamp DESC);
+    CREATE INDEX idx_{table.replace('_', '')}_timestamp ON {table}(timestamp);
+    CREATE INDEX idx_{table.replace('_', '')}_{parent_column.lower()} ON {table}({parent_column});
+    """
+    for table, (_, _, parent_column, _, _, _) in WORKFLOW_STAGES.items()
+)
+
+def create_stage_tables(conn, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    for table, (id_column, parent_table, parent_column, duration_column, _, _) in WORKFLOW_STAGES.items():
+        conn.execute(STAGE_TABLE_TEMPLATE.format(
+            table=table, id_column=id_column, parent_column=parent_column, duration_column=duration_column,
+            flux_table=layout.table("fluxData"), parent_table=layout.table(parent_table),
+        ))
+
+# The app reads these three as Postgres (materialized) views. Here they are
+# tables filled from the history once the bulk rows are in, and rebuilt by
+# --refresh-workflow: a workflow per fetch with the first processing run of
+# that fetch and the stage chain behind it, one row per stage of a workflow,
+# and the content items with their latest processing run.
+WORKFLOW_TABLES = """
+DROP TABLE IF EXISTS workflow_execution_log_summary;
+DROP TABLE IF EXISTS v_workflow_stage_details;
+DROP TABLE IF EXISTS fetched_contents_view;
+
+CREATE TABLE workflow_execution_log_summary (
+    id INTEGER PRIMARY KEY,
+    flux_id INTEGER NOT NULL,
+    flux_name TEXT,
+    run_number INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL,
+    started_at TEXT NOT NULL,
+    completed_at TEXT,
+    duration_active TEXT,
+    duration_minutes REAL,
+    duration_seconds INTEGER,
+    content_count INTEGER,
+    steps TEXT,
+    last_stage TEXT,
+    fetching_id INTEGER,
+    processing_id INTEGER,
+    normalization_id INTEGER,
+    refinement_id INTEGER,
+    calculation_id INTEGER
+);
+
+CREATE TABLE v_workflow_stage_details (
+    run_id INTEGER NOT NULL,
+    stage_order INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    stage_type TEXT NOT NULL,
+    status TEXT,
+    stage_started TEXT,
+    stage_end TEXT,
+    sub_process_count INTEGER,
+    duration_minutes REAL,
+    progress REAL,
+    error_message TEXT,
+    PRIMARY KEY (run_id, stage_order)
+) WITHOUT ROWID;
+
+CREATE TABLE fetched_contents_view (
+    contentID INTEGER PRIMARY KEY,
+    fluxID INTEGER NOT NULL,
+    fetchingID INTEGER NOT NULL,
+    status TEXT,
+    contentName TEXT,
+    contentShortName TEXT,
+    fileType TEXT,
+    fileSize BIGINT,
+    numberOfProcessing INTEGER NOT NULL,
+    createdAt TEXT,
+    sourceUrl TEXT,
+    processingID INTEGER
+);
+"""
+
+WORKFLOW_SUMMARY_STATEMENT = """
+INSERT INTO workflow_execution_log_summary (
+    id, flux_id, flux_name, run_number, status, progress, started_at, completed_at, duration_active,
+    duration_minutes, duration_seconds, content_count, steps, last_stage,
+    fetching_id, processing_id, normalization_id, refinement_id, calculation_id
+)
+WITH first_processing AS (
+    SELECT fetchingID, MIN(processingID) AS processingID FROM processingHistory GROUP BY fetchingID
+), chain AS (
+    SELECT f.fetchingID, f.fluxID, f.timestamp AS started_at, f.numberOfContent,
+           p.processingID, n.normalizationID, r.refinementID, c.calculationID,
+           (f.status = 'Success') + (p.status IS 'Success') + (n.status IS 'Success')
+               + (r.status IS 'Success') + (c.status IS 'Success') AS done,
+           CASE
+               WHEN c.calculationID IS NOT NULL THEN 'Calculation'
+               WHEN r.refinementID IS NOT NULL THEN 'Refinement'
+               WHEN n.normalizationID IS NOT NULL THEN 'Normalization'
+               WHEN p.processingID IS NOT NULL THEN 'Processing'
+               ELSE 'Fetching'
+           END AS last_stage,
+           COALESCE(c.status, r.status, n.status, p.status, f.status) AS last_status,
+           COALESCE(c.progress, r.progress, n.progress, p.progress, f.progress) AS last_progress,
+           CASE
+               WHEN c.calculationID IS NOT NULL THEN c.completedAt
+               WHEN r.refinementID IS NOT NULL THEN r.completedAt
+               WHEN n.normalizationID IS NOT NULL THEN n.completedAt
+               WHEN p.processingID IS NOT NULL THEN p.completedAt
+               ELSE f.completedAt
+           END AS completed_at
+    FROM fetchingHistory f
+    LEFT JOIN first_processing fp ON fp.fetchingID = f.fetchingID
+    LEFT JOIN processingHistory p ON p.processingID = fp.processingID
+    LEFT JOIN normalization_history n ON n.processingID = p.processingID
+    LEFT JOIN refinement_history r ON r.normalizationID = n.normalizationID
+    LEFT JOIN calculation_history c ON c.refinementID = r.refinementID
+), runs AS (
+    SELECT *, CAST(strftime('%s', completed_at) - strftime('%s', started_at) AS INTEGER) AS duration
+    FROM chain
+)
+SELECT runs.fetchingID, runs.fluxID, fluxData.name,
+       ROW_NUMBER() OVER (PARTITION BY runs.fluxID ORDER BY runs.started_at, runs.fetchingID),
+       CASE
+           WHEN last_status = 'Failed' THEN 'Failed'
+           WHEN last_status LIKE 'Currently %' THEN 'In Progress'
+           ELSE 'Success'
+       END,
+       done * 20 + CASE WHEN last_status = 'Success' THEN 0 ELSE COALESCE(last_progress, 0) / 5.0 END,
+       started_at, completed_at,
+       printf('%02d:%02d:%02d', duration / 3600, duration % 3600 / 60, duration % 60),
+       ROUND(duration / 60.0, 1), duration, numberOfContent, done || '/5', last_stage,
+       fetchingID, processingID, normalizationID, refinementID, calculationID
+FROM runs
+JOIN fluxData ON fluxData.id = runs.fluxID
+ORDER BY runs.fetchingID
+"""
+
+# (stage_type, history table, ID column, sub-process count, duration seconds)
+STAGE_DETAIL_SOURCES = [
+    ("Fetching", "fetchingHistory", "fetchingID", "numberOfContent", "fetchingTimeInSeconds"),
+    ("Processing", "processingHistory", "processingID", "numberOfProcessingContent", "processingTimeInSeconds"),
+    ("Normalization", "normalization_history", "normalizationID", "numberOfItems", "normalizationTimeInSeconds"),
+    ("Refinement", "refinement_history", "refinementID", "numberOfItems", "refinementTimeInSeconds"),
+    ("Calculation", "calculation_history", "calculationID", "numberOfItems", "calculationTimeInSeconds"),
+]
+
+def stage_details_statement():
+    selects = [
+        f"SELECT s.id, {order}, h.{id_column}, '{stage_type}', h.status, h.timestamp, h.completedAt, "
+        f"h.{count_column}, ROUND(h.{duration_column} / 60.0, 2), h.progress, h.errorMessage\n"
+        f"FROM workflow_execution_log_summary s JOIN {table} h ON h.{id_column} = s.{id_column[:-2].lower()}_id"
+        for order, (stage_type, table, id_column, count_column, duration_column)
+        in enumerate(STAGE_DETAIL_SOURCES, 1)
+    ]
+    return (
+        "INSERT INTO v_workflow_stage_details (run_id, stage_order, id, stage_type, status, stage_started, "
+        "stage_end, sub_process_count, duration_minutes, progress, error_message)\n"
+        + "\nUNION ALL\n".join(selects) + "\nORDER BY 1, 2"
+    )
+
+FETCHED_CONTENTS_STATEMENT = """
+INSERT INTO fetched_contents_view (
+    contentID, fluxID, fetchingID, status, contentName, contentShortName, fileType, fileSize,
+    numberOfProcessing, createdAt, sourceUrl, processingID
+)
+SELECT c.contentID, c.fluxID, c.fetchingID, p.status, c.contentName, c.contentShortName, c.fileType,
+       c.fileSize, COALESCE(p.runs, 0), c.createdAt, c.sourceUrl, p.processingID
+FROM content_items c
+LEFT JOIN (
+    -- With MAX() SQLite takes the bare status from the row holding the maximum: the latest run
+    SELECT fetchingID, COUNT(*) AS runs, MAX(processingID) AS processingID, status
+    FROM processingHistory
+    GROUP BY fetchingID
+) p ON p.fetchingID = c.fetchingID
+ORDER BY c.contentID
+"""
+
+# The execution log page per flux and overall (newest first) and its status
+# counts, duration buckets and trend, all answered from covering indexes;
+# the failed runs by stage; lookups by fetching and processing run; the stage
+# lookup of getRunIdFromStage; and the fetched contents pages and file types.
+WORKFLOW_INDEXES = """
+CREATE INDEX idx_workflow_summary_flux_started
+    ON workflow_execution_log_summary(flux_id, started_at DESC, status, duration_seconds);
+CREATE INDEX idx_workflow_summary_started ON workflow_execution_log_summary(started_at DESC, status, duration_seconds);
+CREATE INDEX idx_workflow_summary_status ON workflow_execution_log_summary(status, flux_id, last_stage);
+CREATE INDEX idx_workflow_summary_fetching ON workflow_execution_log_summary(fetching_id);
+CREATE INDEX idx_workflow_summary_processing
+    ON workflow_execution_log_summary(processing_id) WHERE processing_id IS NOT NULL;
+CREATE INDEX idx_workflow_stage_details_id ON v_workflow_stage_details(id, stage_type);
+CREATE INDEX idx_fetched_contents_flux_created ON fetched_contents_view(fluxID, createdAt DESC);
+CREATE INDEX idx_fetched_contents_created ON fetched_contents_view(createdAt DESC);
+CREATE INDEX idx_fetched_contents_flux_file_type ON fetched_contents_view(fluxID, fileType);
+CREATE INDEX idx_fetched_contents_fetching ON fetched_contents_view(fetchingID);
+CREATE INDEX idx_fetched_contents_processing ON fetched_contents_view(processingID) WHERE processingID IS NOT NULL;
+CREATE INDEX idx_fetched_contents_status ON fetched_contents_view(status, createdAt DESC);
+"""
+
+def refresh_workflow_tables(conn):
+    if not conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'normalization_history'").fetchone():
+        sys.exit("Cannot refresh the workflow tables: the database was not built with --workflow-stages")
+    print("Materializing the workflow execution log...")
+    conn.executescript(WORKFLOW_TABLES)
+    conn.execute(WORKFLOW_SUMMARY_STATEMENT)
+    conn.execute(stage_details_statement())
+    conn.execute(FETCHED_CONTENTS_STATEMENT)
+    conn.executescript(WORKFLOW_INDEXES)
+    for table in ("workflow_execution_log_summary", "v_workflow_stage_details", "fetched_contents_view"):
+        conn.execute(f"ANALYZE {table}")
+    conn.commit()
+
+# --- KEYSET PAGINATION ---
+# With --keyset-pagination the history pages can be read with a (timestamp,
+# id) cursor instead of OFFSET: WHERE (timestamp, id) < (:timestamp, :id)
+# ORDER BY timestamp DESC, id DESC, overall and per flux. history_counts
+# replaces count: "exact" with per-flux and per-filter row counts taken once
+# the bulk rows are in; later writes leave them approximate until the next
+# refresh. Table -> (ID column, ordering column, filter column).
+KEYSET_TABLES = {
+    "fetchingHistory": ("fetchingID", "timestamp", "status"),
+    "processingHistory": ("processingID", "timestamp", "status"),
+    "content_items": ("contentID", "createdAt", "fileType"),
+}
+
+KEYSET_INDEXES = "".join(
+    f"""
+    CREATE UNIQUE INDEX idx_{table.replace('_', '').lower()}_keyset ON {table}({order_column}, {id_column});
+    CREATE UNIQUE INDEX idx_{table.replace('_', '').lower()}_fluxid_keyset ON {table}(fluxID, {order_column}, {id_column});
+    """
+    for table, (id_column, order_column, _) in KEYSET_TABLES.items()
+)
+
+# fluxID 0 counts every flux and filterValue '' every value of the filter column
+HISTORY_COUNTS_TABLE = """
+CREATE TABLE IF NOT EXISTS history_counts (
+    tableName TEXT NOT NULL,
+    fluxID INTEGER NOT NULL,
+    filterValue TEXT NOT NULL,
+    rowCount INTEGER NOT NULL,
+    PRIMARY KEY (tableName, fluxID, filterValue)
+) WITHOUT ROWID"""
+
+def refresh_history_counts(conn, fluxes=None):
+    # Recounts the given fluxes (all of them by default); the fluxID 0 totals
+    # are summed from the per-flux rows
+    conn.execute(HISTORY_COUNTS_TABLE)
+    if fluxes is None:
+        print("Counting history rows per flux and filter...")
+        conn.execute("DELETE FROM history_counts")
+        scope, params = "", ()
+    else:
+        scope, params = " AND fluxID IN (SELECT value FROM json_each(?))", (json.dumps(sorted(fluxes)),)
+        conn.execute(f"DELETE FROM history_counts WHERE fluxID = 0 OR (1{scope})", params)
+    for table, (_, _, filter_column) in KEYSET_TABLES.items():
+        conn.execute(
+            f"""
+INSERT INTO history_counts (tableName, fluxID, filterValue, rowCount)
+SELECT '{table}', fluxID, {filter_column}, COUNT(*) FROM {table}
+WHERE {filter_column} IS NOT NULL{scope} GROUP BY fluxID, {filter_column}
+UNION ALL
+SELECT '{table}', fluxID, '', COUNT(*) FROM {table} WHERE 1{scope} GROUP BY fluxID
+""",
+            params * 2
+        )
+    conn.execute(
+        "INSERT INTO history_counts (tableName, fluxID, filterValue, rowCount) "
+        "SELECT tableName, 0, filterValue, SUM(rowCount) FROM history_counts GROUP BY tableName, filterValue"
+    )
+    conn.commit()
+
+# --- FAST LOAD ---
+# Bulk-load settings for files nobody else reads until the build is finished:
+# no rollback journal, no fsync, a 256 MiB page cache and larger pages.
+FAST_LOAD_PRAGMAS = """
+PRAGMA page_size = 16384;
+PRAGMA journal_mode = OFF;
+PRAGMA synchronous = OFF;
+PRAGMA cache_size = -262144;
+PRAGMA temp_store = MEMORY;
+PRAGMA locking_mode = EXCLUSIVE;
+"""
+
+def connect_for_build(path, settings, fast_load, resumable=False, resume=False):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    if fast_load:
+        # page_size only applies before the first table is created
+        conn.executescript(FAST_LOAD_PRAGMAS)
+        if resumable:
+            # Without a journal an interrupted transaction corrupts the file;
+            # WAL keeps checkpointed runs resumable and the log bounded.
+            conn.execute("PRAGMA journal_mode = WAL")
+    if not resume:
+        create_schema(conn, index_profile=None if fast_load else settings.index_profile, rollups=settings.rollups,
+                      layout=settings.layout, workflow_stages=settings.workflow_stages,
+                      keyset_pagination=settings.keyset_pagination)
+    if fast_load:
+        # Rows are consistent by construction; skip per-row FK lookups
+        conn.execute("PRAGMA foreign_keys = OFF")
+    return conn
+
+def finish_fast_load(conn, settings):
+    print("Creating indexes and running ANALYZE...")
+    create_indexes(conn, settings.index_profile, settings.layout)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = DELETE")
+
+# --- INSTRUMENTATION ---
+# Phases of generate_data, in the order a flux passes through them. Each one
+# covers producing its rows (draws, Faker, json.dumps, strftime); "write" is
+# the sink storing flushed batches and "commit" the commits.
+GENERATION_PHASES = [
+    "flux_row", "fetching_history", "content_items", "processing_history", "content_history",
+    "workflow_stages", "aggregates", "write", "commit",
+]
+PROFILE_TOP_FUNCTIONS = 25
+TRACEMALLOC_TOP_LINES = 10
+
+class RunMetrics:
+    # Wall time per phase and rows written per table. phase() closes the
+    # running phase and opens the next one, so instrumenting the generation
+    # loop costs a perf_counter call per phase change and nothing per row.
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.seconds = Counter()
+        self.rows = Counter()
+        self.current = None
+        self.started = self.created
+
+    def phase(self, name):
+        now = time.perf_counter()
+        if self.current is not None:
+            self.seconds[self.current] += now - self.started
+        self.current = name
+        self.started = now
+
+    def stop(self):
+        self.phase(None)
+
+    def merge(self, seconds, rows):
+        self.seconds.update(seconds)
+        self.rows.update(rows)
+
+    def count_stored(self, conn, tables):
+        # Rows written overstate rows stored where writes are upserts (the
+        # global rollups, once per shard or checkpoint)
+        for table in tables:
+            if table in self.rows:
+                self.rows[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def elapsed(self):
+        return time.perf_counter() - self.created
+
+def peak_rss_bytes(children=False):
+    # resource is Unix-only; ru_maxrss is in bytes on macOS and KiB elsewhere
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+def profile_summary(profiler):
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+    return [
+        {
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": calls,
+            "own_seconds": round(own, 4),
+            "cumulative_seconds": round(cumulative, 4),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in ranked
+    ]
+
+def tracemalloc_summary():
+    current, peak = tracemalloc.get_traced_memory()
+    lines = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP_LINES]
+    return {
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "top_lines": [
+            {
+                "line": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "bytes": stat.size,
+                "blocks": stat.count,
+            }
+            for stat in lines
+        ],
+    }
+
+def run_report(metrics, settings, seed, args, profiler=None):
+    elapsed = metrics.elapsed()
+    total_rows = sum(metrics.rows.values())
+    phase_seconds = sum(metrics.seconds.values())
+    report = {
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "output": args.output,
+        "format": args.format,
+        "seed": seed,
+        "workers": args.workers,
+        "settings": asdict(settings),
+        "elapsed_seconds": round(elapsed, 3),
+        # With --workers the generation phases are summed over the worker
+        # processes, so they add up to more than the elapsed time
+        "phases": {
+            phase: {"seconds": round(seconds, 3), "share": round(seconds / phase_seconds, 4) if phase_seconds else 0}
+            for phase, seconds in metrics.seconds.items()
+        },
+        "rows": {
+            table: {"rows": rows, "rows_per_second": round(rows / elapsed, 1)}
+            for table, rows in metrics.rows.items()
+        },
+        "total_rows": total_rows,
+        "rows_per_second": round(total_rows / elapsed, 1) if elapsed else 0,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "peak_worker_rss_bytes": peak_rss_bytes(children=True) if args.workers else None,
+    }
+    if profiler is not None:
+        report["profile"] = {"path": args.profile, "top_functions": profile_summary(profiler)}
+    if tracemalloc.is_tracing():
+        report["tracemalloc"] = tracemalloc_summary()
+    return report
+
+def finish_instrumentation(metrics, settings, seed, args, profiler=None):
+    metrics.stop()
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"Wrote profile to {args.profile} (python -m pstats {args.profile})")
+    report = run_report(metrics, settings, seed, args, profiler)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        print(f"Peak traced memory: {report['tracemalloc']['peak_bytes'] / 2**20:.1f} MiB")
+    peak = report["peak_rss_bytes"]
+    print(f"Wrote {report['total_rows']} rows in {report['elapsed_seconds']:.1f}s "
+          f"({report['rows_per_second']:.0f} rows/s" + (f", peak RSS {peak / 2**20:.0f} MiB)" if peak else ")"))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Wrote run report to {args.report}")
+
+# --- BULK WRITER ---
+# Insert column order per table. Dict order is also the flush order, so parent
+# rows always reach the database before the rows referencing them.
+TABLE_COLUMNS = {
+    "fluxData": (
+        "id", "name", "source", "fluxState", "comment", "description",
+        "fetchScheduleType", "fetchScheduleConfiguration",
+        "processingScheduleType", "processingScheduleConfiguration",
+        "createdAt", "editedAt", "financialType", "fluxType",
+        "fluxTypeConfiguration", "allowConcurrentMultiFetching",
+        "fetchingStatus", "processingStatus",
+        "numberOfFetchingTimes", "numberOfProcessingTimes",
+        "numberOfErrorFetching", "numberOfErrorsProcessing",
+        "numberOfSuccessFetching", "numberOfSuccessProcessing",
+        "numberOfCurrentlyFetching", "numberOfCurrentlyProcessing",
+        "fetchingProgress", "processingProgress",
+        "lastFetchingDate", "lastProcessingDate",
+        "lastDurationFetching", "lastDurationProcessing"
+    ),
+    "fetchingHistory": (
+        "fetchingID", "fluxID", "status", "timestamp", "completedAt",
+        "fetchingTimeInSeconds", "progress", "numberOfContent", "errorMessage"
+    ),
+    "content_items": (
+        "contentID", "fetchingID", "fluxID", "contentName", "contentShortName",
+        "description", "fileSize", "contentLength", "fileType", "mimeType",
+        "encoding", "hash", "createdAt", "modifiedAt", "sourceUrl"
+    ),
+    "processingHistory": (
+        "processingID", "fluxID", "fetchingID", "status", "timestamp",
+        "completedAt", "numberOfProcessingContent", "processingTimeInSeconds",
+        "progress", "errorMessage"
+    ),
+    "processing_content_history": (
+        "processing_content_history_ID", "processingID", "contentID",
+        "processingStartTime", "processingEndTime", "processingTimeInSeconds",
+        "status", "statistics"
+    ),
+    # Workflow stage tables, only created with --workflow-stages
+    "normalization_history": (
+        "normalizationID", "fluxID", "processingID", "status", "timestamp", "completedAt",
+        "normalizationTimeInSeconds", "progress", "numberOfItems", "errorMessage"
+    ),
+    "refinement_history": (
+        "refinementID", "fluxID", "normalizationID", "status", "timestamp", "completedAt",
+        "refinementTimeInSeconds", "progress", "numberOfItems", "errorMessage"
+    ),
+    "calculation_history": (
+        "calculationID", "fluxID", "refinementID", "status", "timestamp", "completedAt",
+        "calculationTimeInSeconds", "progress", "numberOfItems", "errorMessage"
+    ),
+    # Rollup tables, only created with --rollups
+    "fetchingRollupDaily": ("fluxID", "dimension", "day", "value", "count"),
+    "fetchingRollupGlobal": ("dimension", "day", "value", "count"),
+    "processingRollupDaily": ("fluxID", "dimension", "day", "value", "count"),
+    "processingRollupGlobal": ("dimension", "day", "value", "count"),
+}
+
+# Tables whose rows are partial counts: a write adds to an existing row
+ACCUMULATING_TABLES = {"fetchingRollupGlobal", "processingRollupGlobal"}
+
+DEFAULT_BATCH_SIZE = 50000
+
+def insert_statement(table, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    columns = row_columns(table, layout)
+    statement = (
+        f"INSERT INTO {layout.table(table)} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+    if table in ACCUMULATING_TABLES:
+        statement += " ON CONFLICT DO UPDATE SET count = count + excluded.count"
+    return statement
+
+class BulkWriter:
+    # Buffers rows per table and hands them to a sink once batch_size rows are
+    # pending. IDs are assigned by the generator, so nothing needs to be read
+    # back while generating. Flushes happen between fluxes and every
+    # HOT_FLUX_FLUSH_RUNS runs of a flux; a flux's fluxData row is added after
+    # its history, so the SQLite sink defers foreign key checks to the commit.
+    def __init__(self, sink, batch_size=DEFAULT_BATCH_SIZE, rows=None):
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.buffers = {table: [] for table in TABLE_COLUMNS}
+        self.pending = 0
+        # Rows handed to the sink per table
+        self.rows = Counter() if rows is None else rows
+
+    def add(self, table, row):
+        self.buffers[table].append(row)
+        self.pending += 1
+
+    def flush_if_full(self):
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for table, rows in self.buffers.items():
+            if rows:
+                self.sink.write(table, rows)
+                self.rows[table] += len(rows)
+                rows.clear()
+        self.pending = 0
+
+# --- SINKS ---
+# A sink receives batches of rows (tuples in TABLE_COLUMNS order) per table,
+# always in TABLE_COLUMNS order within a flush. commit() marks a consistent
+# point (whole fluxes only) and close() finishes the output.
+OUTPUT_FORMATS = ["sqlite", "copy", "csv", "parquet"]
+
+class SqliteSink:
+    def __init__(self, conn, layout=None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        tables = existing_tables(conn)
+        self.statements = {table: insert_statement(table, layout) for table in tables}
+        self.encoders = {table: (layout or DEFAULT_LAYOUT).encoders(table) for table in tables}
+
+    def write(self, table, rows):
+        if not self.conn.in_transaction:
+            # defer_foreign_keys only lasts until the end of a transaction
+            self.conn.execute("BEGIN")
+            self.conn.execute("PRAGMA defer_foreign_keys = ON")
+        encoders = self.encoders[table]
+        if encoders:
+            rows = [encode_row(row, encoders) for row in rows]
+        self.cursor.executemany(self.statements[table], rows)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+
+def encode_row(row, encoders):
+    row = list(row)
+    for index, codes in encoders:
+        if row[index] is not None:
+            row[index] = codes[row[index]]
+    return row
+
+class FileSink:
+    # One file per table in an output directory
+    extension = None
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.files = {}
+
+    def path(self, table):
+        return os.path.join(self.directory, f"{table}.{self.extension}")
+
+    def file(self, table):
+        if table not in self.files:
+            self.files[table] = self.open(table)
+        return self.files[table]
+
+    def open(self, table):
+        return open(self.path(table), "w", encoding="utf-8", newline="")
+
+    def commit(self):
+        for handle in self.files.values():
+            handle.flush()
+
+    def close(self):
+        for handle in self.files.values():
+            handle.close()
+
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(COPY_ESCAPES)
+    return str(value)
+
+class CopySink(FileSink):
+    # PostgreSQL COPY text format, plus a load.sql for psql that \copy-s the
+    # files into the schema created by scripts/populate-postgres.js.
+    extension = "copy"
+
+    def write(self, table, rows):
+        self.file(table).write("".join(
+            "\t".join(map(copy_value, row)) + "\n" for row in rows
+        ))
+
+    def close(self):
+        super().close()
+        with open(os.path.join(self.directory, "load.sql"), "w", encoding="utf-8") as script:
+            script.write("BEGIN;\n")
+            for table, columns in TABLE_COLUMNS.items():
+                if table not in self.files:
+                    continue
+                if table in ROLLUP_TABLES:
+                    # populate-postgres.js does not know about the rollup tables
+                    script.write(rollup_table_definition(table) + ";\n")
+                script.write(f"\\copy {table} ({', '.join(columns)}) FROM '{table}.{self.extension}'\n")
+            for column, table in ID_COLUMNS.items():
+                if table not in self.files:
+                    continue
+                script.write(
+                    f"SELECT setval(pg_get_serial_sequence('{table.lower()}', '{column.lower()}'), "
+                    f"COALESCE(MAX({column}), 1)) FROM {table};\n"
+                )
+            script.write("SELECT setval(pg_get_serial_sequence('fluxdata', 'id'), COALESCE(MAX(id), 1)) FROM fluxData;\n")
+            script.write("COMMIT;\n")
+
+class CsvSink(FileSink):
+    extension = "csv"
+
+    def __init__(self, directory, layout=None):
+        super().__init__(directory)
+        self.layout = layout
+        self.writers = {}
+
+    def write(self, table, rows):
+        if table not in self.writers:
+            self.writers[table] = csv.writer(self.file(table))
+            self.writers[table].writerow(row_columns(table, self.layout))
+        self.writers[table].writerows(rows)
+
+class ParquetSink:
+    # Every flush becomes one row group, so only the current batch is held in
+    # memory. pyarrow is only needed for this format.
+    def __init__(self, directory, layout=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            sys.exit("Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.schemas = arrow_schemas(pyarrow, layout)
+        self.writers = {}
+
+    def write(self, table, rows):
+        if table not in self.writers:
+            self.writers[table] = self.pq.ParquetWriter(
+                os.path.join(self.directory, f"{table}.parquet"), self.schemas[table]
+            )
+        columns = list(zip(*rows))
+        self.writers[table].write_table(self.pa.Table.from_arrays(
+            [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schemas[table])],
+            schema=self.schemas[table]
+        ))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+def arrow_schemas(pa, layout=None):
+    # Derive column types from the SQLite schema itself
+    layout = layout or DEFAULT_LAYOUT
+    conn = sqlite3.connect(":memory:")
+    create_schema(conn, index_profile=None, rollups=True, layout=layout, workflow_stages=True)
+    schemas = {}
+    for table in TABLE_COLUMNS:
+        columns = row_columns(table, layout)
+        declared = {
+            row[1]: row[2].upper()
+            for row in conn.execute(f"PRAGMA table_info({layout.table(table)})")
+        }
+        schemas[table] = pa.schema([
+            (column,
+             pa.int64() if declared[column] in ("INTEGER", "BIGINT") else
+             pa.float64() if declared[column] == "REAL" else
+             pa.string())
+            for column in columns
+        ])
+    conn.close()
+    return schemas
+
+def open_file_sink(output_format, directory, layout=None):
+    if output_format == "copy":
+        # COPY targets the text-timestamp schema of populate-postgres.js
+        return CopySink(directory)
+    sinks = {"csv": CsvSink, "parquet": ParquetSink}
+    return sinks[output_format](directory, layout)
+
+# --- FLUX AGGREGATES ---
+class FluxAggregates:
+    # Accumulates the fluxData aggregate columns while a flux's history is
+    # generated. "Latest" means greatest timestamp, ties broken by the greater ID,
+    # the same ordering EXPECTED_AGGREGATES_QUERY uses.
+    def __init__(self):
+        self.fetch_counts = {status: 0 for status in FETCHING_STATUSES.values()}
+        self.processing_counts = {status: 0 for status in PROCESSING_STATUSES.values()}
+        self.latest_fetch = None
+        self.latest_processing = None
+
+    def record_fetch(self, fetching_id, status, timestamp, progress, duration):
+        self.fetch_counts[status] += 1
+        if self.latest_fetch is None or (timestamp, fetching_id) > self.latest_fetch[:2]:
+            self.latest_fetch = (timestamp, fetching_id, status, progress, duration)
+
+    def record_processing(self, processing_id, status, timestamp, progress, duration):
+        self.processing_counts[status] += 1
+        if self.latest_processing is None or (timestamp, processing_id) > self.latest_processing[:2]:
+            self.latest_processing = (timestamp, processing_id, status, progress, duration)
+
+    def values(self):
+        # Same order as the aggregate columns at the end of TABLE_COLUMNS["fluxData"]
+        latest_fetch = self.latest_fetch or (None,) * 5
+        latest_processing = self.latest_processing or (None,) * 5
+        return (
+            latest_fetch[2], latest_processing[2],
+            sum(self.fetch_counts.values()), sum(self.processing_counts.values()),
+            self.fetch_counts[FETCHING_STATUSES["FAILED"]], self.processing_counts[PROCESSING_STATUSES["FAILED"]],
+            self.fetch_counts[FETCHING_STATUSES["SUCCESS"]], self.processing_counts[PROCESSING_STATUSES["SUCCESS"]],
+            self.fetch_counts[FETCHING_STATUSES["CURRENTLY_FETCHING"]],
+            self.processing_counts[PROCESSING_STATUSES["CURRENTLY_PROCESSING"]],
+            latest_fetch[3], latest_processing[3],
+            iso_timestamp(latest_fetch[0]), iso_timestamp(latest_processing[0]),
+            latest_fetch[4], latest_processing[4]
+        )
+
+# Set-based recomputation of every flux's aggregates from the history tables.
+EXPECTED_AGGREGATES_QUERY = """
+WITH LatestFetching AS (
+    SELECT fluxID, status, progress, timestamp, fetchingTimeInSeconds,
+           ROW_NUMBER() OVER (PARTITION BY fluxID ORDER BY timestamp DESC, fetchingID DESC) AS rn
+    FROM fetchingHistory
+), LatestProcessing AS (
+    SELECT fluxID, status, progress, timestamp, processingTimeInSeconds,
+           ROW_NUMBER() OVER (PARTITION BY fluxID ORDER BY timestamp DESC, processingID DESC) AS rn
+    FROM processingHistory
+), Counts AS (
+    SELECT
+        fluxID,
+        COUNT(*) AS totalFetches,
+        SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) AS successFetches,
+        SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) AS errorFetches,
+        SUM(CASE WHEN status = 'Currently fetching' THEN 1 ELSE 0 END) AS currentFetches
+    FROM fetchingHistory GROUP BY fluxID
+), ProcessingCounts AS (
+    SELECT
+        fluxID,
+        COUNT(*) AS totalProcesses,
+        SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) AS successProcesses,
+        SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) AS errorProcesses,
+        SUM(CASE WHEN status = 'Currently processing' THEN 1 ELSE 0 END) AS currentProcesses
+    FROM processingHistory GROUP BY fluxID
+)
+SELECT
+    f.id AS fluxID,
+    lf.status AS fetchingStatus,
+    lp.status AS processingStatus,
+    COALESCE(c.totalFetches, 0) AS numberOfFetchingTimes,
+    COALESCE(pc.totalProcesses, 0) AS numberOfProcessingTimes,
+    COALESCE(c.errorFetches, 0) AS numberOfErrorFetching,
+    COALESCE(pc.errorProcesses, 0) AS numberOfErrorsProcessing,
+    COALESCE(c.successFetches, 0) AS numberOfSuccessFetching,
+    COALESCE(pc.successProcesses, 0) AS numberOfSuccessProcessing,
+    COALESCE(c.currentFetches, 0) AS numberOfCurrentlyFetching,
+    COALESCE(pc.currentProcesses, 0) AS numberOfCurrentlyProcessing,
+    lf.progress AS fetchingProgress,
+    lp.progress AS processingProgress,
+    lf.timestamp AS lastFetchingDate,
+    lp.timestamp AS lastProcessingDate,
+    lf.fetchingTimeInSeconds AS lastDurationFetching,
+    lp.processingTimeInSeconds AS lastDurationProcessing
+FROM fluxData f
+LEFT JOIN LatestFetching lf ON lf.fluxID = f.id AND lf.rn = 1
+LEFT JOIN LatestProcessing lp ON lp.fluxID = f.id AND lp.rn = 1
+LEFT JOIN Counts c ON c.fluxID = f.id
+LEFT JOIN ProcessingCounts pc ON pc.fluxID = f.id
+"""
+
+AGGREGATE_COLUMNS = TABLE_COLUMNS["fluxData"][-16:]
+
+# One-shot, set-based repair of every flux's aggregates
+REBUILD_AGGREGATES_STATEMENT = f"""
+UPDATE fluxData SET ({', '.join(AGGREGATE_COLUMNS)}) = ({', '.join(f'e.{column}' for column in AGGREGATE_COLUMNS)})
+FROM ({EXPECTED_AGGREGATES_QUERY}) AS e
+WHERE e.fluxID = fluxData.id
+"""
+
+def rebuild_aggregates(conn):
+    if stored_layout(conn).compact:
+        sys.exit("Cannot rebuild aggregates of a --compact-enums database: fluxData is a view")
+    if is_partitioned(conn):
+        sys.exit("Cannot rebuild aggregates of a partitioned database: the history is in other files")
+    updated = conn.execute(REBUILD_AGGREGATES_STATEMENT).rowcount
+    conn.commit()
+    print(f"✅ Rebuilt the aggregates of {updated} fluxes")
+
+def verify_aggregates(conn):
+    mismatch = " OR ".join(f"f.{column} IS NOT e.{column}" for column in AGGREGATE_COLUMNS)
+    rows = conn.execute(
+        f"""
+SELECT f.id FROM fluxData f
+JOIN ({EXPECTED_AGGREGATES_QUERY}) e ON e.fluxID = f.id
+WHERE {mismatch}
+ORDER BY f.id
+"""
+    ).fetchall()
+    if rows:
+        sample = ", ".join(str(row[0]) for row in rows[:10])
+        print(f"❌ Aggregate check failed for {len(rows)} fluxes (e.g. {sample})")
+        return False
+    print("✅ fluxData aggregates match the history tables")
+    return True
+
+# --- ROLLUPS ---
+DURATION_BUCKETS = [
+    (60, "0-1 min"),
+    (120, "1-2 min"),
+    (300, "2-5 min"),
+    (600, "5-10 min"),
+    (1200, "10-20 min"),
+]
+
+def duration_bucket(seconds):
+    for limit, label in DURATION_BUCKETS:
+        if seconds <= limit:
+            return label
+    return "20+ min"
+
+DURATION_BUCKET_SQL = "CASE " + " ".join(
+    f"WHEN {{column}} <= {limit} THEN '{label}'" for limit, label in DURATION_BUCKETS
+) + " ELSE '20+ min' END"
+
+class Rollups:
+    # Counts keyed by (dimension, day, value) for one kind of history. Runs
+    # without a duration (still running) or without an error message are left
+    # out of those dimensions, like the endpoints do.
+    def __init__(self):
+        self.counts = Counter()
+
+    def record(self, status, day, duration, error_message):
+        self.counts["status", day, status] += 1
+        if duration is not None:
+            self.counts["duration", day, duration_bucket(duration)] += 1
+        if error_message:
+            self.counts["error", day, error_message] += 1
+
+    def rows(self, *prefix):
+        return [prefix + key + (count,) for key, count in sorted(self.counts.items())]
+
+    def merge_into(self, other):
+        other.counts.update(self.counts)
+        self.counts.clear()
+
+def expected_rollup_query(history, duration_column, daily):
+    # Rebuilds a rollup table from its history table in SQL
+    flux = "fluxID, " if daily else ""
+    bucket = DURATION_BUCKET_SQL.format(column=duration_column)
+    return f"""
+SELECT * FROM (
+    SELECT {flux}'status', substr(timestamp, 1, 10) AS day, status AS value, COUNT(*) FROM {history}
+    GROUP BY {flux}day, value
+    UNION ALL
+    SELECT {flux}'duration', substr(timestamp, 1, 10) AS day, {bucket} AS value, COUNT(*) FROM {history}
+    WHERE {duration_column} IS NOT NULL
+    GROUP BY {flux}day, value
+    UNION ALL
+    SELECT {flux}'error', substr(timestamp, 1, 10) AS day, errorMessage AS value, COUNT(*) FROM {history}
+    WHERE errorMessage IS NOT NULL AND errorMessage != ''
+    GROUP BY {flux}day, value
+)
+"""
+
+ROLLUP_DURATION_COLUMNS = {
+    "fetchingHistory": "fetchingTimeInSeconds",
+    "processingHistory": "processingTimeInSeconds",
+}
+
+def verify_rollups(conn):
+    if not set(ROLLUP_TABLES) <= set(existing_tables(conn)):
+        print("❌ No rollup tables to check; generate the database with --rollups")
+        return False
+    verified = True
+    for table, history in ROLLUP_TABLES.items():
+        daily = table not in ACCUMULATING_TABLES
+        expected = expected_rollup_query(history, ROLLUP_DURATION_COLUMNS[history], daily)
+        columns = ", ".join(TABLE_COLUMNS[table])
+        missing, unexpected = (
+            conn.execute(f"SELECT COUNT(*) FROM ({first} EXCEPT {second})").fetchone()[0]
+            for first, second in (
+                (expected, f"SELECT {columns} FROM {table}"),
+                (f"SELECT {columns} FROM {table}", expected),
+            )
+        )
+        if missing or unexpected:
+            print(f"❌ {table} differs from {history}: {missing} rows missing or wrong, {unexpected} unexpected")
+            verified = False
+    if verified:
+        print("✅ Rollup tables match the history tables")
+    return verified
+
+# --- AGGREGATE TRIGGERS ---
+# Optional triggers that keep the fluxData aggregates current on every write to
+# the history tables. Counters move by one per event; the latest-run columns
+# are set from the new row when it is the latest (one index probe for equal
+# timestamps) and only looked up again when the latest row moves or goes away.
+# Bulk builds install them after loading, because generate_data writes the
+# aggregates itself.
+AGGREGATE_TRIGGER_TEMPLATE = """
+CREATE TRIGGER IF NOT EXISTS {history}_aggregates_insert AFTER INSERT ON {history}
+BEGIN
+    UPDATE fluxData SET
+        {total} = {total} + 1,
+        {errors} = {errors} + (NEW.status = 'Failed'),
+        {successes} = {successes} + (NEW.status = 'Success'),
+        {current} = {current} + (NEW.status = '{current_status}'),
+        ({status}, {progress}, {date}, {duration}) = (
+            SELECT NEW.status, NEW.progress, NEW.timestamp, NEW.{history_duration}
+            WHERE {date} IS NULL OR NEW.timestamp > {date} OR (
+                NEW.timestamp = {date} AND NOT EXISTS (
+                    SELECT 1 FROM {history}
+                    WHERE fluxID = NEW.fluxID AND timestamp = NEW.timestamp AND {id} > NEW.{id}
+                )
+            )
+            UNION ALL
+            SELECT {status}, {progress}, {date}, {duration}
+            LIMIT 1
+        )
+    WHERE id = NEW.fluxID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS {history}_aggregates_counts AFTER UPDATE OF fluxID, status ON {history}
+WHEN OLD.fluxID IS NOT NEW.fluxID OR OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE fluxData SET
+        {total} = {total} - 1,
+        {errors} = {errors} - (OLD.status = 'Failed'),
+        {successes} = {successes} - (OLD.status = 'Success'),
+        {current} = {current} - (OLD.status = '{current_status}')
+    WHERE id = OLD.fluxID;
+    UPDATE fluxData SET
+        {total} = {total} + 1,
+        {errors} = {errors} + (NEW.status = 'Failed'),
+        {successes} = {successes} + (NEW.status = 'Success'),
+        {current} = {current} + (NEW.status = '{current_status}')
+    WHERE id = NEW.fluxID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS {history}_aggregates_latest
+AFTER UPDATE OF status, progress, {history_duration} ON {history}
+WHEN OLD.fluxID IS NEW.fluxID AND OLD.timestamp IS NEW.timestamp
+BEGIN
+    UPDATE fluxData SET
+        {status} = NEW.status, {progress} = NEW.progress, {duration} = NEW.{history_duration}
+    WHERE id = NEW.fluxID AND {date} = NEW.timestamp AND NOT EXISTS (
+        SELECT 1 FROM {history} WHERE fluxID = NEW.fluxID AND timestamp = NEW.timestamp AND {id} > NEW.{id}
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS {history}_aggregates_moved AFTER UPDATE OF fluxID, timestamp ON {history}
+WHEN OLD.fluxID IS NOT NEW.fluxID OR OLD.timestamp IS NOT NEW.timestamp
+BEGIN
+    UPDATE fluxData SET ({status}, {progress}, {date}, {duration}) = (
+        SELECT status, progress, timestamp, {history_duration} FROM {history}
+        WHERE fluxID = fluxData.id ORDER BY timestamp DESC, {id} DESC LIMIT 1
+    )
+    WHERE id IN (OLD.fluxID, NEW.fluxID);
+END;
+
+CREATE TRIGGER IF NOT EXISTS {history}_aggregates_delete AFTER DELETE ON {history}
+BEGIN
+    UPDATE fluxData SET
+        {total} = {total} - 1,
+        {errors} = {errors} - (OLD.status = 'Failed'),
+        {successes} = {successes} - (OLD.status = 'Success'),
+        {current} = {current} - (OLD.status = '{current_status}')
+    WHERE id = OLD.fluxID;
+    UPDATE fluxData SET ({status}, {progress}, {date}, {duration}) = (
+        SELECT status, progress, timestamp, {history_duration} FROM {history}
+        WHERE fluxID = fluxData.id ORDER BY timestamp DESC, {id} DESC LIMIT 1
+    )
+    WHERE id = OLD.fluxID AND {date} <= OLD.timestamp;
+END;
+"""
+
+AGGREGATE_TRIGGER_COLUMNS = [
+    {
+        "history": "fetchingHistory", "id": "fetchingID", "history_duration": "fetchingTimeInSeconds",
+        "current_status": FETCHING_STATUSES["CURRENTLY_FETCHING"],
+        "total": "numberOfFetchingTimes", "errors": "numberOfErrorFetching",
+        "successes": "numberOfSuccessFetching", "current": "numberOfCurrentlyFetching",
+        "status": "fetchingStatus", "progress": "fetchingProgress",
+        "date": "lastFetchingDate", "duration": "lastDurationFetching",
+    },
+    {
+        "history": "processingHistory", "id": "processingID", "history_duration": "processingTimeInSeconds",
+        "current_status": PROCESSING_STATUSES["CURRENTLY_PROCESSING"],
+        "total": "numberOfProcessingTimes", "errors": "numberOfErrorsProcessing",
+        "successes": "numberOfSuccessProcessing", "current": "numberOfCurrentlyProcessing",
+        "status": "processingStatus", "progress": "processingProgress",
+        "date": "lastProcessingDate", "duration": "lastDurationProcessing",
+    },
+]
+
+def execute_statements(conn, script):
+    # Statement by statement rather than executescript, so triggers can be
+    # created inside an open transaction
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+def create_aggregate_triggers(conn):
+    for columns in AGGREGATE_TRIGGER_COLUMNS:
+        execute_statements(conn, AGGREGATE_TRIGGER_TEMPLATE.format(**columns))
+
+def drop_aggregate_triggers(conn):
+    for columns in AGGREGATE_TRIGGER_COLUMNS:
+        for event in ("insert", "counts", "latest", "moved", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {columns['history']}_aggregates_{event}")
+
+def has_aggregate_triggers(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'fetchingHistory_aggregates_insert'"
+    ).fetchone() is not None
+
+# --- SEARCH INDEX ---
+# FTS5 indexes for the search fields the app filters with ilike '%term%'.
+# They are external-content tables: the text stays in the indexed table (or
+# its view) and the index only holds tokens, with prefix indexes so type-ahead
+# "term*" queries are single lookups. Matching is by token and token prefix,
+# not by arbitrary substring. Bulk builds fill them after loading; the
+# triggers keep them in sync with later writes.
+SEARCH_TABLES = {
+    "fluxSearch": ("fluxData", "id", ("name", "description", "comment")),
+    "contentSearch": ("content_items", "contentID", ("contentName", "description")),
+    "fetchingErrorSearch": ("fetchingHistory", "fetchingID", ("errorMessage",)),
+    "processingErrorSearch": ("processingHistory", "processingID", ("errorMessage",)),
+}
+SEARCH_PREFIXES = "2 3 4"
+
+SEARCH_TRIGGER_TEMPLATE = """
+CREATE TRIGGER IF NOT EXISTS {search}_insert AFTER INSERT ON {stored}
+BEGIN
+    INSERT INTO {search} (rowid, {columns}) SELECT NEW.{id}, {new_values} WHERE {new_present};
+END;
+
+CREATE TRIGGER IF NOT EXISTS {search}_update AFTER UPDATE OF {columns} ON {stored}
+BEGIN
+    INSERT INTO {search} ({search}, rowid, {columns}) SELECT 'delete', OLD.{id}, {old_values} WHERE {old_present};
+    INSERT INTO {search} (rowid, {columns}) SELECT NEW.{id}, {new_values} WHERE {new_present};
+END;
+
+CREATE TRIGGER IF NOT EXISTS {search}_delete AFTER DELETE ON {stored}
+BEGIN
+    INSERT INTO {search} ({search}, rowid, {columns}) SELECT 'delete', OLD.{id}, {old_values} WHERE {old_present};
+END;
+"""
+
+def search_value(table, column, row, layout):
+    # The text of a column of the NEW or OLD row of a stored table
+    if layout.compact and column in CODED_COLUMNS.get(table, {}):
+        return f"(SELECT value FROM {code_table(CODED_COLUMNS[table][column])} WHERE code = {row}.{column})"
+    return f"{row}.{column}"
+
+def has_text(columns, row=None):
+    prefix = f"{row}." if row else ""
+    return " OR ".join(f"{prefix}{column} IS NOT NULL" for column in columns)
+
+def create_search_index(conn, layout=None):
+    layout = layout or DEFAULT_LAYOUT
+    for search, (table, id_column, columns) in SEARCH_TABLES.items():
+        listed = ", ".join(columns)
+        conn.execute(
+            f"CREATE VIRTUAL TABLE {search} USING fts5({listed}, content='{table}', content_rowid='{id_column}', "
+            f"prefix='{SEARCH_PREFIXES}', tokenize='unicode61 remove_diacritics 2')"
+        )
+        # Rows without any text stay out of the index, also in the triggers
+        conn.execute(
+            f"INSERT INTO {search} (rowid, {listed}) SELECT {id_column}, {listed} FROM {table} WHERE {has_text(columns)}"
+        )
+        conn.execute(f"INSERT INTO {search} ({search}) VALUES ('optimize')")
+        execute_statements(conn, SEARCH_TRIGGER_TEMPLATE.format(
+            search=search, stored=layout.table(table), id=id_column, columns=listed,
+            new_values=", ".join(search_value(table, column, "NEW", layout) for column in columns),
+            old_values=", ".join(search_value(table, column, "OLD", layout) for column in columns),
+            new_present=has_text(columns, "NEW"), old_present=has_text(columns, "OLD"),
+        ))
+
+def verify_search_index(conn):
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not set(SEARCH_TABLES) <= present:
+        print("❌ No search indexes to check; generate the database with --search-index")
+        return False
+    verified = True
+    for search, (table, id_column, columns) in SEARCH_TABLES.items():
+        try:
+            conn.execute(f"INSERT INTO {search} ({search}) VALUES ('integrity-check')")
+        except sqlite3.DatabaseError as error:
+            print(f"❌ {search} is corrupt: {error}")
+            verified = False
+            continue
+        # Rows without text are left out on purpose, so FTS5's own comparison
+        # with the content table does not apply; compare the indexed rowids
+        indexed = f"SELECT id FROM {search}_docsize"
+        expected = f"SELECT {id_column} FROM {table} WHERE {has_text(columns)}"
+        missing, unexpected = (
+            conn.execute(f"SELECT COUNT(*) FROM ({first} EXCEPT {second})").fetchone()[0]
+            for first, second in ((expected, indexed), (indexed, expected))
+        )
+        if missing or unexpected:
+            print(f"❌ {search} differs from {table}: {missing} rows missing, {unexpected} unexpected")
+            verified = False
+    if verified:
+        print("✅ Search indexes match the indexed tables")
+    return verified
+
+def finish_build(conn, settings):
+    # Structures that maintain themselves on later writes, created once the
+    # bulk rows are in
+    if settings.search_index:
+        print("Building the search index...")
+        create_search_index(conn, settings.layout)
+    if settings.aggregate_triggers:
+        create_aggregate_triggers(conn)
+    if settings.workflow_stages:
+        refresh_workflow_tables(conn)
+    if settings.keyset_pagination:
+        refresh_history_counts(conn)
+    conn.commit()
+
+# --- GENERATOR STATE ---
+def save_generator_state(conn, settings, seed, checkpoint_every=None):
+    conn.execute("CREATE TABLE IF NOT EXISTS generatorState (key TEXT PRIMARY KEY, value TEXT)")
+    state = [("settings", json.dumps(asdict(settings), sort_keys=True)), ("seed", str(seed))]
+    if checkpoint_every:
+        # Not a setting of the data: a resumed run keeps committing as often
+        state.append(("checkpoint_every", str(checkpoint_every)))
+    conn.executemany("INSERT OR REPLACE INTO generatorState (key, value) VALUES (?, ?)", state)
+    conn.commit()
+
+def load_generator_state(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'generatorState'"
+    ).fetchone()
+    if not exists:
+        return None, None
+    state = dict(conn.execute("SELECT key, value FROM generatorState").fetchall())
+    return GenerationSettings(**json.loads(state["settings"])), int(state["seed"])
+
+def load_checkpoint_every(conn):
+    row = conn.execute("SELECT value FROM generatorState WHERE key = 'checkpoint_every'").fetchone()
+    return int(row[0]) if row else None
+
+def next_row_ids(conn):
+    # Continue after whatever is already committed (nothing, for a fresh file)
+    present = existing_tables(conn)
+    return tuple(
+        conn.execute(f"SELECT COALESCE(MAX({TABLE_COLUMNS[table][0]}), 0) + 1 FROM {table}").fetchone()[0]
+        if table in present else 1
+        for table in ("fetchingHistory", "content_items", "processingHistory", "processing_content_history",
+                      *WORKFLOW_STAGES)
+    )
+
+def last_committed_flux(conn):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM fluxData").fetchone()[0]
 
 # --- DATA GENERATION ---
-def generate_data(conn):
-    print(f"Generating {TOTAL_FLUXES} flux entries...")
-    cursor = conn.cursor()
-    for i in range(1, TOTAL_FLUXES + 1):
-        if i % 100 == 0:
-            print(f"  - Generated {i}/{TOTAL_FLUXES} fluxes...")
+def seed_flux(seed, flux_id):
+    # Every flux draws from its own seeded stream, so a flux's rows depend only
+    # on (seed, flux_id) and not on which process or shard generated it.
+    random.seed(f"{seed}:{flux_id}")
+    fake.seed_instance(f"{seed}:{flux_id}")
+
+def generate_data(sink, settings, seed, first_flux=1, last_flux=None, batch_size=DEFAULT_BATCH_SIZE,
+                  checkpoint_every=None, pools=None, start_ids=(1,) * 7, verbose=True, metrics=None):
+    # pools=None selects the per-call Faker path. start_ids are the next
+    # fetching, content, processing, processing_content_history,
+    # normalization, refinement and calculation IDs.
+    last_flux = settings.total_fluxes if last_flux is None else last_flux
+    specs = column_specs(settings)
+    if verbose:
+        print(f"Generating {last_flux - first_flux + 1} flux entries...")
+    metrics = RunMetrics() if metrics is None else metrics
+    writer = BulkWriter(sink, batch_size, metrics.rows)
+    stamps = TimestampColumns(settings.timestamp_format)
+    if settings.rollups:
+        # Global counts cover many fluxes; they are added to the stored rows at
+        # every commit so a resumed run only contributes its own fluxes.
+        fetching_totals, processing_totals = Rollups(), Rollups()
+    next_fetching_id, next_content_id, next_processing_id, next_content_history_id, *stage_ids = start_ids
+    next_stage_ids = dict(zip(WORKFLOW_STAGES, stage_ids))
+    ranks = workload_ranks(settings, seed)
+    progress_every = max(100, settings.total_fluxes // 100)
+    for i in range(first_flux, last_flux + 1):
+        if verbose and i % progress_every == 0:
+            print(f"  - Generated {i}/{settings.total_fluxes} fluxes...")
+        if checkpoint_every and i > first_flux and (i - first_flux) % checkpoint_every == 0:
+            # Only whole fluxes are ever committed, so a resumed run can pick up
+            # right after the highest fluxData id.
+            metrics.phase("aggregates")
+            if settings.rollups:
+                write_global_rollups(writer, fetching_totals, processing_totals)
+            metrics.phase("write")
+            writer.flush()
+            metrics.phase("commit")
+            sink.commit()
+        metrics.phase("flux_row")
+        if pools is None:
+            draws = FakerDraws(specs, seed, i)
+        else:
+            draws = PooledDraws(specs, pools, seed, i)
 
         # 1. Basic fluxData generation
-        created_at = generate_created_at(i)
+        created_at = generate_created_at(i, settings)
         created_at_iso = created_at.strftime("%Y-%m-%dT%H:%M:%SZ")
         edited_at_iso = None
         if random_bool(0.3):
@@ -271,7 +2127,7 @@ def generate_data(conn):
             edited_at_iso = created_at_iso
 
         flux_type = random_item(FLUX_TYPES)
-        name = f"{fake.company()} {random_item(FINANCIAL_TYPES)} {flux_type} Flux"
+        name = f"{draws.text('company')} {random_item(FINANCIAL_TYPES)} {flux_type} Flux"
 
         roll = random.random()
         if roll < 0.7:
@@ -287,48 +2143,44 @@ def generate_data(conn):
         fetch_cfg = generate_schedule_config(random_item(FREQUENCY_TYPES)) if fetch_schedule_type == SCHEDULE_TYPES["ACTIVE"] else {}
         proc_cfg = generate_schedule_config(random_item(FREQUENCY_TYPES)) if processing_schedule_type == SCHEDULE_TYPES["ACTIVE"] else {}
 
-        cursor.execute(
-            """
-INSERT INTO fluxData (
-    id, name, source, fluxState, comment, description,
-    fetchScheduleType, fetchScheduleConfiguration,
-    processingScheduleType, processingScheduleConfiguration,
-    createdAt, editedAt, financialType, fluxType,
-    fluxTypeConfiguration, allowConcurrentMultiFetching
-) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-""",
-            (
-                i,
-                name,
-                random_item(SOURCES),
-                flux_state,
-                fake.sentence() if random_bool(0.8) else None,
-                fake.paragraph() if random_bool(0.8) else None,
-                fetch_schedule_type,
-                json.dumps(fetch_cfg),
-                processing_schedule_type,
-                json.dumps(proc_cfg),
-                created_at_iso,
-                edited_at_iso,
-                random_item(FINANCIAL_TYPES),
-                flux_type,
-                json.dumps(generate_flux_type_config(flux_type)),
-                1 if random_bool(0.02) else 0
-            )
+        flux_row = (
+            i,
+            name,
+            random_item(SOURCES),
+            flux_state,
+            draws.text("sentence") if random_bool(0.8) else None,
+            draws.text("paragraph") if random_bool(0.8) else None,
+            fetch_schedule_type,
+            json.dumps(fetch_cfg),
+            processing_schedule_type,
+            json.dumps(proc_cfg),
+            created_at_iso,
+            edited_at_iso,
+            random_item(FINANCIAL_TYPES),
+            flux_type,
+            json.dumps(generate_flux_type_config(flux_type, draws)),
+            1 if random_bool(0.02) else 0
         )
         flux_id = i
+        aggregates = FluxAggregates()
+        fetching_rollups, processing_rollups = Rollups(), Rollups()
 
         if flux_state == FLUX_STATES["DISABLED"]:
+            writer.add("fluxData", flux_row + aggregates.values())
+            metrics.phase("write")
+            writer.flush_if_full()
             continue
 
         # 2. History generation
-        num_history = random_int(5, 50)
+        num_history, spacing, first_run = history_plan(i, created_at, fetch_cfg, flux_type, settings, ranks)
+        # (fetchingID, completion time, contentIDs) of the latest successful fetch
         last_successful_fetch = None
         for j in range(num_history):
             is_last = (j == num_history - 1)
             # Fetching
+            metrics.phase("fetching_history")
             if is_last:
-                final_roll = random.random()
+                final_roll = draws.take("fetch_status_roll")
                 if final_roll < 0.75:
                     fetch_status = FETCHING_STATUSES["SUCCESS"]
                 elif final_roll < 0.95:
@@ -336,81 +2188,78 @@ INSERT INTO fluxData (
                 else:
                     fetch_status = FETCHING_STATUSES["CURRENTLY_FETCHING"]
             else:
-                fetch_status = FETCHING_STATUSES["SUCCESS"] if random.random() < 0.9 else FETCHING_STATUSES["FAILED"]
+                fetch_status = FETCHING_STATUSES["SUCCESS"] if draws.take("fetch_status_roll") < 0.9 else FETCHING_STATUSES["FAILED"]
 
-            fetch_ts = created_at + timedelta(days=j, seconds=random_int(1000, 100000))
-            fetch_ts_iso = fetch_ts.strftime("%Y-%m-%dT%H:%M:%SZ")
-            duration = random_int(5, 120)
-            completed_at_iso = None
+            if spacing is None:
+                fetch_ts = created_at + timedelta(days=j, seconds=draws.take("fetch_offset"))
+            else:
+                fetch_ts = first_run + timedelta(seconds=j * spacing + draws.take("fetch_offset") % spacing)
+            fetch_ts_value = stamps.value(fetch_ts)
+            duration = draws.take("fetch_duration")
+            completed_at = None
             if fetch_status != FETCHING_STATUSES["CURRENTLY_FETCHING"]:
                 completed_at = fetch_ts + timedelta(seconds=duration)
-                completed_at_iso = completed_at.strftime("%Y-%m-%dT%H:%M:%SZ")
 
             progress = (
                 100 if fetch_status == FETCHING_STATUSES["SUCCESS"] else
-                random_int(10, 90) if fetch_status == FETCHING_STATUSES["CURRENTLY_FETCHING"] else
-                random_int(0, 80)
+                draws.take("fetch_progress_current") if fetch_status == FETCHING_STATUSES["CURRENTLY_FETCHING"] else
+                draws.take("fetch_progress_failed")
             )
-            num_content = random_int(1, 5) if fetch_status == FETCHING_STATUSES["SUCCESS"] else 0
+            num_content = draws.take("num_content") if fetch_status == FETCHING_STATUSES["SUCCESS"] else 0
 
-            cursor.execute(
-                """
-INSERT INTO fetchingHistory (
-    fluxID, status, timestamp, completedAt,
-    fetchingTimeInSeconds, progress,
-    numberOfContent, errorMessage
-) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-""",
-                (
-                    flux_id,
-                    fetch_status,
-                    fetch_ts_iso,
-                    completed_at_iso,
-                    duration if fetch_status != FETCHING_STATUSES["CURRENTLY_FETCHING"] else None,
-                    progress,
-                    num_content,
-                    random_item(FETCHING_ERROR_MESSAGES) if fetch_status == FETCHING_STATUSES["FAILED"] else None
-                )
-            )
-            fetching_id = cursor.lastrowid
+            fetching_id = next_fetching_id
+            next_fetching_id += 1
+            fetch_duration = duration if fetch_status != FETCHING_STATUSES["CURRENTLY_FETCHING"] else None
+            fetch_error = draws.take("fetch_error") if fetch_status == FETCHING_STATUSES["FAILED"] else None
+            aggregates.record_fetch(fetching_id, fetch_status, fetch_ts_value, progress, fetch_duration)
+            if settings.rollups:
+                fetching_rollups.record(fetch_status, fetch_ts.date().isoformat(), fetch_duration, fetch_error)
+            writer.add("fetchingHistory", (
+                fetching_id,
+                flux_id,
+                fetch_status,
+                fetch_ts_value,
+                stamps.value(completed_at),
+                fetch_duration,
+                progress,
+                num_content,
+                fetch_error
+            ) + stamps.extras(fetch_ts, completed_at))
 
             if fetch_status == FETCHING_STATUSES["SUCCESS"]:
-                last_successful_fetch = (fetching_id, fetch_ts + timedelta(seconds=duration))
+                metrics.phase("content_items")
+                content_ids = []
+                content_extras = stamps.extras(fetch_ts, fetch_ts)
                 for _ in range(num_content):
-                    content_name = fake.file_name(extension=random_item(["csv", "xls", "json", "xml"]))
+                    content_name = draws.file_name(draws.take("content_extension"))
                     content_short = generate_short_content_name(content_name)
-                    now_iso = fetch_ts.strftime("%Y-%m-%dT%H:%M:%SZ")
-                    cursor.execute(
-                        """
-INSERT INTO content_items (
-    fetchingID, fluxID, contentName, contentShortName,
-    description, fileSize, contentLength,
-    fileType, mimeType, encoding, hash,
-    createdAt, modifiedAt, sourceUrl
-) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-""",
-                        (
-                            fetching_id,
-                            flux_id,
-                            content_name,
-                            content_short,
-                            fake.sentence(),
-                            random_int(1024, 1024*1024),
-                            random_int(1000, 1024*1000),
-                            os.path.splitext(content_name)[1].lstrip('.'),
-                            fake.mime_type(),
-                            "UTF-8",
-                            fake.hexify('^'*64),
-                            now_iso,
-                            now_iso,
-                            fake.url()
-                        )
-                    )
+                    content_id = next_content_id
+                    next_content_id += 1
+                    content_ids.append(content_id)
+                    writer.add("content_items", (
+                        content_id,
+                        fetching_id,
+                        flux_id,
+                        content_name,
+                        content_short,
+                        draws.text("sentence"),
+                        draws.take("content_file_size"),
+                        draws.take("content_length"),
+                        os.path.splitext(content_name)[1].lstrip('.'),
+                        draws.text("mime_type"),
+                        "UTF-8",
+                        draws.content_hash(),
+                        fetch_ts_value,
+                        fetch_ts_value,
+                        draws.text("url")
+                    ) + content_extras)
+                last_successful_fetch = (fetching_id, fetch_ts + timedelta(seconds=duration), content_ids)
 
             # Processing
-            if last_successful_fetch and random_bool(0.8):
+            if last_successful_fetch and draws.take("processing_roll") < 0.8:
+                metrics.phase("processing_history")
                 if is_last:
-                    final_roll = random.random()
+                    final_roll = draws.take("processing_status_roll")
                     if final_roll < 0.75:
                         proc_status = PROCESSING_STATUSES["SUCCESS"]
                     elif final_roll < 0.95:
@@ -418,168 +2267,1473 @@ INSERT INTO content_items (
                     else:
                         proc_status = PROCESSING_STATUSES["CURRENTLY_PROCESSING"]
                 else:
-                    proc_status = PROCESSING_STATUSES["SUCCESS"] if random.random() < 0.9 else PROCESSING_STATUSES["FAILED"]
+                    proc_status = PROCESSING_STATUSES["SUCCESS"] if draws.take("processing_status_roll") < 0.9 else PROCESSING_STATUSES["FAILED"]
 
-                proc_start = last_successful_fetch[1] + timedelta(seconds=random_int(10000, 60000))
-                proc_start_iso = proc_start.strftime("%Y-%m-%dT%H:%M:%SZ")
-                proc_dur = random_int(10, 300)
-                proc_end_iso = None
+                proc_offset = draws.take("processing_offset")
+                if spacing is not None:
+                    proc_offset %= spacing
+                proc_start = last_successful_fetch[1] + timedelta(seconds=proc_offset)
+                proc_start_value = stamps.value(proc_start)
+                proc_dur = draws.take("processing_duration")
+                proc_end = None
                 if proc_status != PROCESSING_STATUSES["CURRENTLY_PROCESSING"]:
                     proc_end = proc_start + timedelta(seconds=proc_dur)
-                    proc_end_iso = proc_end.strftime("%Y-%m-%dT%H:%M:%SZ")
 
                 proc_prog = (
                     100 if proc_status == PROCESSING_STATUSES["SUCCESS"] else
-                    random_int(10, 90) if proc_status == PROCESSING_STATUSES["CURRENTLY_PROCESSING"] else
-                    random_int(0, 80)
+                    draws.take("processing_progress_current") if proc_status == PROCESSING_STATUSES["CURRENTLY_PROCESSING"] else
+                    draws.take("processing_progress_failed")
                 )
 
-                cursor.execute(
-                    """
-INSERT INTO processingHistory (
-    fluxID, fetchingID, status, timestamp,
-    completedAt, numberOfProcessingContent,
-    processingTimeInSeconds, progress, errorMessage
-) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-""",
-                    (
-                        flux_id,
-                        last_successful_fetch[0],
-                        proc_status,
-                        proc_start_iso,
-                        proc_end_iso,
-                        0,
-                        proc_dur if proc_status != PROCESSING_STATUSES["CURRENTLY_PROCESSING"] else None,
-                        proc_prog,
-                        random_item(PROCESSING_ERROR_MESSAGES) if proc_status == PROCESSING_STATUSES["FAILED"] else None
-                    )
-                )
-                processing_id = cursor.lastrowid
+                processing_id = next_processing_id
+                next_processing_id += 1
+                processed_content_ids = last_successful_fetch[2] if proc_status == PROCESSING_STATUSES["SUCCESS"] else []
+                proc_duration = proc_dur if proc_status != PROCESSING_STATUSES["CURRENTLY_PROCESSING"] else None
+                proc_error = draws.take("processing_error") if proc_status == PROCESSING_STATUSES["FAILED"] else None
+                aggregates.record_processing(processing_id, proc_status, proc_start_value, proc_prog, proc_duration)
+                if settings.rollups:
+                    processing_rollups.record(proc_status, proc_start.date().isoformat(), proc_duration, proc_error)
+                writer.add("processingHistory", (
+                    processing_id,
+                    flux_id,
+                    last_successful_fetch[0],
+                    proc_status,
+                    proc_start_value,
+                    stamps.value(proc_end),
+                    len(processed_content_ids),
+                    proc_duration,
+                    proc_prog,
+                    proc_error
+                ) + stamps.extras(proc_start, proc_end))
 
                 # processing_content_history
-                if proc_status == PROCESSING_STATUSES["SUCCESS"]:
-                    cursor.execute(
-                        "SELECT contentID FROM content_items WHERE fetchingID = ?",
-                        (last_successful_fetch[0],)
-                    )
-                    items = cursor.fetchall()
-                    for item in items:
-                        start_ct = proc_start + timedelta(seconds=random_int(1000, 5000))
-                        dur_ct = random_int(5, 60)
-                        end_ct = start_ct + timedelta(seconds=dur_ct)
-                        stats = {
-                            "rowsInserted": random_int(50, 200),
-                            "rowsUpdated": random_int(0, 50),
-                            "rowsIgnored": random_int(0, 10)
-                        }
-                        cursor.execute(
-                            """
-INSERT INTO processing_content_history (
-    processingID, contentID,
-    processingStartTime, processingEndTime,
-    processingTimeInSeconds, status, statistics
-) VALUES (?, ?, ?, ?, ?, ?, ?)
-""",
-                            (
-                                processing_id,
-                                item[0],
-                                start_ct.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                                end_ct.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                                dur_ct,
-                                PROCESSING_STATUSES["SUCCESS"],
-                                json.dumps(stats)
-                            )
+                metrics.phase("content_history")
+                for content_id in processed_content_ids:
+                    start_ct = proc_start + timedelta(seconds=draws.take("content_processing_offset"))
+                    dur_ct = draws.take("content_processing_duration")
+                    end_ct = start_ct + timedelta(seconds=dur_ct)
+                    stats = {
+                        "rowsInserted": draws.take("rows_inserted"),
+                        "rowsUpdated": draws.take("rows_updated"),
+                        "rowsIgnored": draws.take("rows_ignored")
+                    }
+                    writer.add("processing_content_history", (
+                        next_content_history_id,
+                        processing_id,
+                        content_id,
+                        stamps.value(start_ct),
+                        stamps.value(end_ct),
+                        dur_ct,
+                        PROCESSING_STATUSES["SUCCESS"],
+                        json.dumps(stats)
+                    ) + stamps.extras(start_ct, end_ct))
+                    next_content_history_id += 1
+
+                # Normalization, refinement and calculation, each following a
+                # successful run of the stage before
+                if settings.workflow_stages:
+                    metrics.phase("workflow_stages")
+                    parent_id, parent_status, parent_end = processing_id, proc_status, proc_end
+                    for table, (_, _, _, _, running_status, error_column) in WORKFLOW_STAGES.items():
+                        if parent_status != STAGE_STATUSES["SUCCESS"] or draws.take("stage_roll") >= STAGE_CONTINUE_RATE:
+                            break
+                        if is_last:
+                            final_roll = draws.take("stage_status_roll")
+                            if final_roll < 0.75:
+                                stage_status = STAGE_STATUSES["SUCCESS"]
+                            elif final_roll < 0.95:
+                                stage_status = STAGE_STATUSES["FAILED"]
+                            else:
+                                stage_status = running_status
+                        else:
+                            stage_status = STAGE_STATUSES["SUCCESS"] if draws.take("stage_status_roll") < 0.9 else STAGE_STATUSES["FAILED"]
+                        stage_start = parent_end + timedelta(seconds=draws.take("stage_offset"))
+                        stage_duration = draws.take("stage_duration") if stage_status != running_status else None
+                        stage_end = stage_start + timedelta(seconds=stage_duration) if stage_duration is not None else None
+                        stage_progress = (
+                            100 if stage_status == STAGE_STATUSES["SUCCESS"] else
+                            draws.take("stage_progress_current") if stage_status == running_status else
+                            draws.take("stage_progress_failed")
                         )
-                    cursor.execute(
-                        "UPDATE processingHistory SET numberOfProcessingContent = ? WHERE processingID = ?",
-                        (len(items), processing_id)
-                    )
+                        stage_id = next_stage_ids[table]
+                        next_stage_ids[table] += 1
+                        writer.add(table, (
+                            stage_id,
+                            flux_id,
+                            parent_id,
+                            stage_status,
+                            stage_start.strftime(ISO_FORMAT),
+                            stage_end.strftime(ISO_FORMAT) if stage_end else None,
+                            stage_duration,
+                            stage_progress,
+                            len(processed_content_ids),
+                            draws.take(error_column) if stage_status == STAGE_STATUSES["FAILED"] else None
+                        ))
+                        parent_id, parent_status, parent_end = stage_id, stage_status, stage_end
 
-        # 3. Update aggregates
-        agg_query = """
-WITH LatestFetching AS (
-    SELECT * FROM fetchingHistory WHERE fluxID = ? ORDER BY timestamp DESC LIMIT 1
-), LatestProcessing AS (
-    SELECT * FROM processingHistory WHERE fluxID = ? ORDER BY timestamp DESC LIMIT 1
-), Counts AS (
-    SELECT
-        COUNT(*) AS totalFetches,
-        SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) AS successFetches,
-        SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) AS errorFetches,
-        SUM(CASE WHEN status = 'Currently fetching' THEN 1 ELSE 0 END) AS currentFetches
-    FROM fetchingHistory WHERE fluxID = ?
-), ProcessingCounts AS (
-    SELECT
-        COUNT(*) AS totalProcesses,
-        SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) AS successProcesses,
-        SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) AS errorProcesses,
-        SUM(CASE WHEN status = 'Currently processing' THEN 1 ELSE 0 END) AS currentProcesses
-    FROM processingHistory WHERE fluxID = ?
-)
-SELECT
-    lf.status AS fetchingStatus,
-    lp.status AS processingStatus,
-    c.totalFetches,
-    pc.totalProcesses,
-    c.errorFetches,
-    pc.errorProcesses,
-    c.successFetches,
-    pc.successProcesses,
-    c.currentFetches,
-    pc.currentProcesses,
-    lf.progress AS fetchingProgress,
-    lp.progress AS processingProgress,
-    lf.timestamp AS lastFetchingDate,
-    lp.timestamp AS lastProcessingDate,
-    lf.fetchingTimeInSeconds AS lastDurationFetching,
-    lp.processingTimeInSeconds AS lastDurationProcessing
-FROM LatestFetching lf
-LEFT JOIN LatestProcessing lp ON lp.fluxID = lf.fluxID
-CROSS JOIN Counts c
-CROSS JOIN ProcessingCounts pc
+            if j % HOT_FLUX_FLUSH_RUNS == HOT_FLUX_FLUSH_RUNS - 1:
+                # Keeps the buffers of a flux with very many runs bounded
+                metrics.phase("write")
+                writer.flush_if_full()
+
+        # 3. fluxData is written once, with the aggregates accumulated above
+        metrics.phase("aggregates")
+        writer.add("fluxData", flux_row + aggregates.values())
+        if settings.rollups:
+            for table, rollups, totals in (
+                ("fetchingRollupDaily", fetching_rollups, fetching_totals),
+                ("processingRollupDaily", processing_rollups, processing_totals),
+            ):
+                for row in rollups.rows(flux_id):
+                    writer.add(table, row)
+                rollups.merge_into(totals)
+        metrics.phase("write")
+        writer.flush_if_full()
+
+    metrics.phase("aggregates")
+    if settings.rollups:
+        write_global_rollups(writer, fetching_totals, processing_totals)
+    metrics.phase("write")
+    writer.flush()
+    metrics.phase("commit")
+    sink.commit()
+
+def write_global_rollups(writer, fetching_totals, processing_totals):
+    for table, totals in (("fetchingRollupGlobal", fetching_totals), ("processingRollupGlobal", processing_totals)):
+        for row in totals.rows():
+            writer.add(table, row)
+        totals.counts.clear()
+
+# --- SHARDED GENERATION ---
+# Columns holding generated IDs, mapped to the table that owns the ID range.
+ID_COLUMNS = {
+    "fetchingID": "fetchingHistory",
+    "contentID": "content_items",
+    "processingID": "processingHistory",
+    "processing_content_history_ID": "processing_content_history",
+    "normalizationID": "normalization_history",
+    "refinementID": "refinement_history",
+    "calculationID": "calculation_history",
+}
+
+def generate_shard(shard_path, settings, first_flux, last_flux, seed, batch_size, pools):
+    # Shards are scratch files, so they always use the fast-load settings
+    conn = connect_for_build(shard_path, settings, fast_load=True)
+    # Forked workers inherit tracemalloc and the cProfile hook of the parent,
+    # which measures only itself
+    tracemalloc.stop()
+    sys.setprofile(None)
+    metrics = RunMetrics()
+    generate_data(SqliteSink(conn, settings.layout), settings, seed, first_flux, last_flux, batch_size,
+                  pools=pools, verbose=False, metrics=metrics)
+    metrics.stop()
+    present = existing_tables(conn)
+    counts = {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] if table in present else 0
+        for table in ID_COLUMNS.values()
+    }
+    conn.close()
+    print(f"  - Generated fluxes {first_flux}-{last_flux}")
+    return counts, metrics.seconds, metrics.rows
+
+def split_flux_ranges(total, shards):
+    size, extra = divmod(total, shards)
+    ranges = []
+    first = 1
+    for shard in range(shards):
+        last = first + size - 1 + (1 if shard < extra else 0)
+        ranges.append((first, last))
+        first = last + 1
+    return ranges
+
+def merge_shards(conn, shards):
+    # shards is a list of (path, row counts) in flux order. Shard IDs start at 1,
+    # so offsetting each shard by the row counts of the shards before it yields
+    # exactly the IDs a single-process run would have assigned. Tables are merged
+    # one at a time in FK order so the insert order never depends on the shard count.
+    conn.execute("PRAGMA foreign_keys = OFF")
+    offsets = []
+    running = {table: 0 for table in ID_COLUMNS.values()}
+    for _, counts in shards:
+        offsets.append(dict(running))
+        for table in running:
+            running[table] += counts[table]
+
+    layout = stored_layout(conn)
+    for table in existing_tables(conn):
+        stored = layout.table(table)
+        columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({stored})")]
+        for index, (path, _) in enumerate(shards):
+            select = ", ".join(
+                f"{column} + {offsets[index][ID_COLUMNS[column]]}" if column in ID_COLUMNS else column
+                for column in columns
+            )
+            # Shards are attached one at a time to stay under SQLite's attach limit
+            conn.execute("ATTACH DATABASE ? AS shard", (path,))
+            if table in ACCUMULATING_TABLES:
+                # Every shard holds partial counts for the same keys
+                tail = "WHERE true ON CONFLICT DO UPDATE SET count = count + excluded.count"
+            elif table in ROLLUP_TABLES:
+                tail = ""
+            else:
+                tail = "ORDER BY rowid"
+            conn.execute(
+                f"INSERT INTO main.{stored} ({', '.join(columns)}) "
+                f"SELECT {select} FROM shard.{stored} {tail}"
+            )
+            conn.commit()
+            conn.execute("DETACH DATABASE shard")
+    conn.execute("PRAGMA foreign_keys = ON")
+
+def generate_sharded(db_path, settings, seed, workers, batch_size, fast_load, pools, metrics):
+    shard_count = min(settings.total_fluxes, workers * 4)
+    ranges = split_flux_ranges(settings.total_fluxes, shard_count)
+    print(f"Generating {settings.total_fluxes} flux entries in {shard_count} shards on {workers} workers...")
+    shard_dir = tempfile.mkdtemp(prefix="hillmetrics-shards-", dir=os.path.dirname(os.path.abspath(db_path)))
+    try:
+        tasks = [
+            (os.path.join(shard_dir, f"shard-{index:04d}.db"), settings, first, last, seed, batch_size, pools)
+            for index, (first, last) in enumerate(ranges)
+        ]
+        metrics.phase("shards")
+        with Pool(workers) as pool:
+            results = pool.starmap(generate_shard, tasks)
+        counts = [shard_counts for shard_counts, _, _ in results]
+        for _, seconds, rows in results:
+            metrics.merge(seconds, rows)
+
+        # Merge into a scratch file, then VACUUM INTO the target so the page
+        # layout and header of the result do not depend on the shard count.
+        metrics.phase("merge")
+        merged_path = os.path.join(shard_dir, "merged.db")
+        conn = connect_for_build(merged_path, settings, fast_load=True)
+        print("Merging shards...")
+        merge_shards(conn, [(task[0], shard_counts) for task, shard_counts in zip(tasks, counts)])
+        metrics.count_stored(conn, list(metrics.rows))
+        save_generator_state(conn, settings, seed)
+        metrics.phase("indexes")
+        if fast_load:
+            finish_fast_load(conn, settings)
+        else:
+            create_indexes(conn, settings.index_profile, settings.layout)
+        metrics.phase("finish")
+        finish_build(conn, settings)
+        metrics.phase("vacuum")
+        conn.execute("VACUUM INTO ?", (db_path,))
+        conn.close()
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+# --- FILE EXPORT ---
+def generate_export(directory, output_format, settings, seed, batch_size, metrics=None):
+    print(f"Streaming {settings.total_fluxes} fluxes as {output_format} into {directory}/ ...")
+    metrics = RunMetrics() if metrics is None else metrics
+    metrics.phase("value_pools")
+    pools = value_pools_for(settings, seed)
+    sink = open_file_sink(output_format, directory, settings.layout)
+    try:
+        generate_data(sink, settings, seed, batch_size=batch_size, pools=pools, metrics=metrics)
+        metrics.phase("close")
+    finally:
+        sink.close()
+    print(f"✅ Successfully exported tables to: {directory}")
+
+def value_pools_for(settings, seed):
+    if settings.faker_values:
+        return None
+    print(f"Building value pools ({settings.pool_size} entries each)...")
+    return build_value_pools(seed, settings.pool_size)
+
+# --- CONTENT PAYLOADS ---
+# With --payloads every content item gets synthetic bytes of its fileType:
+# CSV, JSON and XML documents of market data records, and for xls an OLE2
+# signature followed by random bytes. They are appended to one pack file next
+# to the database; content_payloads maps each contentID to an offset and
+# length in it. Payloads come from a bounded pool of templates keyed by
+# (fileType, size bucket, variant): the size is the item's fileSize rounded
+# down to a quarter power of two (and capped at --payload-max-bytes), the
+# variant is picked by the item's content hash. Each template is stored once
+# per SHA-256 of its bytes, so with the default file sizes the pack stays
+# under about 100 MiB however many items point into it. Rows already in content_payloads are skipped, so
+# the pack only ever grows; read it with read-payloads.py.
+PAYLOAD_RECORDS = 1024
+PAYLOAD_CHUNK_ROWS = 1000
+PAYLOAD_SIZE_STEPS = 4
+PAYLOAD_VARIANTS = 4
+PAYLOAD_CURRENCIES = ["EUR", "USD", "GBP", "CHF", "JPY"]
+PAYLOAD_COUNTRIES = ["FR", "LU", "DE", "GB", "US", "CH", "IE", "NL"]
+OLE2_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+# fileType -> (header, footer, padding byte); the padding fills the gap left
+# by the last whole record and is insignificant in each format
+PAYLOAD_FORMATS = {
+    "csv": (b"date,identifier,price,volume,currency\n", b"", b"\n"),
+    "json": (b"[\n", b"]\n", b" "),
+    "xml": (b'<?xml version="1.0" encoding="UTF-8"?>\n<records>\n', b"</records>\n", b" "),
+}
+
+CONTENT_PAYLOADS_TABLE = """
+CREATE TABLE IF NOT EXISTS content_payloads (
+    contentID INTEGER PRIMARY KEY,
+    payloadHash CHAR(64) NOT NULL,
+    payloadOffset INTEGER NOT NULL,
+    payloadLength INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_content_payloads_hash ON content_payloads(payloadHash);
 """
-        cursor.execute(agg_query, (flux_id, flux_id, flux_id, flux_id))
-        stats = cursor.fetchone()
-        if stats:
-            cursor.execute(
+
+def payload_path(path):
+    return f"{os.path.splitext(path)[0]}.payloads"
+
+def payload_records(seed):
+    # One pool of records per text format, shared by every payload of a run
+    rng = np.random.default_rng([seed, 2])
+    dates = [
+        (WINDOW_START + timedelta(days=days)).strftime("%Y-%m-%d")
+        for days in rng.integers(0, (WINDOW_END - WINDOW_START).days, PAYLOAD_RECORDS).tolist()
+    ]
+    identifiers = [
+        f"{PAYLOAD_COUNTRIES[country]}{number:010d}"
+        for country, number in zip(rng.integers(0, len(PAYLOAD_COUNTRIES), PAYLOAD_RECORDS).tolist(),
+                                    rng.integers(0, 10**10, PAYLOAD_RECORDS).tolist())
+    ]
+    prices = rng.uniform(1, 5000, PAYLOAD_RECORDS).round(4).tolist()
+    volumes = rng.integers(1, 10**7, PAYLOAD_RECORDS).tolist()
+    currencies = [PAYLOAD_CURRENCIES[index] for index in rng.integers(0, len(PAYLOAD_CURRENCIES), PAYLOAD_RECORDS).tolist()]
+    fields = list(zip(dates, identifiers, prices, volumes, currencies))
+    records = {
+        "csv": [f"{d},{i},{p},{v},{c}\n" for d, i, p, v, c in fields],
+        # Every record ends with a comma; build_payload drops the last one
+        "json": [
+            f'  {{"date": "{d}", "identifier": "{i}", "price": {p}, "volume": {v}, "currency": "{c}"}},\n'
+            for d, i, p, v, c in fields
+        ],
+        "xml": [
+            f'  <record date="{d}" identifier="{i}" price="{p}" volume="{v}" currency="{c}"/>\n'
+            for d, i, p, v, c in fields
+        ],
+    }
+    return {
+        file_type: ([line.encode("ascii") for line in lines], np.array([len(line) for line in lines]))
+        for file_type, lines in records.items()
+    }
+
+def payload_key(file_type, file_size, content_hash, max_bytes):
+    size = 0
+    if file_size and file_size > 0:
+        size = int(2 ** (math.floor(math.log2(file_size) * PAYLOAD_SIZE_STEPS) / PAYLOAD_SIZE_STEPS))
+    if max_bytes:
+        size = min(size, max_bytes)
+    return file_type, size, int(content_hash[:8], 16) % PAYLOAD_VARIANTS
+
+def build_payload(records, seed, file_type, file_size, variant):
+    rng = np.random.default_rng([seed, 3, file_size, variant, *file_type.encode()])
+    if file_type not in PAYLOAD_FORMATS:
+        return (OLE2_SIGNATURE + rng.bytes(max(0, file_size - len(OLE2_SIGNATURE))))[:file_size]
+    header, footer, padding = PAYLOAD_FORMATS[file_type]
+    chunks, lengths = records[file_type]
+    budget = max(0, file_size - len(header) - len(footer))
+    # Enough picks to fill the budget with the shortest record, then as many
+    # whole records as fit
+    picks = rng.integers(0, len(chunks), budget // int(lengths.min()) + 1)
+    count = int(np.searchsorted(np.cumsum(lengths[picks]), budget, side="right"))
+    body = b"".join([chunks[index] for index in picks[:count].tolist()])
+    if file_type == "json" and body:
+        body = body[:-2] + b"\n "
+    return (header + body + padding * (budget - len(body)) + footer)[:file_size]
+
+def write_payloads(path, seed, max_bytes=0, pack=None):
+    # pack: where the pack file is written, if not next to path (a build
+    # writes it beside its side file and swaps both in together)
+    conn = sqlite3.connect(path)
+    conn.executescript(CONTENT_PAYLOADS_TABLE)
+    pack = pack or payload_path(path)
+    end = conn.execute("SELECT COALESCE(MAX(payloadOffset + payloadLength), 0) FROM content_payloads").fetchone()[0]
+    if end and not os.path.exists(pack):
+        sys.exit(f"Cannot append payloads: {pack} is missing but {path} indexes {end} bytes in it")
+    records = payload_records(seed)
+    written = stored = shared = 0
+    # Template key -> (digest, offset, length) of its slice in the pack
+    slices = {}
+    print(f"Writing content payloads to {pack}...")
+    with open(pack, "r+b" if os.path.exists(pack) else "wb") as handle:
+        # Bytes past the last indexed payload belong to an interrupted run
+        handle.truncate(end)
+        handle.seek(end)
+        last_id = 0
+        while True:
+            rows = conn.execute(
                 """
-UPDATE fluxData SET
-    fetchingStatus = ?, processingStatus = ?,
-    numberOfFetchingTimes = ?, numberOfProcessingTimes = ?,
-    numberOfErrorFetching = ?, numberOfErrorsProcessing = ?,
-    numberOfSuccessFetching = ?, numberOfSuccessProcessing = ?,
-    numberOfCurrentlyFetching = ?, numberOfCurrentlyProcessing = ?,
-    fetchingProgress = ?, processingProgress = ?,
-    lastFetchingDate = ?, lastProcessingDate = ?,
-    lastDurationFetching = ?, lastDurationProcessing = ?
-WHERE id = ?
+SELECT c.contentID, c.hash, c.fileType, c.fileSize
+FROM content_items c LEFT JOIN content_payloads p ON p.contentID = c.contentID
+WHERE c.contentID > ? AND p.contentID IS NULL
+ORDER BY c.contentID LIMIT ?
 """,
-                (
-                    stats["fetchingStatus"], stats["processingStatus"],
-                    stats["totalFetches"] or 0, stats["totalProcesses"] or 0,
-                    stats["errorFetches"] or 0, stats["errorProcesses"] or 0,
-                    stats["successFetches"] or 0, stats["successProcesses"] or 0,
-                    stats["currentFetches"] or 0, stats["currentProcesses"] or 0,
-                    stats["fetchingProgress"], stats["processingProgress"],
-                    stats["lastFetchingDate"], stats["lastProcessingDate"],
-                    stats["lastDurationFetching"], stats["lastDurationProcessing"],
-                    flux_id
-                )
+                (last_id, PAYLOAD_CHUNK_ROWS)
+            ).fetchall()
+            if not rows:
+                break
+            entries = []
+            for content_id, content_hash, file_type, file_size in rows:
+                key = payload_key(file_type, file_size, content_hash, max_bytes)
+                if key in slices:
+                    shared += 1
+                else:
+                    # First use in this run: an earlier run may have stored it
+                    payload = build_payload(records, seed, *key)
+                    digest = hashlib.sha256(payload).hexdigest()
+                    known = conn.execute(
+                        "SELECT payloadOffset FROM content_payloads WHERE payloadHash = ? LIMIT 1", (digest,)
+                    ).fetchone()
+                    if known:
+                        shared += 1
+                        offset = known[0]
+                    else:
+                        offset = end
+                        handle.write(payload)
+                        end += len(payload)
+                        stored += len(payload)
+                    slices[key] = (digest, offset, len(payload))
+                entries.append((content_id, *slices[key]))
+                written += 1
+            # The index only ever points at bytes that are on disk
+            handle.flush()
+            os.fsync(handle.fileno())
+            conn.executemany(
+                "INSERT INTO content_payloads (contentID, payloadHash, payloadOffset, payloadLength) VALUES (?, ?, ?, ?)",
+                entries
             )
+            conn.commit()
+            last_id = rows[-1][0]
+    conn.close()
+    print(f"✅ Indexed {written} payloads, {stored / 1048576:.1f} MiB appended"
+          + (f", {shared} sharing a stored payload" if shared else ""))
+
+# --- PARTITIONED HISTORY ---
+# With --partition-period the history tables move out of the main database
+# into one file per period. Each run lands in the period of its own timestamp,
+# content items with their fetch (same createdAt) and content processing rows
+# with their processing run, so a period file holds whole runs. The main
+# database keeps fluxData (and the rollups) plus the historyPartitions
+# manifest. Retiring old history is a file delete (--drop-partitions-before).
+#
+# SQLite neither stores views over attached databases nor attaches more than
+# ten at once, so the UNION ALL view layer is created per connection by
+# open_partitioned() as TEMP views over the periods a query window needs.
+PARTITION_PERIODS = ["none", "month", "quarter", "year"]
+PARTITIONED_TABLES = {
+    # table -> column that places a row in a period (None: its processing run's)
+    "fetchingHistory": "timestamp",
+    "content_items": "createdAt",
+    "processingHistory": "timestamp",
+    "processing_content_history": None,
+}
+
+def partition_key(timestamp, period):
+    year, month = timestamp[:4], int(timestamp[5:7])
+    if period == "year":
+        return year
+    if period == "quarter":
+        return f"{year}-Q{(month - 1) // 3 + 1}"
+    return f"{year}-{month:02d}"
+
+def partition_range(key, period):
+    # [start, end) of a period as ISO text, comparable with the stored timestamps
+    year = int(key[:4])
+    if period == "year":
+        first, months = 1, 12
+    elif period == "quarter":
+        first, months = (int(key[-1]) - 1) * 3 + 1, 3
+    else:
+        first, months = int(key[5:7]), 1
+    start = datetime(year, first, 1, tzinfo=timezone.utc)
+    following = first - 1 + months
+    end = datetime(year + following // 12, following % 12 + 1, 1, tzinfo=timezone.utc)
+    return start.strftime(ISO_FORMAT), end.strftime(ISO_FORMAT)
+
+def partition_directory(path):
+    return f"{os.path.splitext(path)[0]}-partitions"
+
+def is_partitioned(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'historyPartitions'"
+    ).fetchone() is not None
+
+def partition_schema(conn, table):
+    # Keys into other files cannot be enforced, so the copies drop them
+    sql = conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    return re.sub(r",\s*FOREIGN KEY \([^)]*\) REFERENCES [^,)]*\([^)]*\)( ON DELETE CASCADE)?", "", sql)
+
+def partition_indexes(index_profile):
+    statements = []
+    for statement in INDEX_PROFILES[index_profile].split(";"):
+        match = re.search(r"CREATE INDEX (\w+)\s+ON (\w+)\(", statement)
+        if match and match[2] in PARTITIONED_TABLES:
+            statements.append(statement.strip().replace(f"CREATE INDEX {match[1]}", f"CREATE INDEX part.{match[1]}", 1))
+    return statements
+
+def split_partitions(path, settings, output=None, directory=None):
+    # output: where the database will end up (the manifest paths are relative
+    # to it); directory: where the files are written, if not at output's
+    # partition directory already
+    period = settings.partition_period
+    output = output or path
+    print(f"Splitting history into one file per {period}...")
+    directory = directory or partition_directory(output)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    conn = sqlite3.connect(path)
+    # Range lookups for the split; they go away with the tables
+    for table, column in PARTITIONED_TABLES.items():
+        if column:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_partition_{table.lower()} ON {table}({column})")
+    keys = sorted({
+        partition_key(row[0], period) for row in conn.execute(
+            "SELECT DISTINCT substr(timestamp, 1, 7) FROM fetchingHistory "
+            "UNION SELECT DISTINCT substr(timestamp, 1, 7) FROM processingHistory"
+        )
+    })
+    schemas = {table: partition_schema(conn, table) for table in PARTITIONED_TABLES}
+    manifest = []
+    for key in keys:
+        start, end = partition_range(key, period)
+        file_path = os.path.join(directory, f"{key}.db")
+        conn.execute("ATTACH DATABASE ? AS part", (file_path,))
+        counts = []
+        for table, column in PARTITIONED_TABLES.items():
+            conn.execute(schemas[table].replace(f"CREATE TABLE {table}", f"CREATE TABLE part.{table}", 1))
+            if column:
+                where = f"{column} >= ? AND {column} < ?"
+            else:
+                where = "processingID IN (SELECT processingID FROM main.processingHistory WHERE timestamp >= ? AND timestamp < ?)"
+            counts.append(conn.execute(
+                f"INSERT INTO part.{table} SELECT * FROM main.{table} WHERE {where} ORDER BY rowid", (start, end)
+            ).rowcount)
+        for statement in partition_indexes(settings.index_profile):
+            conn.execute(statement)
+        conn.execute("ANALYZE part")
+        conn.commit()
+        conn.execute("DETACH DATABASE part")
+        final_path = os.path.join(partition_directory(output), f"{key}.db")
+        manifest.append((key, os.path.relpath(final_path, os.path.dirname(os.path.abspath(output))), start, end, *counts))
+    conn.execute("""
+    CREATE TABLE historyPartitions (
+        period TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        rangeStart TEXT NOT NULL,
+        rangeEnd TEXT NOT NULL,
+        fetchingRows INTEGER NOT NULL,
+        contentRows INTEGER NOT NULL,
+        processingRows INTEGER NOT NULL,
+        processingContentRows INTEGER NOT NULL
+    )""")
+    conn.executemany("INSERT INTO historyPartitions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", manifest)
+    for table in reversed(list(PARTITIONED_TABLES)):
+        conn.execute(f"DROP TABLE {table}")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    print(f"✅ Wrote {len(manifest)} partitions for {partition_directory(output)}/")
+
+def open_partitioned(path, since=None, until=None):
+    # Opens a partitioned database with TEMP views named like the history
+    # tables over the partitions overlapping [since, until). Returns the
+    # connection and the periods it attached.
+    conn = sqlite3.connect(path)
+    partitions = conn.execute(
+        "SELECT period, path FROM historyPartitions WHERE (? IS NULL OR rangeEnd > ?) AND (? IS NULL OR rangeStart < ?) "
+        "ORDER BY rangeStart",
+        (since, since, until, until)
+    ).fetchall()
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(partitions) > limit:
+        sys.exit(f"The window spans {len(partitions)} partitions but SQLite attaches at most {limit}; "
+                 "narrow it or use a longer --partition-period")
+    base = os.path.dirname(os.path.abspath(path))
+    for index, (_, file_path) in enumerate(partitions):
+        conn.execute(f"ATTACH DATABASE ? AS p{index}", (os.path.join(base, file_path),))
+    for table in PARTITIONED_TABLES:
+        columns = ", ".join(TABLE_COLUMNS[table])
+        branches = [f"SELECT {columns} FROM p{index}.{table}" for index in range(len(partitions))]
+        if not branches:
+            branches = [f"SELECT {', '.join(f'NULL AS {column}' for column in TABLE_COLUMNS[table])} LIMIT 0"]
+        conn.execute(f"CREATE TEMP VIEW {table} AS {' UNION ALL '.join(branches)}")
+    return conn, [period for period, _ in partitions]
+
+def drop_partitions_before(path, cutoff):
+    # Partitions that end on or before the cutoff go away with their files.
+    # fluxData aggregates and rollups keep counting the dropped runs.
+    conn = sqlite3.connect(path)
+    if not is_partitioned(conn):
+        sys.exit(f"{path} is not partitioned; generate it with --partition-period")
+    dropped = conn.execute(
+        "SELECT period, path FROM historyPartitions WHERE rangeEnd <= ? ORDER BY rangeStart", (cutoff,)
+    ).fetchall()
+    conn.execute("DELETE FROM historyPartitions WHERE rangeEnd <= ?", (cutoff,))
+    conn.commit()
+    conn.close()
+    base = os.path.dirname(os.path.abspath(path))
+    for _, file_path in dropped:
+        os.remove(os.path.join(base, file_path))
+    print(f"✅ Dropped {len(dropped)} partitions ending on or before {cutoff}"
+          + (f" ({dropped[0][0]} to {dropped[-1][0]})" if dropped else ""))
+
+# --- LIVE SIMULATION ---
+# Keeps an existing database moving like production: new runs start as
+# "Currently ..." rows stamped with the wall clock, in-flight runs finish as
+# Success or Failed, and every change updates the fluxData counters (and the
+# rollup tables, when present) in the same transaction. Values come from the
+# same draws as generation.
+DEFAULT_EVENTS_PER_SECOND = 10.0
+DEFAULT_IN_FLIGHT = 20
+DEFAULT_REPORT_EVERY = 5.0
+
+def wall_clock():
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+class LiveSimulator:
+    def __init__(self, conn, settings, seed, pools, in_flight=DEFAULT_IN_FLIGHT, maintain_aggregates=None):
+        self.conn = conn
+        self.in_flight = max(1, in_flight)
+        # With aggregate triggers installed the database updates fluxData itself
+        if maintain_aggregates is None:
+            maintain_aggregates = not has_aggregate_triggers(conn)
+        self.maintain_aggregates = maintain_aggregates
+        if is_partitioned(conn):
+            sys.exit("Cannot add runs to a partitioned database: the history is in other files")
+        self.layout = stored_layout(conn)
+        if self.layout.has_views():
+            sys.exit("Cannot add runs to --timestamps epoch or --compact-enums databases: the tables are views")
+        self.stamps = TimestampColumns(self.layout.timestamp_format)
+        specs = column_specs(settings)
+        # Flux 0 does not exist, so this draw stream never repeats a generated one
+        self.draws = FakerDraws(specs, seed, 0) if pools is None else PooledDraws(specs, pools, seed, 0)
+        self.fluxes = [
+            row[0] for row in conn.execute("SELECT id FROM fluxData WHERE fluxState != ? ORDER BY id",
+                                           (FLUX_STATES["DISABLED"],))
+        ]
+        if not self.fluxes:
+            sys.exit("Nothing to simulate: the database has no enabled fluxes")
+        self.next_fetching_id, self.next_content_id, self.next_processing_id, self.next_content_history_id = (
+            next_row_ids(conn)[:4]
+        )
+        # In-flight runs, oldest first: (id, fluxID, timestamp)
+        self.fetching = list(conn.execute(
+            "SELECT fetchingID, fluxID, timestamp FROM fetchingHistory WHERE status = ? ORDER BY timestamp, fetchingID",
+            (FETCHING_STATUSES["CURRENTLY_FETCHING"],)
+        ))
+        self.processing = list(conn.execute(
+            "SELECT processingID, fluxID, timestamp, fetchingID FROM processingHistory "
+            "WHERE status = ? ORDER BY timestamp, processingID",
+            (PROCESSING_STATUSES["CURRENTLY_PROCESSING"],)
+        ))
+        # Successful fetches waiting for a processing run: (fetchingID, fluxID)
+        self.pending_processing = []
+        self.rollups = set(ROLLUP_TABLES) <= set(existing_tables(conn))
+        self.rows_written = 0
+
+    def step(self):
+        # One event: start or finish one fetching or processing run
+        if (self.pending_processing or self.processing) and random.random() < 0.4:
+            if self.pending_processing and len(self.processing) < self.in_flight and (
+                not self.processing or random.random() < 0.5
+            ):
+                self.start_processing()
+            else:
+                self.finish_processing()
+        elif len(self.fetching) < self.in_flight and (not self.fetching or random.random() < 0.5):
+            self.start_fetch()
+        else:
+            self.finish_fetch()
+
+    def execute(self, statement, params):
+        self.rows_written += self.conn.execute(statement, params).rowcount
+
+    def completion_columns(self):
+        return "completedAt = ?, completedAtEpoch = ?" if self.stamps.both else "completedAt = ?"
+
+    def completion_values(self, completed_at):
+        return (self.stamps.value(completed_at),) + self.stamps.extras(completed_at)
+
+    def update_flux(self, statement, params):
+        if self.maintain_aggregates:
+            self.execute(statement, params)
+
+    def start_fetch(self, flux_id=None, started=None):
+        if flux_id is None:
+            busy = {run[1] for run in self.fetching}
+            flux_id = random_item(self.fluxes)
+            if flux_id in busy:
+                return
+        fetching_id = self.next_fetching_id
+        self.next_fetching_id += 1
+        started = started or wall_clock()
+        timestamp = self.stamps.value(started)
+        progress = self.draws.take("fetch_progress_current")
+        status = FETCHING_STATUSES["CURRENTLY_FETCHING"]
+        self.execute(insert_statement("fetchingHistory", self.layout),
+                     (fetching_id, flux_id, status, timestamp, None, None, progress, 0, None)
+                     + self.stamps.extras(started, None))
+        self.update_flux(
+            "UPDATE fluxData SET numberOfFetchingTimes = numberOfFetchingTimes + 1, "
+            "numberOfCurrentlyFetching = numberOfCurrentlyFetching + 1 WHERE id = ?",
+            (flux_id,)
+        )
+        # A new run is the flux's latest one unless an earlier run was stamped
+        # later (generated history can reach past the reference time)
+        self.update_flux(
+            "UPDATE fluxData SET fetchingStatus = ?, fetchingProgress = ?, lastFetchingDate = ?, "
+            "lastDurationFetching = NULL WHERE id = ? AND (lastFetchingDate IS NULL OR lastFetchingDate <= ?)",
+            (status, progress, timestamp, flux_id, timestamp)
+        )
+        self.adjust_rollups("fetching", flux_id, timestamp, status, None, None, 1)
+        self.fetching.append((fetching_id, flux_id, timestamp))
+        return self.fetching[-1]
+
+    def finish_fetch(self, run=None, deadline=None):
+        # Finishes the given in-flight run (the oldest by default) and returns
+        # its completion time. A run that would still be going at the deadline
+        # stays in flight and None is returned.
+        if run is None:
+            if not self.fetching:
+                return None
+            run = self.fetching[0]
+        fetching_id, flux_id, timestamp = run
+        success = self.draws.take("fetch_status_roll") < 0.9
+        status = FETCHING_STATUSES["SUCCESS"] if success else FETCHING_STATUSES["FAILED"]
+        started = parse_timestamp(timestamp)
+        duration = self.draws.take("fetch_duration")
+        completed_at = started + timedelta(seconds=duration)
+        if deadline is not None and completed_at > deadline:
+            return None
+        self.fetching.remove(run)
+        progress = 100 if success else self.draws.take("fetch_progress_failed")
+        error_message = None if success else self.draws.take("fetch_error")
+        num_content = self.draws.take("num_content") if success else 0
+        self.execute(
+            f"UPDATE fetchingHistory SET status = ?, {self.completion_columns()}, fetchingTimeInSeconds = ?, "
+            "progress = ?, numberOfContent = ?, errorMessage = ? WHERE fetchingID = ?",
+            (status,) + self.completion_values(completed_at)
+            + (duration, progress, num_content, error_message, fetching_id)
+        )
+        for _ in range(num_content):
+            content_name = self.draws.file_name(self.draws.take("content_extension"))
+            self.execute(insert_statement("content_items", self.layout), (
+                self.next_content_id, fetching_id, flux_id, content_name,
+                generate_short_content_name(content_name), self.draws.text("sentence"),
+                self.draws.take("content_file_size"), self.draws.take("content_length"),
+                os.path.splitext(content_name)[1].lstrip('.'), self.draws.text("mime_type"), "UTF-8",
+                self.draws.content_hash(), timestamp, timestamp, self.draws.text("url")
+            ) + self.stamps.extras(started, started))
+            self.next_content_id += 1
+        counter = "numberOfSuccessFetching" if success else "numberOfErrorFetching"
+        self.update_flux(
+            f"UPDATE fluxData SET numberOfCurrentlyFetching = numberOfCurrentlyFetching - 1, "
+            f"{counter} = {counter} + 1 WHERE id = ?",
+            (flux_id,)
+        )
+        self.update_flux(
+            "UPDATE fluxData SET fetchingStatus = ?, fetchingProgress = ?, lastDurationFetching = ? "
+            "WHERE id = ? AND lastFetchingDate = ? AND NOT EXISTS ("
+            "SELECT 1 FROM fetchingHistory WHERE fluxID = ? AND timestamp = ? AND fetchingID > ?)",
+            (status, progress, duration, flux_id, timestamp, flux_id, timestamp, fetching_id)
+        )
+        self.adjust_rollups("fetching", flux_id, timestamp, FETCHING_STATUSES["CURRENTLY_FETCHING"], None, None, -1)
+        self.adjust_rollups("fetching", flux_id, timestamp, status, duration, error_message, 1)
+        if success and self.draws.take("processing_roll") < 0.8:
+            self.pending_processing.append((fetching_id, flux_id))
+        return completed_at
+
+    def start_processing(self, started=None):
+        fetching_id, flux_id = self.pending_processing.pop(0)
+        processing_id = self.next_processing_id
+        self.next_processing_id += 1
+        started = started or wall_clock()
+        timestamp = self.stamps.value(started)
+        progress = self.draws.take("processing_progress_current")
+        status = PROCESSING_STATUSES["CURRENTLY_PROCESSING"]
+        self.execute(insert_statement("processingHistory", self.layout),
+                     (processing_id, flux_id, fetching_id, status, timestamp, None, 0, None, progress, None)
+                     + self.stamps.extras(started, None))
+        self.update_flux(
+            "UPDATE fluxData SET numberOfProcessingTimes = numberOfProcessingTimes + 1, "
+            "numberOfCurrentlyProcessing = numberOfCurrentlyProcessing + 1 WHERE id = ?",
+            (flux_id,)
+        )
+        self.update_flux(
+            "UPDATE fluxData SET processingStatus = ?, processingProgress = ?, lastProcessingDate = ?, "
+            "lastDurationProcessing = NULL WHERE id = ? AND (lastProcessingDate IS NULL OR lastProcessingDate <= ?)",
+            (status, progress, timestamp, flux_id, timestamp)
+        )
+        self.adjust_rollups("processing", flux_id, timestamp, status, None, None, 1)
+        self.processing.append((processing_id, flux_id, timestamp, fetching_id))
+        return self.processing[-1]
+
+    def finish_processing(self, run=None, deadline=None):
+        # Same contract as finish_fetch
+        run = run or self.processing[0]
+        processing_id, flux_id, timestamp, fetching_id = run
+        success = self.draws.take("processing_status_roll") < 0.9
+        status = PROCESSING_STATUSES["SUCCESS"] if success else PROCESSING_STATUSES["FAILED"]
+        started = parse_timestamp(timestamp)
+        duration = self.draws.take("processing_duration")
+        completed_at = started + timedelta(seconds=duration)
+        if deadline is not None and completed_at > deadline:
+            return None
+        self.processing.remove(run)
+        progress = 100 if success else self.draws.take("processing_progress_failed")
+        error_message = None if success else self.draws.take("processing_error")
+        content_ids = []
+        if success:
+            content_ids = [row[0] for row in self.conn.execute(
+                "SELECT contentID FROM content_items WHERE fetchingID = ? ORDER BY contentID", (fetching_id,)
+            )]
+        self.execute(
+            f"UPDATE processingHistory SET status = ?, {self.completion_columns()}, processingTimeInSeconds = ?, "
+            "progress = ?, numberOfProcessingContent = ?, errorMessage = ? WHERE processingID = ?",
+            (status,) + self.completion_values(completed_at)
+            + (duration, progress, len(content_ids), error_message, processing_id)
+        )
+        for content_id in content_ids:
+            start_ct = started + timedelta(seconds=self.draws.take("content_processing_offset"))
+            dur_ct = self.draws.take("content_processing_duration")
+            stats = {
+                "rowsInserted": self.draws.take("rows_inserted"),
+                "rowsUpdated": self.draws.take("rows_updated"),
+                "rowsIgnored": self.draws.take("rows_ignored")
+            }
+            end_ct = start_ct + timedelta(seconds=dur_ct)
+            self.execute(insert_statement("processing_content_history", self.layout), (
+                self.next_content_history_id, processing_id, content_id,
+                self.stamps.value(start_ct), self.stamps.value(end_ct),
+                dur_ct, PROCESSING_STATUSES["SUCCESS"], json.dumps(stats)
+            ) + self.stamps.extras(start_ct, end_ct))
+            self.next_content_history_id += 1
+        counter = "numberOfSuccessProcessing" if success else "numberOfErrorsProcessing"
+        self.update_flux(
+            f"UPDATE fluxData SET numberOfCurrentlyProcessing = numberOfCurrentlyProcessing - 1, "
+            f"{counter} = {counter} + 1 WHERE id = ?",
+            (flux_id,)
+        )
+        self.update_flux(
+            "UPDATE fluxData SET processingStatus = ?, processingProgress = ?, lastDurationProcessing = ? "
+            "WHERE id = ? AND lastProcessingDate = ? AND NOT EXISTS ("
+            "SELECT 1 FROM processingHistory WHERE fluxID = ? AND timestamp = ? AND processingID > ?)",
+            (status, progress, duration, flux_id, timestamp, flux_id, timestamp, processing_id)
+        )
+        self.adjust_rollups("processing", flux_id, timestamp, PROCESSING_STATUSES["CURRENTLY_PROCESSING"],
+                            None, None, -1)
+        self.adjust_rollups("processing", flux_id, timestamp, status, duration, error_message, 1)
+        return completed_at
+
+    def adjust_rollups(self, kind, flux_id, timestamp, status, duration, error_message, delta):
+        if not self.rollups:
+            return
+        day = timestamp[:10]
+        keys = [("status", status)]
+        if duration is not None:
+            keys.append(("duration", duration_bucket(duration)))
+        if error_message:
+            keys.append(("error", error_message))
+        for dimension, value in keys:
+            for table, prefix in ((f"{kind}RollupDaily", (flux_id,)), (f"{kind}RollupGlobal", ())):
+                key = prefix + (dimension, day, value)
+                columns = TABLE_COLUMNS[table]
+                self.execute(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                    "ON CONFLICT DO UPDATE SET count = count + excluded.count",
+                    key + (delta,)
+                )
+                if delta < 0:
+                    self.execute(
+                        f"DELETE FROM {table} WHERE {' AND '.join(f'{column} = ?' for column in columns[:-1])} "
+                        "AND count = 0",
+                        key
+                    )
+
+def latency_summary(samples):
+    if not samples:
+        return "no commits"
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+    return f"commit p50 {pick(0.5):.2f} ms, p95 {pick(0.95):.2f} ms, p99 {pick(0.99):.2f} ms"
+
+def simulate(path, events_per_second, duration=None, in_flight=DEFAULT_IN_FLIGHT,
+             report_every=DEFAULT_REPORT_EVERY, seed=None):
+    if not os.path.exists(path):
+        sys.exit(f"Nothing to simulate: {path} does not exist")
+    conn = sqlite3.connect(path)
+    # WAL lets the app keep polling while the simulator writes
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    settings, stored_seed = load_generator_state(conn)
+    settings = settings or GenerationSettings()
+    if seed is None:
+        seed = stored_seed if stored_seed is not None else random.randrange(2**32)
+    simulator = LiveSimulator(conn, settings, seed, value_pools_for(settings, seed), in_flight)
+    print(f"Simulating {events_per_second:g} events/s on {path} "
+          f"({len(simulator.fetching)} fetches and {len(simulator.processing)} processings in flight). "
+          "Press Ctrl+C to stop.")
+
+    # Events run on a fixed schedule; events due at a tick share one commit,
+    # up to a tenth of a second's worth when the writer falls behind
+    interval = 1.0 / events_per_second
+    max_batch = max(1, int(events_per_second / 10))
+    started = time.perf_counter()
+    next_event = started
+    next_report = started + report_every
+    events = window_events = 0
+    window_rows = 0
+    window_started = started
+    commit_times = []
+    window_commits = []
+    try:
+        while duration is None or time.perf_counter() - started < duration:
+            now = time.perf_counter()
+            if now < next_event:
+                time.sleep(next_event - now)
+                continue
+            rows_before = simulator.rows_written
+            batch = 0
+            while next_event <= now and batch < max_batch:
+                batch += 1
+                simulator.step()
+                next_event += interval
+                events += 1
+                window_events += 1
+            commit_started = time.perf_counter()
+            conn.commit()
+            commit_ms = (time.perf_counter() - commit_started) * 1000
+            commit_times.append(commit_ms)
+            window_commits.append(commit_ms)
+            window_rows += simulator.rows_written - rows_before
+            if now >= next_report:
+                elapsed = time.perf_counter() - window_started
+                print(f"  - {window_events / elapsed:.1f} events/s, {window_rows / elapsed:.0f} rows/s, "
+                      f"{len(simulator.fetching)} fetching, {len(simulator.processing)} processing, "
+                      f"{latency_summary(window_commits)}")
+                window_started = time.perf_counter()
+                window_events = window_rows = 0
+                window_commits = []
+                next_report = window_started + report_every
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.commit()
+        conn.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ {events} events in {elapsed:.1f}s: {events / elapsed:.1f} events/s "
+          f"(target {events_per_second:g}), {simulator.rows_written / elapsed:.0f} rows/s, "
+          f"{latency_summary(commit_times)}")
+
+# --- ADVANCE ---
+# --advance moves an existing database's reference time (the stored window
+# end) forward and appends only what happened in between: the runs each
+# enabled flux's fetch schedule fires in the new period, capped like the
+# schedule workload (hot flux types at --hot-flux-runs, others at the history
+# maximum, keeping the latest), each followed by its processing run as in the
+# simulator. In-flight runs are finished first; runs still going at the new
+# reference time stay "Currently ...". Rows are written through LiveSimulator,
+# so only the touched fluxes' aggregates and rollups change. Draws come from
+# a stream derived from the seed and the previous reference time, so the same
+# advance of the same file always gives the same result. The runs commit in
+# one transaction with the new reference time; history_counts, the workflow
+# tables and payloads are brought up to date afterwards.
+def advance_seed(seed, window_end):
+    return int.from_bytes(hashlib.sha256(f"{seed}:{window_end}".encode()).digest()[:8], "big")
+
+def advance_slots(last_run, interval, since, until, cap):
+    # Schedule slots last_run + k * interval inside (since, until], the latest cap of them
+    first = max(1, int((since - last_run).total_seconds() // interval) + 1)
+    last = int((until - last_run).total_seconds() // interval)
+    first = max(first, last - cap + 1)
+    return [last_run + timedelta(seconds=k * interval) for k in range(first, last + 1)]
+
+def advance(path, days, seed=None):
+    if not os.path.exists(path):
+        sys.exit(f"Nothing to advance: {path} does not exist")
+    conn = sqlite3.connect(path)
+    settings, stored_seed = load_generator_state(conn)
+    if settings is None:
+        sys.exit(f"Cannot advance: {path} has no generator state")
+    seed = stored_seed if seed is None else seed
+    since = settings.now
+    until = since + timedelta(days=days)
+    conn.execute("BEGIN")
+    simulator = LiveSimulator(conn, settings, advance_seed(seed, settings.window_end),
+                              value_pools_for(settings, stored_seed))
+    print(f"Advancing {path} from {settings.window_end} to {until.strftime(ISO_FORMAT)}...")
+    fluxes = conn.execute(
+        "SELECT id, fluxType, fetchScheduleType, fetchScheduleConfiguration, createdAt, lastFetchingDate "
+        "FROM fluxData WHERE fluxState != ? ORDER BY id",
+        (FLUX_STATES["DISABLED"],)
+    ).fetchall()
+    fetching_before, processing_before = simulator.next_fetching_id, simulator.next_processing_id
+    finished = 0
+    touched = set()
+
+    def process(completed_at, interval):
+        # The processing run a finished fetch queued, if it starts before the deadline
+        if not simulator.pending_processing or completed_at is None:
+            return
+        offset = simulator.draws.take("processing_offset")
+        if interval:
+            offset %= interval
+        started = completed_at + timedelta(seconds=offset)
+        if started > until:
+            simulator.pending_processing.pop(0)
+            return
+        simulator.finish_processing(simulator.start_processing(started), until)
+
+    for flux_id, flux_type, schedule_type, config, created_at, last_fetch in fluxes:
+        config = json.loads(config or "{}")
+        interval = schedule_interval(config) if schedule_type == SCHEDULE_TYPES["ACTIVE"] else None
+        for run in [run for run in simulator.processing if run[1] == flux_id]:
+            if simulator.finish_processing(run, until):
+                finished += 1
+                touched.add(flux_id)
+        for run in [run for run in simulator.fetching if run[1] == flux_id]:
+            completed_at = simulator.finish_fetch(run, until)
+            if completed_at:
+                finished += 1
+                touched.add(flux_id)
+                process(completed_at, interval)
+        if interval is None:
+            continue
+        cap = settings.hot_flux_runs if flux_type in HOT_FLUX_TYPES else settings.history_max
+        for started in advance_slots(parse_timestamp(last_fetch or created_at), interval, since, until, cap):
+            touched.add(flux_id)
+            process(simulator.finish_fetch(simulator.start_fetch(flux_id, started), until), interval)
+
+    # Commits the runs together with the new reference time
+    settings.window_end = until.strftime(ISO_FORMAT)
+    save_generator_state(conn, settings, stored_seed)
+    present = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+    if "history_counts" in present:
+        refresh_history_counts(conn, touched)
+    if "workflow_execution_log_summary" in present:
+        refresh_workflow_tables(conn)
     conn.commit()
+    conn.close()
+    if settings.payloads:
+        write_payloads(path, stored_seed, settings.payload_max_bytes)
+    print(f"✅ Advanced {len(touched)} fluxes by {days:g} days: "
+          f"{simulator.next_fetching_id - fetching_before} fetches and "
+          f"{simulator.next_processing_id - processing_before} processing runs started, "
+          f"{finished} in-flight runs finished, {len(simulator.fetching) + len(simulator.processing)} still in flight")
 
 # --- MAIN EXECUTION ---
+def parse_range(value):
+    low, _, high = value.partition(":")
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MIN:MAX, got {value!r}")
+    if low < 0 or high < low:
+        raise argparse.ArgumentTypeError(f"invalid range {value!r}")
+    return low, high
+
+def parse_window_date(value):
+    try:
+        return parse_timestamp(value).strftime("%Y-%m-%dT%H:%M:%SZ")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an ISO date or timestamp, got {value!r}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate the hillmetrics SQLite mock database.")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="sqlite",
+                        help="sqlite writes one database file; copy (PostgreSQL COPY text + load.sql), "
+                             "csv and parquet stream one file per table into a directory.")
+    parser.add_argument("--output", default=None,
+                        help=f"Database file or export directory (default: {DB_FILENAME}, "
+                             "or hillmetrics-<format> for file exports).")
+    parser.add_argument("--fluxes", type=int, default=TOTAL_FLUXES,
+                        help=f"Number of fluxes to generate (default: {TOTAL_FLUXES}).")
+    parser.add_argument("--history-depth", type=parse_range, default=HISTORY_DEPTH, metavar="MIN:MAX",
+                        help="Fetch runs per non-disabled flux (default: %(default)s).")
+    parser.add_argument("--history-distribution", choices=HISTORY_DISTRIBUTIONS, default="uniform",
+                        help="How history depths are spread between MIN and MAX (default: uniform).")
+    parser.add_argument("--workload", choices=WORKLOAD_PROFILES, default="uniform",
+                        help="How runs are spread over fluxes: --history-depth runs each, one per day "
+                             "(uniform); a few hot fluxes with up to --hot-flux-runs runs and a Zipf tail "
+                             "(zipfian); or as many runs as the fetch schedule's interval fits before the "
+                             "end date, with only Email and SFTP feeds allowed past the --history-depth "
+                             "maximum (schedule) (default: %(default)s).")
+    parser.add_argument("--hot-flux-runs", type=int, default=HOT_FLUX_RUNS,
+                        help="Most fetch runs of one flux under --workload zipfian or schedule "
+                             "(default: %(default)s).")
+    parser.add_argument("--contents-per-fetch", type=parse_range, default=CONTENTS_PER_FETCH, metavar="MIN:MAX",
+                        help="Content items per successful fetch (default: %(default)s).")
+    parser.add_argument("--start-date", type=parse_window_date, default=WINDOW_START.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        help="Oldest possible flux creation time (default: %(default)s).")
+    parser.add_argument("--end-date", type=parse_window_date, default=WINDOW_END.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        help="Reference 'now' of the dataset (default: %(default)s).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for random and Faker; the same seed produces identical rows.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows buffered before each executemany flush (default: {DEFAULT_BATCH_SIZE}).")
+    parser.add_argument("--faker-values", action="store_true",
+                        help="Call Faker and random once per value instead of sampling precomputed pools "
+                             "and NumPy column draws (slower; for realism comparisons).")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE,
+                        help=f"Entries per precomputed text pool (default: {DEFAULT_POOL_SIZE}).")
+    parser.add_argument("--checkpoint-every", type=int, default=None, metavar="FLUXES",
+                        help="Commit after every N fluxes so memory and journal size stay bounded "
+                             "and an interrupted run can be resumed.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted checkpointed run from its last committed flux.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Generate flux ranges in N processes and merge the shards. "
+                             "For a fixed seed the file is byte-identical for any N.")
+    parser.add_argument("--fast-load", action="store_true",
+                        help="Build into a temporary file with bulk-load pragmas, create indexes and "
+                             "ANALYZE after loading, then atomically replace the existing database.")
+    parser.add_argument("--verify-aggregates", action="store_true",
+                        help="Recompute the fluxData aggregates in SQL after generation and compare.")
+    parser.add_argument("--index-profile", choices=sorted(INDEX_PROFILES), default=DEFAULT_INDEX_PROFILE,
+                        help="Secondary indexes to create: the foreign keys only (minimal) or the set "
+                             "tuned for the app's queries (default: %(default)s).")
+    parser.add_argument("--timestamps", choices=TIMESTAMP_FORMATS, default="iso",
+                        help="History timestamps as ISO text (iso), text plus indexed INTEGER epoch-second "
+                             "<column>Epoch columns (both), or epoch seconds only behind ISO views with the "
+                             "original table names (epoch) (default: %(default)s). The epoch views also expose "
+                             "the seconds as <column>Epoch; the app's ORDER BY timestamp through them cannot "
+                             "use an index, so its history paging is slower than on iso or both.")
+    parser.add_argument("--compact-enums", action="store_true",
+                        help="Store status, error message, flux type and the other low-cardinality text "
+                             "columns as integer codes into lookup tables, behind views that keep the "
+                             "original table names and text values.")
+    parser.add_argument("--search-index", action="store_true",
+                        help="Build FTS5 search indexes (with prefix indexes for type-ahead) over flux "
+                             "names, descriptions and comments, content names and descriptions and the "
+                             "error messages, kept in sync by triggers.")
+    parser.add_argument("--verify-search", action="store_true",
+                        help="Check the search indexes against the tables they index.")
+    parser.add_argument("--partition-period", choices=PARTITION_PERIODS, default="none",
+                        help="Move fetching, content and processing history into one SQLite file per "
+                             "period next to the database, listed in its historyPartitions table "
+                             "(default: %(default)s).")
+    parser.add_argument("--drop-partitions-before", type=parse_window_date, default=None, metavar="DATE",
+                        help="Instead of generating, delete the partitions of the existing --output "
+                             "database that end on or before DATE.")
+    parser.add_argument("--workflow-stages", action="store_true",
+                        help="Continue processing runs through normalization, refinement and calculation "
+                             "history, and materialize workflow_execution_log_summary, "
+                             "v_workflow_stage_details and fetched_contents_view with their indexes.")
+    parser.add_argument("--refresh-workflow", action="store_true",
+                        help="Instead of generating, rebuild the materialized workflow tables of the "
+                             "existing --output database from its history.")
+    parser.add_argument("--keyset-pagination", action="store_true",
+                        help="Add unique (timestamp, id) ordering indexes for cursor paging of fetchingHistory, "
+                             "processingHistory and content_items, and a history_counts table of per-flux and "
+                             "per-filter row counts to use instead of exact counts.")
+    parser.add_argument("--payloads", action="store_true",
+                        help="Write synthetic CSV/JSON/XML/xls bytes of about each content item's fileType and "
+                             "fileSize to an append-only pack file next to the database, indexed by contentID in "
+                             "content_payloads; items of the same type and size bucket share stored bytes "
+                             "(see read-payloads.py).")
+    parser.add_argument("--payload-max-bytes", type=int, default=0, metavar="BYTES",
+                        help="Cap each --payloads payload at BYTES (default: no cap beyond the fileSize).")
+    parser.add_argument("--aggregate-triggers", action="store_true",
+                        help="Install triggers that keep the fluxData aggregates current on later "
+                             "inserts, updates and deletes of fetching and processing history.")
+    parser.add_argument("--rebuild-aggregates", action="store_true",
+                        help="Instead of generating, recompute the fluxData aggregates of the existing "
+                             "--output database in one statement.")
+    parser.add_argument("--advise", action="store_true",
+                        help="After generation, run the app's query shapes through EXPLAIN QUERY PLAN "
+                             "and report the ones that still scan a whole table.")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Instead of generating, keep adding live fetching and processing runs to the "
+                             "existing --output database until interrupted.")
+    parser.add_argument("--advance", type=float, default=None, metavar="DAYS",
+                        help="Instead of generating, move the existing --output database's reference time "
+                             "forward by DAYS and append the runs its fluxes' fetch schedules fire in between "
+                             "(--seed overrides the stored seed).")
+    parser.add_argument("--events-per-second", type=float, default=DEFAULT_EVENTS_PER_SECOND,
+                        help="Simulated run starts and completions per second (default: %(default)s).")
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_IN_FLIGHT,
+                        help="Most runs of each kind kept in a \"Currently ...\" state while simulating "
+                             "(default: %(default)s).")
+    parser.add_argument("--duration", type=float, default=None, metavar="SECONDS",
+                        help="Stop simulating after this many seconds.")
+    parser.add_argument("--rollups", action="store_true",
+                        help="Also build per-(flux, day) and global daily rollups of status, duration "
+                             "bucket and error counts for fetching and processing history.")
+    parser.add_argument("--verify-rollups", action="store_true",
+                        help="Recompute the rollup tables from the history tables and compare.")
+    parser.add_argument("--report", default=None, metavar="FILE",
+                        help="Write a JSON report of the run: time per generation phase, rows and rows/s "
+                             "per table and peak RSS (plus the --profile and --trace-memory results).")
+    parser.add_argument("--profile", default=None, metavar="FILE",
+                        help="Run the build under cProfile and write the stats to FILE; with --workers "
+                             "only the parent process is profiled.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Trace allocations with tracemalloc and report the peak and the top "
+                             "allocating lines (slows generation down considerably).")
+    args = parser.parse_args()
+    if args.workers and (args.resume or args.checkpoint_every):
+        parser.error("--resume and --checkpoint-every are not supported with --workers")
+    if args.format != "sqlite":
+        sqlite_only = [
+            "workers", "resume", "checkpoint_every", "fast_load", "verify_aggregates", "verify_rollups", "advise",
+            "simulate", "advance", "rebuild_aggregates", "compact_enums", "search_index", "verify_search",
+            "drop_partitions_before", "workflow_stages", "refresh_workflow", "keyset_pagination",
+            "payloads"
+        ]
+        used = [f"--{name.replace('_', '-')}" for name in sqlite_only if getattr(args, name)]
+        if used:
+            parser.error(f"{', '.join(used)} require --format sqlite")
+    if args.output is None:
+        args.output = DB_FILENAME if args.format == "sqlite" else f"hillmetrics-{args.format}"
+    if args.format == "copy" and args.timestamps != "iso":
+        parser.error("--format copy loads into the ISO timestamp schema; use --timestamps iso")
+    if args.aggregate_triggers and (args.timestamps == "epoch" or args.compact_enums):
+        parser.error("--aggregate-triggers needs the tables themselves, not the views of --timestamps epoch "
+                     "or --compact-enums")
+    if args.partition_period != "none":
+        if args.format != "sqlite":
+            parser.error("--partition-period requires --format sqlite")
+        unsupported = [
+            flag for flag, used in (
+                ("--timestamps epoch/both", args.timestamps != "iso"), ("--compact-enums", args.compact_enums),
+                ("--aggregate-triggers", args.aggregate_triggers), ("--search-index", args.search_index),
+                ("--workflow-stages", args.workflow_stages), ("--keyset-pagination", args.keyset_pagination),
+                ("--payloads", args.payloads),
+            ) if used
+        ]
+        if unsupported:
+            # Triggers and indexes cannot span files; the split expects ISO text
+            parser.error(f"--partition-period cannot be combined with {', '.join(unsupported)}")
+    if args.events_per_second <= 0:
+        parser.error("--events-per-second must be positive")
+    if args.payload_max_bytes < 0:
+        parser.error("--payload-max-bytes cannot be negative")
+    if args.payload_max_bytes and not args.payloads:
+        parser.error("--payload-max-bytes needs --payloads")
+    if args.advance is not None and args.advance <= 0:
+        parser.error("--advance must be a positive number of days")
+    if args.hot_flux_runs < args.history_depth[1]:
+        parser.error("--hot-flux-runs must be at least the --history-depth maximum")
+    if args.end_date <= args.start_date:
+        parser.error("--end-date must be after --start-date")
+    return args
+
+def settings_from_args(args):
+    return GenerationSettings(
+        total_fluxes=args.fluxes,
+        history_min=args.history_depth[0],
+        history_max=args.history_depth[1],
+        history_distribution=args.history_distribution,
+        workload=args.workload,
+        hot_flux_runs=args.hot_flux_runs,
+        contents_min=args.contents_per_fetch[0],
+        contents_max=args.contents_per_fetch[1],
+        window_start=args.start_date,
+        window_end=args.end_date,
+        faker_values=args.faker_values,
+        pool_size=args.pool_size,
+        rollups=args.rollups,
+        index_profile=args.index_profile,
+        aggregate_triggers=args.aggregate_triggers,
+        timestamp_format=args.timestamps,
+        compact_enums=args.compact_enums,
+        search_index=args.search_index,
+        partition_period=args.partition_period,
+        workflow_stages=args.workflow_stages,
+        keyset_pagination=args.keyset_pagination,
+        payloads=args.payloads,
+        payload_max_bytes=args.payload_max_bytes,
+    )
+
 def main():
-    if os.path.exists(DB_FILENAME):
-        os.remove(DB_FILENAME)
-        print(f"Deleted existing database: {DB_FILENAME}")
-    conn = sqlite3.connect(DB_FILENAME)
-    conn.row_factory = sqlite3.Row
+    args = parse_args()
+    settings = settings_from_args(args)
+    output = args.output
+    if args.rebuild_aggregates:
+        if not os.path.exists(output):
+            sys.exit(f"Nothing to rebuild: {output} does not exist")
+        conn = sqlite3.connect(output)
+        rebuild_aggregates(conn)
+        conn.close()
+        verify_output(output, args)
+        return
+    if args.drop_partitions_before:
+        drop_partitions_before(output, args.drop_partitions_before)
+        return
+    if args.refresh_workflow:
+        if not os.path.exists(output):
+            sys.exit(f"Nothing to refresh: {output} does not exist")
+        conn = sqlite3.connect(output)
+        refresh_workflow_tables(conn)
+        conn.close()
+        print(f"✅ Refreshed the workflow tables of {output}")
+        return
+    if args.advance:
+        advance(output, args.advance, seed=args.seed)
+        verify_output(output, args)
+        return
+    if args.simulate:
+        simulate(output, args.events_per_second, args.duration, args.in_flight, seed=args.seed)
+        verify_output(output, args)
+        return
+    # A fast-load build goes to a side file and replaces the output only when
+    # finished; readers keep seeing the old database until then. Checkpointed
+    # builds use a fixed side-file name so --resume can find it again.
+    if args.fast_load:
+        build_path = f"{output}.partial"
+    else:
+        build_path = output
+
+    seed = args.seed
+    first_flux = 1
+    checkpoint_every = args.checkpoint_every
+    # Profiling starts here so --profile and --trace-memory cover the whole
+    # build; with --workers they only see the parent process.
+    profiler = cProfile.Profile() if args.profile else None
+    if args.trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    metrics = RunMetrics()
+    if args.format != "sqlite":
+        if seed is None:
+            seed = random.randrange(2**32)
+            print(f"Using random seed {seed}")
+        generate_export(output, args.format, settings, seed, args.batch_size, metrics)
+        finish_instrumentation(metrics, settings, seed, args, profiler)
+        return
+    if args.resume:
+        if not os.path.exists(build_path):
+            sys.exit(f"Nothing to resume: {build_path} does not exist")
+        conn = sqlite3.connect(build_path)
+        stored_settings, seed = load_generator_state(conn)
+        first_flux = last_committed_flux(conn) + 1
+        if stored_settings is not None:
+            # --checkpoint-every on the command line overrides the stored one
+            checkpoint_every = checkpoint_every or load_checkpoint_every(conn)
+        conn.close()
+        if stored_settings is None:
+            sys.exit(f"Cannot resume: {build_path} was not written with --checkpoint-every")
+        if args.seed is not None and args.seed != seed:
+            sys.exit(f"Cannot resume: {build_path} was generated with seed {seed}")
+        # The interrupted run's settings win over the command line
+        settings = stored_settings
+        print(f"Resuming {build_path} at flux {first_flux} with seed {seed}"
+              + (f", committing every {checkpoint_every} fluxes" if checkpoint_every else ""))
+    else:
+        if seed is None:
+            seed = random.randrange(2**32)
+            print(f"Using random seed {seed}")
+        for path in (build_path, f"{build_path}-wal", f"{build_path}-shm"):
+            if path != output and os.path.exists(path):
+                os.remove(path)
+        if not args.fast_load and os.path.exists(output):
+            os.remove(output)
+            print(f"Deleted existing database: {output}")
+
     print("Starting database generation process...")
-    create_schema(conn)
-    generate_data(conn)
+    metrics.phase("value_pools")
+    pools = value_pools_for(settings, seed)
+    if args.workers:
+        fd, build_path = tempfile.mkstemp(prefix=".hillmetrics-", suffix=".db", dir=os.path.dirname(os.path.abspath(output)))
+        os.close(fd)
+        os.remove(build_path)
+        try:
+            generate_sharded(build_path, settings, seed, args.workers, args.batch_size, args.fast_load, pools,
+                             metrics)
+            publish_build(build_path, output, settings, seed, args, metrics)
+        finally:
+            if os.path.exists(build_path):
+                os.remove(build_path)
+    else:
+        resumable = bool(checkpoint_every) or args.resume
+        conn = None
+        try:
+            conn = connect_for_build(build_path, settings, args.fast_load, resumable, resume=args.resume)
+            if not args.resume:
+                save_generator_state(conn, settings, seed, checkpoint_every)
+            generate_data(SqliteSink(conn, settings.layout), settings, seed, first_flux, batch_size=args.batch_size,
+                          checkpoint_every=checkpoint_every, pools=pools, start_ids=next_row_ids(conn),
+                          metrics=metrics)
+            if checkpoint_every and not args.resume:
+                # A resumed run reports only the rows it wrote itself
+                metrics.count_stored(conn, ACCUMULATING_TABLES)
+            if args.fast_load:
+                metrics.phase("indexes")
+                finish_fast_load(conn, settings)
+            metrics.phase("finish")
+            finish_build(conn, settings)
+            conn.close()
+        except BaseException:
+            # Keep the partial file around only if it can be resumed
+            if not resumable and build_path != output and os.path.exists(build_path):
+                if conn is not None:
+                    conn.close()
+                os.remove(build_path)
+            raise
+        publish_build(build_path, output, settings, seed, args, metrics)
+    print(f"✅ Successfully created and populated database: {output}")
+    finish_instrumentation(metrics, settings, seed, args, profiler)
+
+def publish_build(build_path, output, settings, seed, args, metrics):
+    # Verification, payloads, the advisor and the partition split all run on
+    # the finished side file, with the pack and partition files written next
+    # to the final ones. Only then are the database and its pack and
+    # partitions swapped in, so readers of the old database keep all of it
+    # until the new one is complete.
+    metrics.phase("verify")
+    verify_output(build_path, args)
+    pack = f"{payload_path(output)}.partial"
+    directory = f"{partition_directory(output)}.partial"
+    if settings.payloads:
+        metrics.phase("payloads")
+        if os.path.exists(pack):
+            os.remove(pack)
+        write_payloads(build_path, seed, settings.payload_max_bytes, pack)
+    if args.advise:
+        metrics.phase("advise")
+        load_benchmark_module().advise_indexes(build_path, seed)
+    if settings.partition_period != "none":
+        metrics.phase("partitions")
+        split_partitions(build_path, settings, output, directory)
+    if build_path != output:
+        os.replace(build_path, output)
+    # A pack or partitions of the old database would not match the new one
+    if settings.payloads:
+        os.replace(pack, payload_path(output))
+    elif os.path.exists(payload_path(output)):
+        os.remove(payload_path(output))
+    retired = f"{partition_directory(output)}.old"
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.exists(partition_directory(output)):
+        os.rename(partition_directory(output), retired)
+    if settings.partition_period != "none":
+        os.rename(directory, partition_directory(output))
+    shutil.rmtree(retired, ignore_errors=True)
+
+def verify_output(path, args):
+    if not (args.verify_aggregates or args.verify_rollups or args.verify_search):
+        return
+    conn = sqlite3.connect(path)
+    verified = True
+    if args.verify_aggregates:
+        verified = verify_aggregates(conn) and verified
+    if args.verify_rollups:
+        verified = verify_rollups(conn) and verified
+    if args.verify_search:
+        verified = verify_search_index(conn) and verified
     conn.close()
-    print(f"✅ Successfully created and populated database: {DB_FILENAME}")
+    if not verified:
+        sys.exit(1)
+
+def load_benchmark_module():
+    # The query catalogue lives with the benchmark harness next to this script
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark-queries.py")
+    spec = importlib.util.spec_from_file_location("benchmark_queries", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,171 @@
+import argparse
+import hashlib
+import importlib.util
+import mmap
+import os
+import random
+import sqlite3
+import sys
+import time
+
+# Serves content payloads written by generate-database.py --payloads straight
+# from the memory-mapped pack file: a read is one indexed lookup in
+# content_payloads and a memoryview slice of the mapping, with no file open
+# per item and no copy of the bytes.
+
+# --- SETTINGS ---
+DEFAULT_DATABASE = "hillmetrics.db"
+DEFAULT_PREVIEW_BYTES = 64 * 1024
+DEFAULT_SEED = 42
+GENERATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate-database.py")
+
+def load_generator_module():
+    spec = importlib.util.spec_from_file_location("generate_database", GENERATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# --- READER ---
+class PayloadReader:
+    # Slices returned by read() are views into the mapping; release them (or
+    # drop every reference) before close().
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        pack = load_generator_module().payload_path(db_path)
+        if not os.path.exists(pack):
+            raise FileNotFoundError(f"{pack} does not exist; build {db_path} with --payloads")
+        self.handle = open(pack, "rb")
+        # mmap refuses empty files; an empty pack serves nothing
+        size = os.fstat(self.handle.fileno()).st_size
+        self.map = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.view = memoryview(self.map) if size else memoryview(b"")
+
+    def locate(self, content_id):
+        return self.conn.execute(
+            "SELECT payloadOffset, payloadLength FROM content_payloads WHERE contentID = ?", (content_id,)
+        ).fetchone()
+
+    def read(self, content_id, start=0, length=None):
+        location = self.locate(content_id)
+        if location is None:
+            return None
+        offset, size = location
+        start = min(max(start, 0), size)
+        end = size if length is None else min(size, start + length)
+        return self.view[offset + start:offset + end]
+
+    def content_ids(self):
+        return [row[0] for row in self.conn.execute("SELECT contentID FROM content_payloads ORDER BY contentID")]
+
+    def close(self):
+        self.view.release()
+        if self.map is not None:
+            self.map.close()
+        self.handle.close()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# --- CHECKS ---
+def verify_payloads(reader):
+    # Every indexed slice must still hash to the digest it was stored under
+    mismatched = []
+    rows = reader.conn.execute(
+        "SELECT contentID, payloadHash, payloadOffset, payloadLength FROM content_payloads ORDER BY contentID"
+    ).fetchall()
+    for content_id, digest, offset, size in rows:
+        piece = reader.view[offset:offset + size]
+        if len(piece) != size or hashlib.sha256(piece).hexdigest() != digest:
+            mismatched.append(content_id)
+        piece.release()
+    if mismatched:
+        print(f"❌ {len(mismatched)} of {len(rows)} payloads do not match their hash, e.g. contentID {mismatched[0]}")
+        return False
+    print(f"✅ All {len(rows)} payloads match their hash")
+    return True
+
+def benchmark_previews(reader, reads, preview_bytes, seed):
+    # Random preview reads (the first preview_bytes of an item), each touching
+    # its bytes once so the pages are actually faulted in
+    content_ids = reader.content_ids()
+    if not content_ids:
+        sys.exit("No payloads to read")
+    rng = random.Random(seed)
+    samples = []
+    total = 0
+    for _ in range(reads):
+        content_id = rng.choice(content_ids)
+        started = time.perf_counter()
+        piece = reader.read(content_id, 0, preview_bytes)
+        sum(piece[::mmap.PAGESIZE])
+        samples.append((time.perf_counter() - started) * 1e6)
+        total += len(piece)
+        piece.release()
+    samples.sort()
+    seconds = sum(samples) / 1e6
+    print(f"{reads} preview reads of up to {preview_bytes} bytes: {reads / seconds:.0f} reads/s, "
+          f"{total / 1048576 / seconds:.1f} MiB/s, p50 {samples[len(samples) // 2]:.1f} µs, "
+          f"p95 {samples[int(len(samples) * 0.95)]:.1f} µs")
+
+# --- MAIN EXECUTION ---
+def parse_range(value):
+    start, _, end = value.partition(":")
+    try:
+        start = int(start or 0)
+        end = int(end) if end else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected START:END byte offsets, got {value!r}")
+    if start < 0 or (end is not None and end < start):
+        raise argparse.ArgumentTypeError(f"invalid byte range {value!r}")
+    return start, end
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Read content payloads from the pack file of a database built with "
+                    "generate-database.py --payloads."
+    )
+    parser.add_argument("content_id", type=int, nargs="?",
+                        help="Write this content item's payload to stdout.")
+    parser.add_argument("--database", default=DEFAULT_DATABASE,
+                        help="Database with the content_payloads index (default: %(default)s).")
+    parser.add_argument("--range", type=parse_range, default=(0, None), metavar="START:END",
+                        help="Only write these bytes of the payload, e.g. 0:1024.")
+    parser.add_argument("--verify", action="store_true",
+                        help="Check every indexed payload against its SHA-256.")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="READS",
+                        help="Time this many random preview reads.")
+    parser.add_argument("--preview-bytes", type=int, default=DEFAULT_PREVIEW_BYTES,
+                        help="Bytes per preview read of --benchmark (default: %(default)s).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="Seed for the items --benchmark reads (default: %(default)s).")
+    args = parser.parse_args()
+    if args.content_id is None and not (args.verify or args.benchmark):
+        parser.error("give a content ID, --verify or --benchmark")
+    return args
+
+def main():
+    args = parse_args()
+    try:
+        reader = PayloadReader(args.database)
+    except FileNotFoundError as error:
+        sys.exit(str(error))
+    with reader:
+        if args.content_id is not None:
+            start, end = args.range
+            piece = reader.read(args.content_id, start, None if end is None else end - start)
+            if piece is None:
+                sys.exit(f"No payload for contentID {args.content_id}")
+            sys.stdout.buffer.write(piece)
+            sys.stdout.buffer.flush()
+            piece.release()
+        if args.verify and not verify_payloads(reader):
+            sys.exit(1)
+        if args.benchmark:
+            benchmark_previews(reader, args.benchmark, args.preview_bytes, args.seed)
+
+if __name__ == "__main__":
+    main()
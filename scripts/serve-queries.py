@@ -0,0 +1,587 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+# Serves the dashboard aggregates of app/api/{fetching,processing}-history/*
+# from a database built by generate-database.py, as a local stand-in for the
+# Supabase backend. Responses have the same JSON shape as the routes and are
+# kept in a size-bounded LRU cache with a TTL; the cache is dropped whenever
+# the database's data_version moves, i.e. after any commit by another
+# connection (--advance, --simulate, --refresh-workflow, ...), in rollback and
+# WAL mode alike, checked at most every --check-interval seconds. Queries run
+# on a pool of read-only connections. On a database built with --rollups the
+# status, duration and error counts are summed from the rollup tables, which
+# the generator, --simulate and --advance keep current; the trend needs the
+# individual runs and always reads the history table.
+
+# --- SETTINGS ---
+DEFAULT_DATABASE = "hillmetrics.db"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+DEFAULT_CONNECTIONS = 4
+DEFAULT_CACHE_ENTRIES = 1024
+DEFAULT_CACHE_MB = 64
+DEFAULT_TTL = 60.0
+DEFAULT_CHECK_INTERVAL = 0.05
+DEFAULT_CONCURRENCY = 32
+DEFAULT_ALL_SHARE = 0.1
+DEFAULT_SEED = 42
+LATENCY_SAMPLES = 10000
+GENERATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate-database.py")
+
+def load_generator_module():
+    spec = importlib.util.spec_from_file_location("generate_database", GENERATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+GENERATOR_MODULE = load_generator_module()
+
+# --- ENDPOINTS ---
+# The aggregation runs in SQL instead of on the client, but the payload is
+# what get{Fetching,Processing}{StatusCounts,DurationBuckets,ErrorTypes,Trend}
+# return: {"data": [...], "error": null}.
+HISTORIES = {
+    "fetching-history": ("fetchingHistory", "fetchingTimeInSeconds", "fetching"),
+    "processing-history": ("processingHistory", "processingTimeInSeconds", "processing"),
+}
+
+AGGREGATES = {
+    "status-counts": ("SELECT status, COUNT(*) FROM {history}{where} GROUP BY status", None),
+    "duration-buckets": (
+        "SELECT {bucket}, COUNT(*) FROM {history}{where} GROUP BY 1", "{duration} IS NOT NULL"
+    ),
+    "error-types": (
+        "SELECT errorMessage, COUNT(*) FROM {history}{where} GROUP BY errorMessage",
+        "errorMessage IS NOT NULL AND errorMessage != ''",
+    ),
+    "trend": ("SELECT status, timestamp FROM {history}{where} ORDER BY timestamp", None),
+}
+
+# Aggregate -> rollup dimension. The rollups leave out runs without a
+# duration or error message the same way the endpoints do.
+ROLLUP_DIMENSIONS = {"status-counts": "status", "duration-buckets": "duration", "error-types": "error"}
+
+ENDPOINTS = [f"/api/{history}/{aggregate}" for history in HISTORIES for aggregate in AGGREGATES]
+
+INVALID_FLUX = {"message": "Invalid Flux ID", "details": "", "hint": "", "code": "400"}
+
+def parse_flux_id(value):
+    # Number.parseInt: leading digits count, anything after them is ignored
+    match = re.match(r"\s*([+-]?\d+)", value)
+    return int(match.group(1)) if match else None
+
+def aggregate_statement(history, duration, aggregate, scoped):
+    template, condition = AGGREGATES[aggregate]
+    condition = condition.format(duration=duration) if condition else None
+    conditions = [c for c in (condition, "fluxID = ?" if scoped else None) if c]
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    bucket = GENERATOR_MODULE.DURATION_BUCKET_SQL.format(column=duration)
+    return template.format(history=history, where=where, bucket=bucket)
+
+def rollup_statement(prefix, scoped):
+    if scoped:
+        return f"SELECT value, SUM(count) FROM {prefix}RollupDaily WHERE fluxID = ? AND dimension = ? GROUP BY value"
+    return f"SELECT value, SUM(count) FROM {prefix}RollupGlobal WHERE dimension = ? GROUP BY value"
+
+def run_aggregate(conn, history_name, aggregate, flux, rollups):
+    history, duration, prefix = HISTORIES[history_name]
+    params = () if flux is None else (flux,)
+    if rollups and aggregate in ROLLUP_DIMENSIONS:
+        statement = rollup_statement(prefix, flux is not None)
+        params += (ROLLUP_DIMENSIONS[aggregate],)
+    else:
+        statement = aggregate_statement(history, duration, aggregate, flux is not None)
+    rows = conn.execute(statement, params).fetchall()
+    if aggregate == "status-counts":
+        return [{"status": status, "count": count} for status, count in rows]
+    if aggregate == "duration-buckets":
+        # Every bucket is reported, empty ones with 0, in the endpoint's order
+        counts = dict(rows)
+        labels = [label for _, label in GENERATOR_MODULE.DURATION_BUCKETS] + ["20+ min"]
+        return [{"bucket": label, "count": counts.get(label, 0)} for label in labels]
+    if aggregate == "error-types":
+        return [{"message": message, "count": count} for message, count in rows]
+    return [{"status": status, "timestamp": timestamp} for status, timestamp in rows]
+
+# --- CACHE ---
+class QueryCache:
+    # Response bodies keyed by (endpoint, flux). Least recently used entries
+    # go first once either bound is reached; expired ones are dropped on read.
+    # The generation increments on every clear, so a query that started before
+    # an invalidation does not store its now stale result.
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.generation = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0, "uncacheable": 0}
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] <= now:
+            self.remove(key)
+            self.stats["expired"] += 1
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[0]
+
+    def put(self, key, body, now, generation):
+        if generation != self.generation or self.max_entries <= 0:
+            return
+        if len(body) > self.max_bytes:
+            self.stats["uncacheable"] += 1
+            return
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = (body, now + self.ttl)
+        self.size += len(body)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self.remove(oldest)
+            self.stats["evictions"] += 1
+
+    def remove(self, key):
+        body, _ = self.entries.pop(key)
+        self.size -= len(body)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+        self.generation += 1
+        self.stats["invalidations"] += 1
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+            "entries": len(self.entries),
+            "bytes": self.size,
+        }
+
+# --- CONNECTION POOL ---
+class ReadPool:
+    # Read-only connections handed out one request at a time; the query itself
+    # runs on a worker thread so the event loop keeps accepting requests.
+    # reopen() retires every connection: each is closed and opened again the
+    # next time it is handed out, so queries still running finish on the file
+    # they started on.
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="read")
+        self.idle = asyncio.Queue()
+        self.epoch = 0
+        for _ in range(size):
+            self.idle.put_nowait((self.epoch, self.connect()))
+
+    def connect(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    def reopen(self):
+        self.epoch += 1
+
+    async def run(self, function, *args):
+        epoch, conn = await self.idle.get()
+        try:
+            if epoch != self.epoch:
+                conn.close()
+                epoch, conn = self.epoch, self.connect()
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, conn, *args)
+        finally:
+            self.idle.put_nowait((epoch, conn))
+
+    def close(self):
+        self.executor.shutdown()
+        while not self.idle.empty():
+            self.idle.get_nowait()[1].close()
+
+# --- SERVICE ---
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else None
+
+def latency_summary(samples):
+    samples = sorted(samples)
+    return {
+        "requests": len(samples),
+        "p50_ms": round(percentile(samples, 0.5), 3) if samples else None,
+        "p95_ms": round(percentile(samples, 0.95), 3) if samples else None,
+        "p99_ms": round(percentile(samples, 0.99), 3) if samples else None,
+    }
+
+class QueryService:
+    def __init__(self, path, connections, cache, check_interval=DEFAULT_CHECK_INTERVAL, use_rollups=True):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} does not exist; build it with generate-database.py")
+        self.path = path
+        self.pool = ReadPool(path, connections)
+        self.cache = cache
+        # data_version is per connection and only moves for commits made by
+        # other connections, which is every commit since this one never writes.
+        # Reading it takes a shared lock, so it runs on its own thread, at most
+        # once per check_interval, with every request in between sharing the
+        # last result. A rebuild that swaps in a new file (os.replace after a
+        # --fast-load or --workers build) never moves it, since every
+        # connection still has the old file open; that shows in the inode, or
+        # in an mtime change no commit accounts for, and reopens the pool.
+        self.watch = self.open_watch()
+        self.watcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="watch")
+        self.check_interval = check_interval
+        self.checked_at = time.monotonic()
+        self.checking = None
+        self.identity = self.file_identity()
+        self.data_version = self.current_version()
+        self.reopens = 0
+        self.use_rollups = use_rollups
+        self.rollups = self.has_rollups()
+        self.in_flight = {}
+        self.latency = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self.started = time.time()
+
+    def open_watch(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=0, check_same_thread=False)
+
+    def file_identity(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Between a delete and the rebuild's first write: keep what is open
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def current_version(self):
+        try:
+            return self.watch.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.OperationalError:
+            # Locked by a rollback-journal writer: the commit is not visible
+            # yet, so the last known version still holds
+            return None
+
+    def has_rollups(self):
+        if not self.use_rollups:
+            return False
+        try:
+            present = {row[0] for row in self.watch.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        except sqlite3.OperationalError:
+            return False
+        return set(GENERATOR_MODULE.ROLLUP_TABLES) <= present
+
+    def poll(self):
+        # On the watcher thread. A new file gets a new watch connection, whose
+        # data_version starts over, and may or may not have rollups.
+        identity = self.file_identity()
+        replaced = identity is not None and self.identity is not None and identity[0] != self.identity[0]
+        rollups = self.rollups
+        if replaced:
+            self.watch.close()
+            self.watch = self.open_watch()
+            rollups = self.has_rollups()
+        return identity, replaced, rollups, self.current_version()
+
+    async def check_version(self):
+        if self.checking is None and time.monotonic() - self.checked_at >= self.check_interval:
+            self.checking = asyncio.ensure_future(self.read_version())
+        if self.checking is not None:
+            await asyncio.shield(self.checking)
+
+    async def read_version(self):
+        try:
+            identity, replaced, self.rollups, version = await asyncio.get_running_loop().run_in_executor(
+                self.watcher, self.poll
+            )
+        finally:
+            self.checked_at = time.monotonic()
+            self.checking = None
+        # Rewritten in place without a commit this connection saw (a copy over
+        # the file, or a WAL checkpoint, which only costs a reopen)
+        rewritten = identity is not None and identity != self.identity and version == self.data_version
+        if replaced or rewritten:
+            self.pool.reopen()
+            self.reopens += 1
+            self.data_version = version
+            self.cache.clear()
+        elif version is not None and version != self.data_version:
+            self.data_version = version
+            self.cache.clear()
+        if identity is not None:
+            self.identity = identity
+
+    async def handle(self, path, query):
+        # Returns (status, body, cache state)
+        started = time.perf_counter()
+        if path == "/stats":
+            return 200, json.dumps(self.summary(), indent=2).encode(), None
+        if path not in ENDPOINTS:
+            return 404, json.dumps({"error": f"No endpoint {path}"}).encode(), None
+        flux_id = (parse_qs(query).get("fluxId") or ["all"])[0] or "all"
+        flux = None
+        if flux_id != "all":
+            flux = parse_flux_id(flux_id)
+            if flux is None:
+                return 200, json.dumps({"data": [], "error": INVALID_FLUX}, separators=(",", ":")).encode(), None
+        # "7" and "7abc" are the same request to the endpoint, so share an entry
+        key = (path, flux)
+        await self.check_version()
+        body = self.cache.get(key, time.monotonic())
+        state = "HIT"
+        if body is None:
+            state = "MISS"
+            # With the cache on, concurrent misses for the same key wait on
+            # the first one's query instead of running their own. Queries are
+            # only shared within a cache generation: one that started before
+            # an invalidation may return data from before the commit.
+            flight = (self.cache.generation, key)
+            pending = self.in_flight.get(flight) if self.cache.max_entries else None
+            if pending is None:
+                pending = asyncio.ensure_future(self.compute(key, self.cache.generation))
+                if self.cache.max_entries:
+                    self.in_flight[flight] = pending
+                    pending.add_done_callback(lambda _: self.in_flight.pop(flight, None))
+            try:
+                body = await asyncio.shield(pending)
+            except sqlite3.Error as error:
+                error = {"message": str(error), "details": "", "hint": "", "code": "500"}
+                return 500, json.dumps({"data": [], "error": error}).encode(), state
+        self.latency[path].append((time.perf_counter() - started) * 1000)
+        return 200, body, state
+
+    async def compute(self, key, generation):
+        path, flux = key
+        _, _, history_name, aggregate = path.split("/")
+        data = await self.pool.run(run_aggregate, history_name, aggregate, flux, self.rollups)
+        body = json.dumps({"data": data, "error": None}, separators=(",", ":")).encode()
+        self.cache.put(key, body, time.monotonic(), generation)
+        return body
+
+    def summary(self):
+        return {
+            "database": self.path,
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "data_version": self.data_version,
+            "reopens": self.reopens,
+            "rollups": self.rollups,
+            "connections": self.pool.size,
+            "cache": self.cache.summary(),
+            "latency": {path: latency_summary(samples) for path, samples in sorted(self.latency.items())},
+        }
+
+    def close(self):
+        self.pool.close()
+        self.watcher.shutdown()
+        self.watch.close()
+
+# --- HTTP ---
+# Just enough HTTP/1.1 for curl, fetch() and the load test: GET only,
+# keep-alive unless the client says otherwise, no request bodies.
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+async def serve_connection(service, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            parts = request_line.decode("latin-1").split()
+            cache_state = None
+            if len(parts) != 3:
+                status, body = 400, b'{"error":"Malformed request"}'
+            elif parts[0] != "GET":
+                status, body = 405, b'{"error":"Only GET is supported"}'
+            else:
+                url = urlsplit(parts[1])
+                status, body, cache_state = await service.handle(url.path, url.query)
+            keep_alive = headers.get("connection", "").lower() != "close" and parts[-1:] != ["HTTP/1.0"]
+            head = [
+                f"HTTP/1.1 {status} {REASONS[status]}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            ]
+            if cache_state:
+                head.append(f"X-Cache: {cache_state}")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(lambda r, w: serve_connection(service, r, w), host, port)
+    print(f"✅ Serving {service.path} on http://{host}:{port} ({len(ENDPOINTS)} endpoints, /stats)")
+    async with server:
+        await server.serve_forever()
+
+# --- LOAD TEST ---
+def sample_flux_ids(path, seed, count, all_share):
+    # Dashboards mostly look at busy fluxes: fluxes are drawn weighted by their
+    # fetch runs, with a share of requests for "all"
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    rows = conn.execute("SELECT fluxID, COUNT(*) FROM fetchingHistory GROUP BY fluxID").fetchall()
+    conn.close()
+    if not rows:
+        sys.exit(f"No fetchingHistory rows in {path}")
+    rng = random.Random(seed)
+    fluxes, weights = zip(*rows)
+    return [
+        "all" if rng.random() < all_share else str(rng.choices(fluxes, weights)[0])
+        for _ in range(count)
+    ]
+
+async def replay(service, requests, concurrency):
+    queue = deque(requests)
+    samples = []
+
+    async def client():
+        while queue:
+            path, flux_id = queue.popleft()
+            started = time.perf_counter()
+            await service.handle(path, f"fluxId={flux_id}")
+            samples.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - started, samples
+
+def load_test(args):
+    # The same seeded request mix twice, without and with the cache, so the
+    # difference is what caching buys under this much concurrency
+    rng = random.Random(args.seed)
+    flux_ids = sample_flux_ids(args.database, args.seed, args.load_test, args.all_share)
+    requests = [(rng.choice(ENDPOINTS), flux_id) for flux_id in flux_ids]
+    runs = {}
+    for label, entries in (("uncached", 0), ("cached", args.cache_entries)):
+        cache = QueryCache(entries, args.cache_mb * 1024 * 1024, args.ttl)
+        service = QueryService(args.database, args.connections, cache, args.check_interval, not args.ignore_rollups)
+        try:
+            seconds, samples = asyncio.run(replay(service, requests, args.concurrency))
+        finally:
+            service.close()
+        runs[label] = {
+            "seconds": round(seconds, 3),
+            "requests_per_second": round(len(samples) / seconds, 1),
+            **latency_summary(samples),
+            "cache": cache.summary(),
+        }
+        print(f"  {label:<9} {len(samples)} requests in {seconds:.2f}s ({len(samples) / seconds:.0f}/s), "
+              f"p50 {runs[label]['p50_ms']:.2f} ms, p95 {runs[label]['p95_ms']:.2f} ms, "
+              f"hit rate {cache.summary()['hit_rate'] or 0:.1%}")
+    speedup = runs["uncached"]["seconds"] / runs["cached"]["seconds"]
+    print(f"✅ Caching served the same load {speedup:.1f}x faster")
+    report = {
+        "database": args.database,
+        "requests": args.load_test,
+        "concurrency": args.concurrency,
+        "connections": args.connections,
+        "rollups": service.rollups,
+        "all_share": args.all_share,
+        "seed": args.seed,
+        "runs": runs,
+        "speedup": round(speedup, 2),
+    }
+    if args.report:
+        with open(args.report, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"✅ Wrote {args.report}")
+
+# --- MAIN EXECUTION ---
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Serve the dashboard aggregate endpoints from a database built by "
+                    "generate-database.py, behind a cache invalidated by database changes."
+    )
+    parser.add_argument("--database", default=DEFAULT_DATABASE,
+                        help="Database to serve (default: %(default)s).")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="Address to listen on (default: %(default)s).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="Port to listen on (default: %(default)s).")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help="Read-only connections in the pool (default: %(default)s).")
+    parser.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help="Cached responses kept at most; 0 disables the cache (default: %(default)s).")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB,
+                        help="Cached response bytes kept at most, in MiB (default: %(default)s).")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL,
+                        help="Seconds a cached response is served for (default: %(default)s).")
+    parser.add_argument("--check-interval", type=float, default=DEFAULT_CHECK_INTERVAL, metavar="SECONDS",
+                        help="Seconds between checks of the database's data_version; a commit is served "
+                             "from the cache for at most this long (default: %(default)s).")
+    parser.add_argument("--ignore-rollups", action="store_true",
+                        help="Compute every aggregate from the history tables even when the database "
+                             "has the rollup tables of --rollups.")
+    parser.add_argument("--load-test", type=int, default=0, metavar="REQUESTS",
+                        help="Instead of serving, replay this many concurrent dashboard requests "
+                             "without and with the cache and report both.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Requests in flight during --load-test (default: %(default)s).")
+    parser.add_argument("--all-share", type=float, default=DEFAULT_ALL_SHARE,
+                        help="Share of --load-test requests for fluxId=all (default: %(default)s).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="Seed for the --load-test request mix (default: %(default)s).")
+    parser.add_argument("--report", metavar="PATH",
+                        help="Write the --load-test results as JSON to PATH.")
+    args = parser.parse_args()
+    if args.connections < 1:
+        parser.error("--connections must be at least 1")
+    if args.cache_entries < 0 or args.cache_mb < 0:
+        parser.error("--cache-entries and --cache-mb cannot be negative")
+    if args.ttl <= 0:
+        parser.error("--ttl must be greater than 0")
+    if args.check_interval < 0:
+        parser.error("--check-interval cannot be negative")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if not 0 <= args.all_share <= 1:
+        parser.error("--all-share must be between 0 and 1")
+    if args.report and not args.load_test:
+        parser.error("--report needs --load-test")
+    return args
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.database):
+        sys.exit(f"{args.database} does not exist; build it with generate-database.py")
+    if args.load_test:
+        load_test(args)
+        return
+    service = QueryService(
+        args.database, args.connections, QueryCache(args.cache_entries, args.cache_mb * 1024 * 1024, args.ttl),
+        args.check_interval, not args.ignore_rollups
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(service.summary(), indent=2))
+        service.close()
+
+if __name__ == "__main__":
+    main()